@@ -10,6 +10,15 @@ COLUMNS_TO_DISPLAY = [
     "ROE (%)",
     "URL",
 ]
+RANKING_METRICS = {
+    "ROE": "Return on Equity",
+    "cap_rate": "Cap Rate",
+    "cash_return": "Cash-on-Cash Return",
+    "net_cash": "Net Cash",
+}
 ALLOWED_PROPERTY_TYPES = ["Condo / Apartment", "Loft / Studio"]
 SERIALIZED_MODEL_DIR = Path(__file__).parent.parent / "serialized_models"
 SERIALIZED_MODEL_PATH = SERIALIZED_MODEL_DIR / "rent_predictor.pkl"
+# Model artifact directory, see `project_real_estate.models.artifact`. Preferred over the pickle when it exists.
+MODEL_ARTIFACT_PATH = SERIALIZED_MODEL_DIR / "rent_predictor"
+LOCAL_DATA_CACHE_DIR = Path(__file__).parent.parent / "data_cache"
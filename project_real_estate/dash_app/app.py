@@ -1,20 +1,27 @@
+import os
+
 import dash
 import dash_html_components as html
 from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
 
-from project_real_estate.constants import COLUMNS_TO_DISPLAY
+from project_real_estate.dash_app.formatting import format_records
 from project_real_estate.dash_app.layout import (
     app_header,
+    city_options,
+    listing_bounds,
+    listing_store,
     num_results_filter,
     reports_section,
     results_list,
-    sales_data_with_rent_predictions,
     user_inputs,
+    year_built_marks,
 )
-from project_real_estate.models.financial_model import (
-    SimpleFinancialModel,
-    TrivialFinancialModel,
-)
+from project_real_estate.dash_app.models import get_precomputed_cubes
+from project_real_estate.dash_app.ranking import top_k_indices
+from project_real_estate.dash_app.result_cache import ResultCache, normalize_key
+from project_real_estate.models.financial_model import TrivialFinancialModel
+from project_real_estate.models.forecast_graph import ForecastSessionCache
 from project_real_estate.models.rent_estimator import TrivialRentEstimator
 
 app = dash.Dash(__name__)
@@ -25,45 +32,48 @@ app.layout = html.Div(
 
 financial_model = TrivialFinancialModel()
 rent_model = TrivialRentEstimator()
+# Set RESULT_CACHE_DIR to share computed reports between worker processes.
+result_cache = ResultCache(
+    maxsize=256, directory=os.environ.get("RESULT_CACHE_DIR") or None
+)
+# Drop results computed on previous snapshots whenever new listings are loaded.
+listing_store.subscribe(lambda index: result_cache.prune(index.version))
+# Intermediate arrays of the forecasts of recent listing selections, so that changing one parameter is cheap.
+forecast_sessions = ForecastSessionCache(max_bytes=2 ** 29)
+# Sessions hold arrays in the order of the index they were built from, and keep it alive.
+listing_store.subscribe(forecast_sessions.prune)
 
 
-def _format_data(data):
-    # Keep civic No., street and city
-    data.full_address = data.full_address.apply(lambda x: "".join(x.split(",")[:2]))
-    data.city = data.city.apply(lambda x: x.split("(")[0].strip())
-
-    data["ROE"] = data["ROE"].apply(lambda x: f"{x:.1%}")
-    data["cap_rate"] = data["cap_rate"].apply(lambda x: f"{x:.1%}")
-    data["investment"] = data["investment"].apply(lambda x: f"{x:,.0f}")
-    data["revenue"] = data["revenue"].apply(lambda x: f"{x:,.0f}")
-    data["net_cash"] = data["net_cash"].apply(lambda x: f"{x:,.0f}")
-    data["price"] = data["price"].apply(lambda x: f"{x:,.0f}")
-
-    # Use Google search instead of Centris
-    data.url = (
-        "[Property Listing](https://www.google.com/search?q=for+sale+"
-        + data.full_address.str.replace(" ", "+")
-        + "+"
-        + data.city.str.replace(" ", "+")
-        + "+"
-        + data.property_type.str.replace(" ", "+")
-        + ")"
-    )
-
-    data.rename(
-        columns={
-            "city": "City",
-            "price": "Price",
-            "investment": "Investment",
-            "revenue": "Revenue",
-            "cap_rate": "Cap Rate (%)",
-            "net_cash": "Net Cash",
-            "ROE": "ROE (%)",
-            "url": "URL",
-        },
-        inplace=True,
+@app.callback(
+    [
+        Output(component_id="budget", component_property="min"),
+        Output(component_id="budget", component_property="max"),
+        Output(component_id="budget", component_property="value"),
+        Output(component_id="year_built", component_property="min"),
+        Output(component_id="year_built", component_property="marks"),
+        Output(component_id="city", component_property="options"),
+        Output(component_id="loading-status", component_property="children"),
+        Output(component_id="data_loading_interval", component_property="disabled"),
+    ],
+    [Input(component_id="data_loading_interval", component_property="n_intervals")],
+)
+def update_data_dependent_controls(n_intervals):
+    if not listing_store.ready:
+        if n_intervals:
+            raise PreventUpdate
+        return (dash.no_update,) * 6 + ("Loading listings...", False)
+
+    oldest_year, lowest_price, highest_price = listing_bounds()
+    return (
+        lowest_price,
+        highest_price,
+        [lowest_price, highest_price],
+        oldest_year,
+        year_built_marks(oldest_year),
+        city_options(),
+        f"{len(listing_store.index)} listings loaded.",
+        True,
     )
-    return data
 
 
 @app.callback(
@@ -99,6 +109,7 @@ def update_value_forecast_horizon(max_value):
         Input(component_id="expense_ratio", component_property="value"),
         Input(component_id="yearly_reserves", component_property="value"),
         Input(component_id="num_results", component_property="value"),
+        Input(component_id="rank_by", component_property="value"),
     ],
 )
 def predict_roi(
@@ -116,22 +127,56 @@ def predict_roi(
     expense_ratio,
     yearly_reserves,
     num_results,
+    rank_by,
+):
+    inputs = (
+        city_filters,
+        budget,
+        year_built_filter,
+        downpayment,
+        closing_fees,
+        interest_rate,
+        amortization,
+        forecast_horizon,
+        vacancy,
+        property_tax_rate,
+        rate_rent_increase,
+        expense_ratio,
+        yearly_reserves,
+        num_results,
+        rank_by,
+    )
+    # Use the same snapshot throughout, even if the store is refreshed meanwhile.
+    listings = listing_store.index
+    if listings is None:
+        return []
+    key = normalize_key(*inputs)
+    result = result_cache.get(key, listings.version)
+    if result is None:
+        result = _compute_roi(listings, *inputs)
+        result_cache.set(key, listings.version, result)
+    return result
+
+
+def _compute_roi(
+    listings,
+    city_filters,
+    budget,
+    year_built_filter,
+    downpayment,
+    closing_fees,
+    interest_rate,
+    amortization,
+    forecast_horizon,
+    vacancy,
+    property_tax_rate,
+    rate_rent_increase,
+    expense_ratio,
+    yearly_reserves,
+    num_results,
+    rank_by,
 ):
-    if not city_filters:
-        filtered_sales = sales_data_with_rent_predictions
-    else:
-        filtered_sales = sales_data_with_rent_predictions[
-            sales_data_with_rent_predictions.city.isin(city_filters)
-        ]
-
-    sales_under_budget = filtered_sales[
-        (filtered_sales.price > budget[0]) & (filtered_sales.price < budget[1])
-    ]
-
-    filtered_sales = sales_under_budget[
-        (sales_under_budget.year_built > year_built_filter[0])
-        & (sales_under_budget.year_built < year_built_filter[1])
-    ]
+    positions = listings.filter(city_filters, budget, year_built_filter)
 
     # Convert percentages to decimals
     downpayment /= 100
@@ -142,7 +187,7 @@ def predict_roi(
     rate_rent_increase /= 100
     expense_ratio /= 100
 
-    finance_model = SimpleFinancialModel(
+    model_parameters = dict(
         downpayment=downpayment,
         closing_fees=closing_fees,
         interest_rate=interest_rate,
@@ -154,10 +199,42 @@ def predict_roi(
         expense_ratio=expense_ratio,
         yearly_reserves=yearly_reserves,
     )
-    prediction = finance_model.predict(filtered_sales)
-    prediction = prediction.sort_values(by="ROE", ascending=False)
-    formatted_prediction = _format_data(prediction.iloc[:num_results])
-    return formatted_prediction.loc[:, COLUMNS_TO_DISPLAY].to_dict("rows")
+    # Look the forecasts up if they were precomputed for these parameters.
+    prediction = None
+    cubes = get_precomputed_cubes(listings.version)
+    if cubes:
+        # Decoding MLS numbers is not free on a memory-mapped index, so only done once.
+        mls_ids = listings.take("mls_id", positions)
+    for cube in cubes:
+        prediction = cube.lookup(mls_ids, **model_parameters)
+        if prediction is not None:
+            break
+    if prediction is None:
+        # Only the parts of the forecast depending on the parameters which changed are computed again.
+        # Keyed on the index itself rather than its version: the version does not depend on the order of the
+        # listings, while the arrays of a session follow the positions in this index.
+        prediction = forecast_sessions.forecast(
+            (listings, normalize_key(city_filters, budget, year_built_filter)),
+            lambda: (
+                listings.price[positions],
+                listings.predicted_rent[positions],
+                listings.year_built[positions],
+            ),
+            **model_parameters,
+        )
+
+    # Only gather and format the winning rows. The shared listings are never modified.
+    top_positions = top_k_indices(prediction[rank_by], num_results)
+    top_listings = positions[top_positions]
+    return format_records(
+        city=listings.take("city", top_listings),
+        full_address=listings.take("full_address", top_listings),
+        property_type=listings.take("property_type", top_listings),
+        price=listings.price[top_listings],
+        outputs={
+            column: values[top_positions] for column, values in prediction.items()
+        },
+    )
 
 
 server = app.server
@@ -0,0 +1,84 @@
+from project_real_estate.constants import COLUMNS_TO_DISPLAY
+
+_GOOGLE_SEARCH_URL = "[Property Listing](https://www.google.com/search?q=for+sale+{})"
+
+
+def _format_amounts(values):
+    return [f"{value:,.0f}" for value in values.tolist()]
+
+
+def _format_percentages(values):
+    return [f"{value:.1%}" for value in values.tolist()]
+
+
+def format_records(city, full_address, property_type, price, outputs):
+    """
+    Build the table rows to display straight from the raw values of the selected listings, one column at a time.
+    Inputs are only read, never modified.
+
+    :param outputs: Financial model outputs of the selected listings, by column.
+    :return: List of records keyed by `COLUMNS_TO_DISPLAY`.
+    """
+    # Keep civic No., street and city
+    addresses = ["".join(address.split(",")[:2]) for address in full_address]
+    cities = [city_name.split("(")[0].strip() for city_name in city]
+    # Use Google search instead of Centris
+    urls = [
+        _GOOGLE_SEARCH_URL.format(
+            "+".join([address, city_name, type_]).replace(" ", "+")
+        )
+        for address, city_name, type_ in zip(addresses, cities, property_type)
+    ]
+    columns = (
+        cities,
+        _format_amounts(price),
+        _format_amounts(outputs["investment"]),
+        _format_amounts(outputs["revenue"]),
+        _format_percentages(outputs["cap_rate"]),
+        _format_amounts(outputs["net_cash"]),
+        _format_percentages(outputs["ROE"]),
+        urls,
+    )
+    return [dict(zip(COLUMNS_TO_DISPLAY, row)) for row in zip(*columns)]
+
+
+def format_frame(data):
+    """
+    Previous, pandas-based formatting. Modifies `data` in place. Kept as a reference for `format_records`.
+    """
+    # Keep civic No., street and city
+    data.full_address = data.full_address.apply(lambda x: "".join(x.split(",")[:2]))
+    data.city = data.city.apply(lambda x: x.split("(")[0].strip())
+
+    data["ROE"] = data["ROE"].apply(lambda x: f"{x:.1%}")
+    data["cap_rate"] = data["cap_rate"].apply(lambda x: f"{x:.1%}")
+    data["investment"] = data["investment"].apply(lambda x: f"{x:,.0f}")
+    data["revenue"] = data["revenue"].apply(lambda x: f"{x:,.0f}")
+    data["net_cash"] = data["net_cash"].apply(lambda x: f"{x:,.0f}")
+    data["price"] = data["price"].apply(lambda x: f"{x:,.0f}")
+
+    # Use Google search instead of Centris
+    data.url = (
+        "[Property Listing](https://www.google.com/search?q=for+sale+"
+        + data.full_address.str.replace(" ", "+")
+        + "+"
+        + data.city.str.replace(" ", "+")
+        + "+"
+        + data.property_type.str.replace(" ", "+")
+        + ")"
+    )
+
+    data.rename(
+        columns={
+            "city": "City",
+            "price": "Price",
+            "investment": "Investment",
+            "revenue": "Revenue",
+            "cap_rate": "Cap Rate (%)",
+            "net_cash": "Net Cash",
+            "ROE": "ROE (%)",
+            "url": "URL",
+        },
+        inplace=True,
+    )
+    return data
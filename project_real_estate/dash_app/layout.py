@@ -1,18 +1,84 @@
+import os
+import threading
+import time
+import traceback
+
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
 
-from project_real_estate.constants import COLUMNS_TO_DISPLAY
-from project_real_estate.dash_app.models import rent_model
-from project_real_estate.db import pull_data
+from project_real_estate.constants import COLUMNS_TO_DISPLAY, RANKING_METRICS
+from project_real_estate.dash_app.listing_store import (
+    ListingStore,
+    current_snapshot_version,
+    read_listing_snapshot,
+)
+from project_real_estate.dash_app.models import load_listings
+
+# Slider bounds shown until the listings are loaded.
+_DEFAULT_BOUNDS = (1900, 0, 25000000)
+# Set LISTING_SNAPSHOT_DIR to map the snapshot written by `scripts.write_listing_snapshot` instead of querying the
+# database. Every worker process then shares the same listings in memory.
+_SNAPSHOT_DIR = os.environ.get("LISTING_SNAPSHOT_DIR")
+_SNAPSHOT_POLL_SECONDS = 60
+
+
+def _load_listings():
+    if _SNAPSHOT_DIR:
+        listing_store.replace(read_listing_snapshot(_SNAPSHOT_DIR))
+    else:
+        listing_store.refresh(load_listings())
+
+
+def _load_listings_in_background():
+    try:
+        _load_listings()
+    except Exception:
+        traceback.print_exc()
+
+
+def _watch_listing_snapshot():
+    while True:
+        time.sleep(_SNAPSHOT_POLL_SECONDS)
+        try:
+            version = current_snapshot_version(_SNAPSHOT_DIR)
+            if version is not None and (
+                not listing_store.ready or version != listing_store.index.version
+            ):
+                listing_store.replace(read_listing_snapshot(_SNAPSHOT_DIR))
+        except Exception:
+            traceback.print_exc()
+
 
-sales_data = pull_data("latest_sales", max_rows=None)
-predicted_rent_revenue = rent_model.predict(sales_data)
-sales_data_with_rent_predictions = sales_data.join(predicted_rent_revenue, how="inner")
+def listing_bounds():
+    """
+    :return: (oldest year, lowest price, highest price) of the loaded listings.
+    """
+    if not listing_store.ready:
+        return _DEFAULT_BOUNDS
+    return listing_store.index.bounds()
 
-oldest_year = int(sales_data_with_rent_predictions.year_built.min())
-lowest_price = int(sales_data_with_rent_predictions.price.min())
-highest_price = int(sales_data_with_rent_predictions.price.max())
+
+def city_options():
+    if not listing_store.ready:
+        return []
+    return [{"label": city, "value": city} for city in listing_store.index.cities]
+
+
+def year_built_marks(oldest_year):
+    return {value: f"{value}" for value in range(oldest_year, 2020, 20)}
+
+
+listing_store = ListingStore()
+# Set LOAD_DATA_IN_BACKGROUND to start serving immediately and fill in the listings once they are loaded.
+if os.environ.get("LOAD_DATA_IN_BACKGROUND"):
+    threading.Thread(target=_load_listings_in_background, daemon=True).start()
+else:
+    _load_listings()
+if _SNAPSHOT_DIR:
+    threading.Thread(target=_watch_listing_snapshot, daemon=True).start()
+
+oldest_year, lowest_price, highest_price = listing_bounds()
 
 
 app_header = html.Div(
@@ -38,14 +104,7 @@ property_filter_elements = [
     html.P("Property filters", className="control-title"),
     html.P("City", className="control-label"),
     dcc.Dropdown(
-        id="city",
-        options=[
-            {"label": city, "value": city}
-            for city in sales_data_with_rent_predictions.city.unique()
-        ],
-        multi=True,
-        value=[],
-        className="control",
+        id="city", options=city_options(), multi=True, value=[], className="control",
     ),
     html.P("Budget", className="control-label"),
     dcc.RangeSlider(
@@ -72,7 +131,7 @@ property_filter_elements = [
         step=1,
         value=[1970, 2020],
         className="control",
-        marks={value: f"{value}" for value in range(oldest_year, 2020, 20)},
+        marks=year_built_marks(oldest_year),
     ),
 ]
 
@@ -222,7 +281,7 @@ reports_section = html.Div(
         html.H2("Investment report", className="control-title"),
         html.P(
             f"The below report shows the top properties that fit your requirements, "
-            f"sorted by Return on Equity (averageed over the amortization period).",
+            f"sorted by the selected metric (averaged over the forecast horizon).",
             id="reports-text",
         ),
         html.P(
@@ -234,6 +293,10 @@ reports_section = html.Div(
             f"average yearly Return on Equity over the loan amortization period.",
             id="reports-text-2",
         ),
+        html.P(id="loading-status", className="control-label"),
+        dcc.Interval(
+            id="data_loading_interval", interval=1000, disabled=listing_store.ready
+        ),
     ],
     className="pretty-container",
     style={"margin-bottom": "40px"},
@@ -253,6 +316,17 @@ num_results_filter = html.Div(
             value=20,
             className="control control-input",
         ),
+        html.P("Rank results by:"),
+        dcc.Dropdown(
+            id="rank_by",
+            options=[
+                {"label": label, "value": metric}
+                for metric, label in RANKING_METRICS.items()
+            ],
+            value="ROE",
+            clearable=False,
+            className="control",
+        ),
     ],
 )
 
@@ -0,0 +1,456 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+# Columns whose changes are detected when refreshing the store from a new snapshot.
+_FINGERPRINT_COLUMNS = [
+    "mls_id",
+    "price",
+    "year_built",
+    "city",
+    "full_address",
+    "property_type",
+    "predicted_rent_revenue",
+]
+# Columns written to memory-mapped snapshots.
+_SNAPSHOT_NUMERIC_COLUMNS = ["price", "year_built", "predicted_rent_revenue"]
+_SNAPSHOT_STRING_COLUMNS = ["mls_id", "city", "full_address", "property_type", "url"]
+_SNAPSHOT_FORMAT = 1
+# Number of snapshots kept on disk, so workers still mapping the previous one are not affected by a new one.
+_SNAPSHOTS_KEPT = 2
+
+# Above this fraction of candidate listings, filters scan the columns instead of using the indexes.
+_SCAN_FRACTION = 0.1
+
+
+def _fingerprint(data):
+    return pd.util.hash_pandas_object(
+        data.loc[:, _FINGERPRINT_COLUMNS], index=False
+    ).values
+
+
+class _SortedColumn:
+    """
+    Values of a numeric column together with the positions that sort them, so open range queries become two binary
+    searches.
+    """
+
+    def __init__(self, values, order, sorted_values=None):
+        self.values = values
+        self.order = order
+        self.sorted_values = values[order] if sorted_values is None else sorted_values
+
+    @classmethod
+    def build(cls, values):
+        return cls(values, np.argsort(values, kind="stable"))
+
+    def range_positions(self, low, high):
+        """
+        Positions of the values strictly between `low` and `high`, in value order.
+        """
+        start = np.searchsorted(self.sorted_values, low, side="right")
+        stop = np.searchsorted(self.sorted_values, high, side="left")
+        return self.order[start : max(start, stop)]
+
+    def range_count(self, low, high):
+        start = np.searchsorted(self.sorted_values, low, side="right")
+        stop = np.searchsorted(self.sorted_values, high, side="left")
+        return max(0, stop - start)
+
+    def updated(self, keep, new_values, num_kept):
+        """
+        Drop the positions not in `keep` and merge `new_values`, appended after the kept rows, without re-sorting.
+        """
+        new_positions = np.cumsum(keep) - 1
+        kept = keep[self.order]
+        order = new_positions[self.order[kept]]
+        sorted_values = self.sorted_values[kept]
+
+        added_order = np.argsort(new_values, kind="stable")
+        added_values = new_values[added_order]
+        insert_at = np.searchsorted(sorted_values, added_values, side="right")
+
+        column = _SortedColumn.__new__(_SortedColumn)
+        column.values = np.concatenate([self.values[keep], new_values])
+        column.order = np.insert(order, insert_at, num_kept + added_order)
+        column.sorted_values = np.insert(sorted_values, insert_at, added_values)
+        return column
+
+
+class ListingIndex:
+    """
+    Immutable, columnar view of the listings with an index per filterable column: positions grouped by city and
+    price/year arrays in sorted order. Filters start from the most selective index and check the remaining conditions
+    on those candidates only.
+    """
+
+    def __init__(self, data, fingerprints=None, price=None, year_built=None):
+        self.data = data.reset_index(drop=True)
+        self.predicted_rent = self.data.predicted_rent_revenue.values.astype(float)
+        self._mls_ids = self.data.mls_id.values
+        self._fingerprints = (
+            _fingerprint(self.data) if fingerprints is None else fingerprints
+        )
+        if price is None:
+            price = _SortedColumn.build(self.data.price.values.astype(float))
+        if year_built is None:
+            year_built = _SortedColumn.build(self.data.year_built.values.astype(float))
+        self._price = price
+        self._year_built = year_built
+        self._build_city_index()
+        # Order-independent, so an incrementally updated index has the same version as a freshly built one.
+        self.version = "{:016x}-{}".format(
+            int(self._fingerprints.sum(dtype=np.uint64)), len(self.data)
+        )
+
+    def _build_city_index(self):
+        codes, cities = pd.factorize(self.data.city, sort=True)
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.searchsorted(codes[order], np.arange(len(cities) + 1))
+        self._set_city_index(codes, list(cities), order, boundaries)
+
+    def _set_city_index(self, codes, cities, order, boundaries):
+        self.cities = cities
+        self._city_codes = codes
+        self._city_code_of = {city: i for i, city in enumerate(cities)}
+        self._city_positions = {
+            city: order[boundaries[i] : boundaries[i + 1]]
+            for i, city in enumerate(cities)
+        }
+
+    @property
+    def price(self):
+        return self._price.values
+
+    @property
+    def year_built(self):
+        return self._year_built.values
+
+    def __len__(self):
+        return len(self.predicted_rent)
+
+    def take(self, column, positions):
+        """
+        Values of `column` for the listings at `positions`.
+        """
+        return self.data[column].values[positions]
+
+    def bounds(self):
+        """
+        :return: (oldest year, lowest price, highest price) over all listings.
+        """
+        return (
+            int(np.nanmin(self.year_built)),
+            int(np.nanmin(self.price)),
+            int(np.nanmax(self.price)),
+        )
+
+    def filter(self, cities, price_range, year_range):
+        """
+        Positions of the listings in any of `cities` (all cities if empty) with price and year built strictly within
+        the given ranges, in ascending order.
+        """
+        candidates = []
+        if cities:
+            positions = [self._city_positions.get(city) for city in set(cities)]
+            positions = [p for p in positions if p is not None]
+            candidates.append(
+                (sum(len(p) for p in positions), lambda: np.concatenate(positions))
+            )
+        candidates.append(
+            (
+                self._price.range_count(*price_range),
+                lambda: self._price.range_positions(*price_range),
+            )
+        )
+        candidates.append(
+            (
+                self._year_built.range_count(*year_range),
+                lambda: self._year_built.range_positions(*year_range),
+            )
+        )
+        if cities and not candidates[0][0]:
+            return np.array([], dtype=int)
+
+        # Materialize the smallest candidate set, then check every condition on it. When no index is selective, a
+        # sequential scan is cheaper than gathering and re-sorting most of the positions.
+        num_candidates, materialize = min(
+            candidates, key=lambda candidate: candidate[0]
+        )
+        if num_candidates > len(self) * _SCAN_FRACTION:
+            positions = slice(None)
+        else:
+            positions = materialize()
+        price = self.price[positions]
+        year_built = self.year_built[positions]
+        mask = (
+            (price > price_range[0])
+            & (price < price_range[1])
+            & (year_built > year_range[0])
+            & (year_built < year_range[1])
+        )
+        if cities:
+            codes = [
+                self._city_code_of[city]
+                for city in cities
+                if city in self._city_code_of
+            ]
+            mask &= np.isin(self._city_codes[positions], codes)
+        if isinstance(positions, slice):
+            return np.flatnonzero(mask)
+        return np.sort(positions[mask])
+
+    def updated(self, data):
+        """
+        Build the index of a new snapshot of the listings, reusing the sorted arrays of this one. Listings are matched
+        on `mls_id`; only new or changed listings are merged in. Falls back to a full rebuild when most listings changed.
+        """
+        data = data.reset_index(drop=True)
+        fingerprints = _fingerprint(data)
+        unchanged = np.isin(fingerprints, self._fingerprints)
+        changed = data[~unchanged]
+        keep = np.isin(self._fingerprints, fingerprints) & ~np.isin(
+            self._mls_ids, changed.mls_id.values
+        )
+        if len(changed) + (~keep).sum() > len(data) / 2:
+            return ListingIndex(data, fingerprints=fingerprints)
+
+        num_kept = int(keep.sum())
+        merged = pd.concat([self.data[keep], changed], ignore_index=True)
+        return ListingIndex(
+            merged,
+            fingerprints=np.concatenate(
+                [self._fingerprints[keep], fingerprints[~unchanged]]
+            ),
+            price=self._price.updated(
+                keep, changed.price.values.astype(float), num_kept
+            ),
+            year_built=self._year_built.updated(
+                keep, changed.year_built.values.astype(float), num_kept
+            ),
+        )
+
+
+class _MappedStrings:
+    """
+    String column stored as UTF-8 bytes with the offset of each value, read from memory-mapped files. Values are only
+    decoded for the requested positions.
+    """
+
+    def __init__(self, offsets, buffer, nulls):
+        self._offsets = offsets
+        self._buffer = buffer
+        self._nulls = nulls
+
+    @staticmethod
+    def write(values, path, name):
+        nulls = pd.isnull(values)
+        encoded = [b"" if null else str(v).encode() for v, null in zip(values, nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in encoded], out=offsets[1:])
+        np.save(path / f"{name}.offsets.npy", offsets)
+        np.save(path / f"{name}.nulls.npy", nulls)
+        with open(path / f"{name}.bytes", "wb") as f:
+            f.write(b"".join(encoded))
+
+    @classmethod
+    def read(cls, path, name):
+        offsets = np.load(path / f"{name}.offsets.npy", mmap_mode="r")
+        nulls = np.load(path / f"{name}.nulls.npy", mmap_mode="r")
+        # np.memmap cannot map an empty file
+        if offsets[-1]:
+            buffer = np.memmap(path / f"{name}.bytes", dtype=np.uint8, mode="r")
+        else:
+            buffer = np.zeros(0, dtype=np.uint8)
+        return cls(offsets, buffer, nulls)
+
+    def take(self, positions):
+        values = np.empty(len(positions), dtype=object)
+        for i, position in enumerate(np.asarray(positions).tolist()):
+            if not self._nulls[position]:
+                start, stop = self._offsets[position], self._offsets[position + 1]
+                values[i] = self._buffer[start:stop].tobytes().decode()
+        return values
+
+
+class MappedListingIndex(ListingIndex):
+    """
+    `ListingIndex` over a snapshot written by `write_listing_snapshot`. Every array, including the sorted indexes, is
+    memory-mapped read-only, so all processes mapping the same snapshot share a single copy in the page cache.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        with open(path / "manifest.json") as f:
+            manifest = json.load(f)
+        if manifest["format"] != _SNAPSHOT_FORMAT:
+            raise ValueError(
+                f"Unsupported listing snapshot format `{manifest['format']}` in {path}"
+            )
+
+        def load(name):
+            return np.load(path / f"{name}.npy", mmap_mode="r")
+
+        self.data = None
+        self.path = path
+        self.version = manifest["version"]
+        self._numeric = {name: load(name) for name in manifest["numeric_columns"]}
+        self._strings = {
+            name: _MappedStrings.read(path, name) for name in manifest["string_columns"]
+        }
+        self.predicted_rent = self._numeric["predicted_rent_revenue"]
+        self._price = _SortedColumn(
+            self._numeric["price"], load("price.order"), load("price.sorted")
+        )
+        self._year_built = _SortedColumn(
+            self._numeric["year_built"],
+            load("year_built.order"),
+            load("year_built.sorted"),
+        )
+        self._set_city_index(
+            load("city.codes"),
+            manifest["cities"],
+            load("city.order"),
+            load("city.boundaries"),
+        )
+
+    def take(self, column, positions):
+        if column in self._strings:
+            return self._strings[column].take(positions)
+        return self._numeric[column][positions]
+
+    def updated(self, data):
+        return ListingIndex(data)
+
+
+def write_listing_snapshot(data, directory):
+    """
+    Write the listings and their indexes as a memory-mappable snapshot in `directory`, and make it the current one.
+    Numeric columns are stored as raw arrays and strings as offsets into a bytes buffer.
+
+    :return: Path of the new snapshot.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index = ListingIndex(data)
+    path = directory / index.version
+
+    if not path.exists():
+        tmp_path = Path(tempfile.mkdtemp(dir=directory, prefix=".tmp-"))
+        arrays = {
+            "price.order": index._price.order,
+            "price.sorted": index._price.sorted_values,
+            "year_built.order": index._year_built.order,
+            "year_built.sorted": index._year_built.sorted_values,
+            "city.codes": index._city_codes,
+            "city.order": np.concatenate(
+                [index._city_positions[city] for city in index.cities]
+                or [np.array([], dtype=int)]
+            ),
+            "city.boundaries": np.cumsum(
+                [0] + [len(index._city_positions[city]) for city in index.cities]
+            ),
+        }
+        for name in _SNAPSHOT_NUMERIC_COLUMNS:
+            arrays[name] = index.data[name].values.astype(float)
+        for name, values in arrays.items():
+            np.save(tmp_path / f"{name}.npy", values)
+        for name in _SNAPSHOT_STRING_COLUMNS:
+            _MappedStrings.write(index.data[name].values, tmp_path, name)
+        with open(tmp_path / "manifest.json", "w") as f:
+            json.dump(
+                {
+                    "format": _SNAPSHOT_FORMAT,
+                    "version": index.version,
+                    "num_listings": len(index),
+                    "cities": index.cities,
+                    "numeric_columns": _SNAPSHOT_NUMERIC_COLUMNS,
+                    "string_columns": _SNAPSHOT_STRING_COLUMNS,
+                },
+                f,
+            )
+        os.rename(tmp_path, path)
+
+    # Point readers to the new snapshot atomically.
+    fd, tmp_current = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(index.version)
+    os.replace(tmp_current, directory / "CURRENT")
+
+    snapshots = sorted(
+        (p for p in directory.iterdir() if (p / "manifest.json").exists()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old_path in snapshots[_SNAPSHOTS_KEPT:]:
+        if old_path != path:
+            shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def current_snapshot_version(directory):
+    try:
+        with open(Path(directory) / "CURRENT") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def read_listing_snapshot(directory):
+    """
+    Map the current snapshot in `directory`, as written by `write_listing_snapshot`.
+    """
+    version = current_snapshot_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No listing snapshot in {directory}")
+    return MappedListingIndex(Path(directory) / version)
+
+
+class ListingStore:
+    """
+    Holds the current `ListingIndex`. Readers take `store.index` once and use it throughout, so a refresh swapping in
+    a new snapshot never affects a request in flight. The store starts empty when listings are loaded in the
+    background.
+    """
+
+    def __init__(self, data=None):
+        self._index = None if data is None else ListingIndex(data)
+        self._lock = Lock()
+        self._listeners = []
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def ready(self):
+        return self._index is not None
+
+    def refresh(self, data):
+        with self._lock:
+            if self._index is None:
+                index = ListingIndex(data)
+            else:
+                index = self._index.updated(data)
+        return self.replace(index)
+
+    def replace(self, index):
+        with self._lock:
+            self._index = index
+        for listener in self._listeners:
+            listener(index)
+        return index
+
+    def subscribe(self, listener):
+        """
+        Call `listener` with every new index, starting with the current one if loaded.
+        """
+        self._listeners.append(listener)
+        if self._index is not None:
+            listener(self._index)
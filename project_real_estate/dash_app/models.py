@@ -1,5 +1,109 @@
+import hashlib
+import os
 import pickle
+from pathlib import Path
+from threading import Lock
 
-from project_real_estate.constants import SERIALIZED_MODEL_PATH
+from project_real_estate.constants import (
+    LOCAL_DATA_CACHE_DIR,
+    MODEL_ARTIFACT_PATH,
+    SERIALIZED_MODEL_PATH,
+)
+from project_real_estate.db import pull_data
+from project_real_estate.models.artifact import load_model
+from project_real_estate.models.forest import FlatForest
+from project_real_estate.models.prediction import PredictionCache
+from project_real_estate.models.sensitivity import PrecomputedCube
 
-rent_model = pickle.load(open(SERIALIZED_MODEL_PATH, "rb"))
+# Predictions are kept across restarts, so that only new or changed listings are predicted.
+_PREDICTION_CACHE_DIR = os.environ.get(
+    "PREDICTION_CACHE_DIR", LOCAL_DATA_CACHE_DIR / "predictions"
+)
+# Set RENT_MODEL_BACKEND to "flat" to predict with the flattened forest of the model artifact, see
+# `project_real_estate.models.forest`.
+_RENT_MODEL_BACKEND = os.environ.get("RENT_MODEL_BACKEND", "sklearn")
+# Set SENSITIVITY_DIR to look forecasts up in the grids written under it by `scripts.precompute_sensitivity`.
+_SENSITIVITY_DIR = os.environ.get("SENSITIVITY_DIR")
+
+_rent_model = None
+_prediction_cache = None
+# Modification time and cube of each precomputed grid, by path of its manifest.
+_precomputed_cubes = {}
+_lock = Lock()
+
+
+def load_rent_model():
+    """
+    Load the rent model on first use rather than at import, from its artifact if there is one and else from the
+    legacy pickle. The estimator of an artifact is itself only read, memory-mapped, on first prediction.
+    """
+    global _rent_model
+    with _lock:
+        if _rent_model is None:
+            if MODEL_ARTIFACT_PATH.exists():
+                _rent_model = load_model(
+                    MODEL_ARTIFACT_PATH, backend=_RENT_MODEL_BACKEND
+                )
+            else:
+                _rent_model = pickle.load(open(SERIALIZED_MODEL_PATH, "rb"))
+                if _RENT_MODEL_BACKEND == "flat":
+                    _rent_model._estimator = FlatForest.from_estimator(
+                        _rent_model._estimator
+                    )
+    return _rent_model
+
+
+def _model_key():
+    # Changes whenever the model is trained again.
+    if MODEL_ARTIFACT_PATH.exists():
+        with open(MODEL_ARTIFACT_PATH / "manifest.json", "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    stat = os.stat(SERIALIZED_MODEL_PATH)
+    return hashlib.sha1(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest()
+
+
+def get_prediction_cache():
+    global _prediction_cache
+    with _lock:
+        if _prediction_cache is None:
+            _prediction_cache = PredictionCache(_model_key(), _PREDICTION_CACHE_DIR)
+    return _prediction_cache
+
+
+def get_precomputed_cubes(version):
+    """
+    Precomputed grids of forecasts of the listings of `version`. A grid is only read again when it was written anew.
+
+    :return: List of `PrecomputedCube`.
+    """
+    global _precomputed_cubes
+    if _SENSITIVITY_DIR is None:
+        return []
+    with _lock:
+        cubes = {}
+        for path in sorted(Path(_SENSITIVITY_DIR).glob("*/grid.json")):
+            # Skip grids being written or replaced.
+            if path.parent.suffix in (".tmp", ".old"):
+                continue
+            try:
+                modified = path.stat().st_mtime_ns
+                cube = _precomputed_cubes.get(path)
+                if cube is None or cube[0] != modified:
+                    cube = (modified, PrecomputedCube(path.parent))
+            except OSError:
+                # Replaced or deleted by `save_cube` since the directory was listed.
+                continue
+            cubes[path] = cube
+        _precomputed_cubes = cubes
+    return [cube for _, cube in cubes.values() if cube.version == version]
+
+
+def load_listings():
+    """
+    Latest properties for sale, with their predicted rent revenue.
+    """
+    sales_data = pull_data("latest_sales", max_rows=None)
+    predicted_rent_revenue = load_rent_model().predict(
+        sales_data, cache=get_prediction_cache()
+    )
+    return sales_data.join(predicted_rent_revenue, how="inner")
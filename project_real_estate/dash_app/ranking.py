@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def top_k_indices(values, k):
+    """
+    Positions of the `k` largest values, in descending order. Ties are broken by position so that results are stable,
+    and NaNs are ranked last. Only the candidates selected by a partial partition are sorted.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    k = n if k is None else min(int(k), n)
+    if k <= 0:
+        return np.array([], dtype=int)
+
+    nan_mask = np.isnan(values)
+    keys = np.where(nan_mask, -np.inf, values)
+    if k < n:
+        kth_largest = np.partition(keys, n - k)[n - k]
+        candidates = np.flatnonzero(keys >= kth_largest)
+    else:
+        candidates = np.arange(n)
+
+    order = np.lexsort((candidates, nan_mask[candidates], -keys[candidates]))
+    return candidates[order[:k]]
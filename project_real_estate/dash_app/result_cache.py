@@ -0,0 +1,182 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+
+
+def normalize_key(*inputs):
+    """
+    Build a hashable cache key from callback inputs. Lists become tuples, numbers become floats and the city selection
+    is order-insensitive, so equivalent UI states share an entry.
+    """
+    normalized = []
+    for value in inputs:
+        if isinstance(value, (list, tuple, set)):
+            items = tuple(_normalize_scalar(v) for v in value)
+            if isinstance(value, set) or all(isinstance(v, str) for v in items):
+                items = tuple(sorted(set(items)))
+            normalized.append(items)
+        else:
+            normalized.append(_normalize_scalar(value))
+    return tuple(normalized)
+
+
+def _normalize_scalar(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of callback results, tied to a version of the underlying data. Entries can also be shared between
+    processes (e.g. gunicorn workers) through a local directory, holding at most `max_files` entries. Results are still
+    served from memory if the directory can not be written to.
+    """
+
+    def __init__(self, maxsize=256, directory=None, max_files=4096):
+        self._maxsize = maxsize
+        self._directory = directory
+        self._max_files = max_files
+        self._results = OrderedDict()
+        self._version = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Result cache is only kept in memory: {e}")
+                self._directory = None
+
+    def _check_version(self, version):
+        # Called with the lock held. A new data snapshot invalidates everything computed on the previous one.
+        if version != self._version:
+            self._results.clear()
+            self._version = version
+
+    def _path(self, key, version):
+        digest = hashlib.sha1(pickle.dumps(key)).hexdigest()
+        return os.path.join(self._directory, f"{version}-{digest}.pkl")
+
+    def get(self, key, version):
+        """
+        :return: The cached result, or None if there is no entry for `key` on this data version.
+        """
+        with self._lock:
+            self._check_version(version)
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+
+        result = self._read_from_disk(key, version)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, result)
+        return result
+
+    def set(self, key, version, result):
+        with self._lock:
+            self._check_version(version)
+            self._store(key, result)
+        self._write_to_disk(key, version, result)
+
+    def _store(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self._maxsize:
+            self._results.popitem(last=False)
+
+    def _read_from_disk(self, key, version):
+        if self._directory is None:
+            return None
+        path = self._path(key, version)
+        try:
+            with open(path, "rb") as f:
+                stored_key, result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Guard against digest collisions
+        if stored_key != key:
+            return None
+        try:
+            # Entries are evicted from the directory least recently used first.
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def _write_to_disk(self, key, version, result):
+        if self._directory is None:
+            return
+        # Write to a temporary file and rename so other workers never read a partial entry.
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key, version))
+        except OSError as e:
+            # E.g. a full disk or a read-only mount. The result is still cached in memory.
+            print(f"Could not write result to {self._directory}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        # Delete the least recently used entries past `max_files`, whichever worker wrote them.
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            if name.endswith(".pkl"):
+                path = os.path.join(self._directory, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    # Deleted by another worker
+                    pass
+        entries.sort()
+        for _, path in entries[: max(len(entries) - self._max_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def prune(self, version):
+        """
+        Delete on-disk entries written for any other data version.
+        """
+        if self._directory is None:
+            return
+        for name in os.listdir(self._directory):
+            if not name.startswith(f"{version}-") and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self._directory, name))
+                except OSError:
+                    pass
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._results),
+            "maxsize": self._maxsize,
+            "max_files": self._max_files,
+            "version": self._version,
+        }
@@ -1,20 +1,121 @@
+import functools
 import os
 
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import column, create_engine, inspect, literal_column, select, table
 
+# Types of the numeric columns scraped from Centris, so that every chunk of a table has the same dtypes even when a
+# chunk only holds missing values.
+_COLUMN_DTYPES = {
+    "price": "float64",
+    "rent": "float64",
+    "claimed_revenue": "float64",
+    "area": "float64",
+    "building_area": "float64",
+    "lot_area": "float64",
+    "latitude": "float64",
+    "longitude": "float64",
+    "num_bedrooms": "float64",
+    "num_bathrooms": "float64",
+}
 
-def pull_data(table_name, output_file=None, max_rows=10000):
-    db_uri = os.environ["DATABASE_URL"]
-    engine = create_engine(db_uri)
-    sql = f"SELECT * FROM {table_name}"
+
+@functools.lru_cache(maxsize=None)
+def get_engine():
+    """
+    Engine shared by every query of the process, so connections are pooled instead of re-established.
+    """
+    return create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
+
+
+def _build_query(
+    table_name,
+    columns=None,
+    cities=None,
+    start_date=None,
+    end_date=None,
+    property_types=None,
+    max_rows=None,
+):
+    selected = [column(c) for c in columns] if columns else [literal_column("*")]
+    query = select(selected).select_from(table(table_name))
+    # Filters are evaluated by the database, so that only matching rows are transferred.
+    if cities:
+        query = query.where(column("city").in_(list(cities)))
+    if property_types:
+        query = query.where(column("property_type").in_(list(property_types)))
+    if start_date is not None:
+        query = query.where(column("date") >= str(start_date))
+    if end_date is not None:
+        query = query.where(column("date") <= str(end_date))
     if max_rows is not None:
-        sql += f" LIMIT {max_rows};"
+        query = query.limit(max_rows)
+    return query
+
+
+def _empty_frame(table_name, columns=None):
+    """
+    :return: DataFrame without rows, with the columns a query of the table selects and the dtypes of `stream_data`.
+    """
+    if not columns:
+        columns = [c["name"] for c in inspect(get_engine()).get_columns(table_name)]
+    return pd.DataFrame(
+        {c: pd.Series(dtype=_COLUMN_DTYPES.get(c, "object")) for c in columns}
+    )
+
+
+def stream_data(table_name, chunksize=50000, **filters):
+    """
+    Read a table in chunks through a server-side cursor, so that memory use does not depend on the size of the table.
+
+    :param filters: `columns` to select, and optionally `cities`, `property_types`, `start_date`, `end_date` (inclusive,
+        compared to the scrape `date`) and `max_rows`.
+    :return: Iterator of DataFrames of at most `chunksize` rows.
+    """
+    query = _build_query(table_name, **filters)
+    with get_engine().connect() as connection:
+        connection = connection.execution_options(stream_results=True)
+        for chunk in pd.read_sql(sql=query, con=connection, chunksize=chunksize):
+            dtypes = {c: t for c, t in _COLUMN_DTYPES.items() if c in chunk.columns}
+            yield chunk.astype(dtypes)
+
+
+def export_data(table_name, output_file, chunksize=50000, **filters):
+    """
+    Write a table to a CSV file one chunk at a time.
+
+    :return: Number of rows written.
+    """
+    num_rows = 0
+    with open(output_file, "w") as f:
+        for i, chunk in enumerate(stream_data(table_name, chunksize, **filters)):
+            chunk.to_csv(f, index=False, header=i == 0)
+            num_rows += len(chunk)
+    print(f"{num_rows} rows written to {output_file}")
+    return num_rows
+
+
+def pull_data(table_name, output_file=None, max_rows=10000, **filters):
+    cache_dir = os.environ.get("LOCAL_DATA_CACHE_DIR")
+    if cache_dir:
+        # Imported here since the cache itself reads from the database.
+        from project_real_estate.local_cache import TableCache
 
-    data = pd.read_sql(sql=sql, con=engine)
+        cache = TableCache(cache_dir, table_name)
+        # Set LOCAL_DATA_CACHE_OFFLINE to only use the cached snapshot.
+        if not os.environ.get("LOCAL_DATA_CACHE_OFFLINE"):
+            cache.sync()
+        data = cache.read(max_rows=max_rows, **filters)
+    else:
+        chunks = list(stream_data(table_name, max_rows=max_rows, **filters))
+        if chunks:
+            data = pd.concat(chunks, ignore_index=True)
+        else:
+            # No chunk is read when no row matches.
+            data = _empty_frame(table_name, filters.get("columns"))
 
     if output_file is not None:
-        data.to_csv(open(output_file, "w"), index=False)
+        data.to_csv(output_file, index=False)
         print(f"Data written to {output_file}")
 
     return data
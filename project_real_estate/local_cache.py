@@ -0,0 +1,246 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from project_real_estate.db import get_engine, stream_data
+
+# Tables replaced on every scrape rather than appended to. Only their latest scrape date is kept.
+_SNAPSHOT_TABLES = {"latest_sales"}
+_STATE_FILE = "_state.json"
+
+
+class TableCache:
+    """
+    Local copy of a database table as Parquet files, partitioned by scrape `date`: one directory per date holding one
+    or more part files. Syncing only fetches the rows scraped since the cached (date, unique_id) high-water mark.
+    """
+
+    def __init__(self, cache_dir, table_name):
+        self.table_name = table_name
+        self.path = Path(cache_dir) / table_name
+        self._snapshot = table_name in _SNAPSHOT_TABLES
+
+    def _load_state(self):
+        try:
+            with open(self.path / _STATE_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"high_water_mark": None}
+
+    def _save_state(self, state):
+        tmp_path = self.path / f"{_STATE_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path / _STATE_FILE)
+
+    @property
+    def high_water_mark(self):
+        mark = self._load_state()["high_water_mark"]
+        return None if mark is None else tuple(mark)
+
+    def partitions(self):
+        if not self.path.exists():
+            return []
+        return sorted(p for p in self.path.iterdir() if p.is_dir())
+
+    def sync(self, chunksize=50000):
+        """
+        Fetch rows scraped since the high-water mark and append them to their date partitions. Rows of the high-water
+        date itself are fetched again, since more of them may have been scraped, and the ones already cached skipped.
+
+        :return: Number of new rows.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        high_water_mark = self.high_water_mark
+        start_date, known_ids = None, set()
+        if high_water_mark is not None:
+            start_date = high_water_mark[0]
+            partition = self.path / start_date
+            if partition.exists():
+                known_ids = set(
+                    self._read_partition(partition, ["unique_id"]).unique_id
+                )
+
+        num_rows = 0
+        sync_id = time.time_ns()
+        for chunk in stream_data(
+            self.table_name, chunksize=chunksize, start_date=start_date
+        ):
+            chunk = chunk[~chunk.unique_id.isin(known_ids)]
+            if chunk.empty:
+                continue
+            dates = chunk.date.astype(str)
+            for date, rows in chunk.groupby(dates):
+                partition = self.path / date
+                partition.mkdir(exist_ok=True)
+                rows.to_parquet(
+                    partition / f"part-{sync_id}-{num_rows}.parquet", index=False
+                )
+            num_rows += len(chunk)
+            chunk_mark = max(zip(dates, chunk.unique_id))
+            if high_water_mark is None or chunk_mark > high_water_mark:
+                high_water_mark = chunk_mark
+
+        if num_rows:
+            if self._snapshot:
+                # Only the latest scrape of a snapshot table is still in the database.
+                for partition in self.partitions()[:-1]:
+                    shutil.rmtree(partition)
+            self._save_state({"high_water_mark": list(high_water_mark)})
+        print(f"Synced {num_rows} new rows of `{self.table_name}` to {self.path}")
+        return num_rows
+
+    def rebuild(self, chunksize=50000):
+        shutil.rmtree(self.path, ignore_errors=True)
+        return self.sync(chunksize)
+
+    def _read_partition(self, partition, columns=None):
+        parts = sorted(partition.glob("*.parquet"))
+        read_columns = columns
+        if columns is not None and len(parts) > 1 and "unique_id" not in columns:
+            read_columns = list(columns) + ["unique_id"]
+        data = pd.concat(
+            [pd.read_parquet(part, columns=read_columns) for part in parts],
+            ignore_index=True,
+        )
+        if len(parts) > 1:
+            # An interrupted sync can leave rows in two parts.
+            data = data.drop_duplicates(subset="unique_id", keep="last")
+        return data.loc[:, columns] if columns is not None else data
+
+    def iter_partitions(
+        self,
+        columns=None,
+        cities=None,
+        start_date=None,
+        end_date=None,
+        property_types=None,
+    ):
+        """
+        Read the cached table one date partition at a time, oldest first, so that it does not need to fit in memory.
+        Partitions outside of the date range are not read.
+
+        :return: Iterator of (date, DataFrame).
+        """
+        filter_columns = [
+            c
+            for c, values in (("city", cities), ("property_type", property_types))
+            if values
+        ]
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns) + [
+                c for c in filter_columns if c not in columns
+            ]
+
+        for partition in self.partitions():
+            date = partition.name
+            if start_date is not None and date < str(start_date):
+                continue
+            if end_date is not None and date > str(end_date):
+                continue
+            data = self._read_partition(partition, read_columns)
+            if cities:
+                data = data[data.city.isin(cities)]
+            if property_types:
+                data = data[data.property_type.isin(property_types)]
+            if columns is not None:
+                data = data.loc[:, columns]
+            yield date, data
+
+    def read(
+        self,
+        columns=None,
+        cities=None,
+        start_date=None,
+        end_date=None,
+        property_types=None,
+        max_rows=None,
+    ):
+        """
+        Read the cached table, with the same filters as `project_real_estate.db.stream_data`. Partitions outside of the
+        date range are not read.
+        """
+        frames = []
+        num_rows = 0
+        for _, data in self.iter_partitions(
+            columns, cities, start_date, end_date, property_types
+        ):
+            frames.append(data)
+            num_rows += len(data)
+            if max_rows is not None and num_rows >= max_rows:
+                break
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        data = pd.concat(frames, ignore_index=True)
+        return data if max_rows is None else data.iloc[:max_rows]
+
+    def compact(self):
+        """
+        Merge the part files of each partition into one, dropping duplicated rows.
+        """
+        for partition in self.partitions():
+            parts = sorted(partition.glob("*.parquet"))
+            if len(parts) <= 1:
+                continue
+            data = self._read_partition(partition)
+            tmp_path = partition / "compacted.parquet.tmp"
+            data.to_parquet(tmp_path, index=False)
+            for part in parts:
+                part.unlink()
+            os.replace(tmp_path, partition / "part-0.parquet")
+            print(f"Compacted {len(parts)} files in {partition}")
+
+    def verify(self, against_database=False):
+        """
+        Check that every part file is readable with a consistent schema and that the high-water mark matches the
+        data. Optionally compare row counts per date with the database.
+
+        :return: List of problems found.
+        """
+        problems = []
+        schema = None
+        max_mark = None
+        counts = {}
+        for partition in self.partitions():
+            try:
+                data = self._read_partition(partition)
+            except Exception as e:
+                problems.append(f"{partition}: unreadable ({e})")
+                continue
+            if schema is None:
+                schema = list(data.columns)
+            elif list(data.columns) != schema:
+                problems.append(f"{partition}: columns differ from other partitions")
+            if (data.date.astype(str) != partition.name).any():
+                problems.append(f"{partition}: rows from another date")
+            if not data.empty:
+                mark = max(zip(data.date.astype(str), data.unique_id))
+                max_mark = mark if max_mark is None else max(mark, max_mark)
+            counts[partition.name] = len(data)
+
+        if max_mark != self.high_water_mark:
+            problems.append(
+                f"High-water mark {self.high_water_mark} does not match cached data {max_mark}"
+            )
+
+        if against_database:
+            database_counts = pd.read_sql(
+                f"SELECT date, COUNT(*) AS num_rows FROM {self.table_name} GROUP BY date",
+                con=get_engine(),
+            )
+            for date, num_rows in zip(
+                database_counts.date.astype(str), database_counts.num_rows
+            ):
+                if self._snapshot and date != max(counts, default=None):
+                    continue
+                if counts.get(date, 0) != num_rows:
+                    problems.append(
+                        f"{date}: {counts.get(date, 0)} cached rows, {num_rows} in the database"
+                    )
+        return problems
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from threading import Lock
+
+import joblib
+
+from project_real_estate.models.forest import FlatForest
+from project_real_estate.models.preprocessor import PropertyPreprocessor
+from project_real_estate.models.rent_estimator import SKLearnRentEstimator
+
+# Version of the layout of model artifacts, bumped whenever older code could not read newer artifacts.
+ARTIFACT_VERSION = 1
+_MANIFEST_FILE = "manifest.json"
+_ESTIMATOR_FILE = "estimator.joblib"
+_FOREST_DIRECTORY = "forest"
+
+
+class LazyEstimator:
+    """
+    Estimator of an artifact, only read from disk on first use. Its arrays can be memory-mapped rather than read, so
+    that processes serving the same artifact share its pages.
+    """
+
+    def __init__(self, path, mmap_mode="r"):
+        self.path = Path(path)
+        self.mmap_mode = mmap_mode
+        self._estimator = None
+        self._lock = Lock()
+
+    @property
+    def loaded(self):
+        return self._estimator is not None
+
+    def load(self):
+        with self._lock:
+            if self._estimator is None:
+                self._estimator = joblib.load(self.path, mmap_mode=self.mmap_mode)
+        return self._estimator
+
+    def __getstate__(self):
+        # Pickled as a reference to the artifact, e.g. to be sent to worker processes.
+        return {"path": self.path, "mmap_mode": self.mmap_mode}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def predict(self, X):
+        return self.load().predict(X)
+
+    def __getattr__(self, name):
+        # Only reached for attributes of the estimator itself, e.g. `estimators_`.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+def save_model(model, path):
+    """
+    Write a fitted `SKLearnRentEstimator` as an artifact: a directory holding a JSON manifest, with the vocabularies of
+    the preprocessor, and the estimator dumped uncompressed by joblib so that its arrays can be memory-mapped.
+
+    :param path: Directory of the artifact, replaced if it exists.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    joblib.dump(model._estimator, tmp_path / _ESTIMATOR_FILE)
+    try:
+        forest = FlatForest.from_estimator(model._estimator)
+    except (AttributeError, ValueError):
+        # Not a forest of regression trees.
+        forest = None
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "created": time.time(),
+        "random_seed": model._random_seed,
+        "preprocessor": model._preprocessor.get_state(),
+        "estimator": {
+            "file": _ESTIMATOR_FILE,
+            "class": type(model._estimator).__name__,
+        },
+    }
+    if forest is not None:
+        manifest["forest"] = {
+            "directory": _FOREST_DIRECTORY,
+            **forest.save(tmp_path / _FOREST_DIRECTORY),
+        }
+    with open(tmp_path / _MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the complete artifact in, so that a reader never sees one half written.
+    old_path = path.with_name(f"{path.name}.old")
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_manifest(path):
+    with open(Path(path) / _MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    if manifest["version"] > ARTIFACT_VERSION:
+        raise ValueError(
+            f"Model artifact {path} has version {manifest['version']}, only up to {ARTIFACT_VERSION} is supported"
+        )
+    return manifest
+
+
+def load_model(path, mmap_mode="r", backend="sklearn"):
+    """
+    Read a model artifact written by `save_model`. The preprocessor is restored right away from the manifest, while
+    the estimator is only loaded on first prediction.
+
+    :param mmap_mode: Mode to memory-map the arrays of the estimator with, or None to read them in memory.
+    :param backend: "sklearn" to predict with the estimator itself, or "flat" with its `FlatForest`, if it is a forest.
+    :return: `SKLearnRentEstimator`.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    preprocessor = PropertyPreprocessor.from_state(manifest["preprocessor"])
+    if backend == "flat":
+        if "forest" not in manifest:
+            raise ValueError(f"Model artifact {path} has no flat forest")
+        estimator = FlatForest.load(
+            path / manifest["forest"]["directory"],
+            depth=manifest["forest"]["depth"],
+            mmap_mode=mmap_mode,
+        )
+    elif backend == "sklearn":
+        estimator = LazyEstimator(path / manifest["estimator"]["file"], mmap_mode)
+    else:
+        raise ValueError(f"Unknown backend {backend}")
+    model = SKLearnRentEstimator(preprocessor=preprocessor, estimator=estimator)
+    model._random_seed = manifest["random_seed"]
+    return model
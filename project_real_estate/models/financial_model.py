@@ -1,6 +1,163 @@
+from collections import OrderedDict
+from threading import Lock
+
 import numpy as np
 
 _MORTGAGE_PREMIUM_SCALE = {0.05: 0.04, 0.1: 0.031, 0.15: 0.028, 0.2: 0}
+_OUTPUT_COLUMNS = [
+    "investment",
+    "mortgage_premium",
+    "revenue",
+    "net_income",
+    "net_cash",
+    "cash_return",
+    "ROE",
+    "cap_rate",
+]
+
+
+class AmortizationScheduleCache:
+    """
+    LRU cache of yearly interest and principal payments for a loan of 1, keyed by loan terms. Payments are proportional
+    to the loan principal, so a schedule is shared by every property financed on the same terms.
+    """
+
+    def __init__(self, maxsize=128):
+        self._maxsize = maxsize
+        self._schedules = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, interest_rate, amortization, forecast_horizon):
+        """
+        :return: Read-only `(interest, principal)` arrays of length `forecast_horizon`.
+        """
+        key = (float(interest_rate), int(amortization), int(forecast_horizon))
+        with self._lock:
+            schedule = self._schedules.get(key)
+            if schedule is not None:
+                self._schedules.move_to_end(key)
+                self.hits += 1
+                return schedule
+            self.misses += 1
+
+        periods = np.arange(1, key[2] + 1)
+        interest = np.ipmt(rate=key[0], per=periods, nper=key[1], pv=-1)
+        principal = np.ppmt(rate=key[0], per=periods, nper=key[1], pv=-1)
+        interest.setflags(write=False)
+        principal.setflags(write=False)
+        schedule = (interest, principal)
+
+        with self._lock:
+            self._schedules[key] = schedule
+            if len(self._schedules) > self._maxsize:
+                self._schedules.popitem(last=False)
+        return schedule
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._schedules),
+            "maxsize": self._maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+schedule_cache = AmortizationScheduleCache()
+
+# TODO do something smarter for income tax rate.
+_INCOME_TAX_RATE = 0.3
+
+
+# Steps of the batched forecast, shared by `SimpleFinancialModel.forecast` and the incremental forecasts of
+# `forecast_graph`, which reads the dependencies of each step from its argument names. Yearly quantities are
+# (properties x forecast years) matrices.
+
+
+def _mortgage_premium_rate(downpayment):
+    premium = _MORTGAGE_PREMIUM_SCALE.get(downpayment)
+    if premium is None:
+        raise ValueError(
+            f"Downpayment must be one of {list(_MORTGAGE_PREMIUM_SCALE.keys())}. Got `{downpayment}`"
+        )
+    return premium
+
+
+def _total_investment(price, downpayment, closing_fees):
+    return price * downpayment + closing_fees * price
+
+
+def _loan_principal(price, downpayment, mortgage_premium_rate):
+    return (1 + mortgage_premium_rate) * price - price * downpayment
+
+
+def _property_expense_ratio(year_built, expense_ratio):
+    # Multiply expense ratio by 1.5 for older properties
+    return np.where(year_built > 2010, expense_ratio, expense_ratio * 1.5)
+
+
+def _property_taxes(price, property_tax_rate):
+    return property_tax_rate * price
+
+
+def _gross_revenue(monthly_rent, vacancy, rate_rent_increase, forecast_horizon):
+    rent_growth = (1 + rate_rent_increase) ** np.arange(forecast_horizon)
+    return np.outer(monthly_rent * 12 * (1 - vacancy), rent_growth)
+
+
+def _expenses(gross_revenue, property_expense_ratio):
+    return property_expense_ratio[:, None] * gross_revenue
+
+
+def _interest_payments(loan_principal, unit_schedule):
+    # Payments are proportional to the principal, so scale the schedule of a loan of 1.
+    return np.outer(loan_principal, unit_schedule[0])
+
+
+def _principal_repayments(loan_principal, unit_schedule):
+    return np.outer(loan_principal, unit_schedule[1])
+
+
+def _taxable_income(gross_revenue, expenses, interest_payments, property_taxes):
+    return gross_revenue - expenses - interest_payments - property_taxes[:, None]
+
+
+def _net_income(taxable_income, income_tax_rate):
+    income_tax = np.clip(income_tax_rate * taxable_income, 0, None)
+    return taxable_income - income_tax
+
+
+def _net_cash_flow(net_income, principal_repayments, yearly_reserves):
+    return net_income - principal_repayments - yearly_reserves
+
+
+def _income_outputs(net_income):
+    return {"net_income": net_income.mean(axis=1)}
+
+
+def _cash_outputs(net_cash_flow, principal_repayments, total_investment):
+    net_equity = net_cash_flow + principal_repayments
+    return {
+        "net_cash": net_cash_flow.mean(axis=1),
+        "cash_return": (net_cash_flow / total_investment[:, None]).mean(axis=1),
+        "ROE": (net_equity / total_investment[:, None]).mean(axis=1),
+    }
+
+
+def _revenue_outputs(price, gross_revenue, expenses, property_taxes):
+    cap_rate = (gross_revenue - property_taxes[:, None] - expenses) / price[:, None]
+    return {"revenue": gross_revenue.mean(axis=1), "cap_rate": cap_rate.mean(axis=1)}
+
+
+def _mortgage_premium(price, mortgage_premium_rate):
+    return mortgage_premium_rate * price
 
 
 class TrivialFinancialModel:
@@ -21,6 +178,7 @@ class SimpleFinancialModel:
         rate_rent_increase: float,
         expense_ratio: float,
         yearly_reserves: int,
+        schedule_cache: AmortizationScheduleCache = schedule_cache,
     ):
         self._downpayment = downpayment
         self._closing_fees = closing_fees
@@ -30,18 +188,14 @@ class SimpleFinancialModel:
         self._rate_rent_increase = rate_rent_increase
         self._expense_ratio = expense_ratio
         self._yearly_savings = yearly_reserves
+        self._schedule_cache = schedule_cache
 
-        self._mortgage_premium = _MORTGAGE_PREMIUM_SCALE.get(self._downpayment)
-        if self._mortgage_premium is None:
-            raise ValueError(
-                f"Downpayment must be one of {list(_MORTGAGE_PREMIUM_SCALE.keys())}. Got `{self._downpayment}`"
-            )
+        self._mortgage_premium = _mortgage_premium_rate(self._downpayment)
 
         self._forecast_horizon = forecast_horizon
         # TODO automatically lookup property tax rate by city.
         self._property_tax = property_tax_rate
-        # TODO do something smarter for income tax rate.
-        self._income_tax_rate = 0.3
+        self._income_tax_rate = _INCOME_TAX_RATE
 
     def _forecast_gross_revenue(self, monthly_rent):
         # Income
@@ -118,17 +272,123 @@ class SimpleFinancialModel:
             cap_rate.mean(),
         )
 
+    @property
+    def parameters(self):
+        """
+        Parameters of the model by argument of the constructor, besides the schedule cache, e.g. to build a variant of
+        it with `SimpleFinancialModel(**{**model.parameters, "vacancy": 0.05})`.
+        """
+        return {
+            "downpayment": self._downpayment,
+            "closing_fees": self._closing_fees,
+            "interest_rate": self._interest_rate,
+            "amortization": self._amortization,
+            "forecast_horizon": self._forecast_horizon,
+            "vacancy": self._vacancy,
+            "property_tax_rate": self._property_tax,
+            "rate_rent_increase": self._rate_rent_increase,
+            "expense_ratio": self._expense_ratio,
+            "yearly_reserves": self._yearly_savings,
+        }
+
+    @property
+    def income_tax_rate(self):
+        return self._income_tax_rate
+
+    @property
+    def mortgage_premium_rate(self):
+        """
+        Mortgage insurance premium, as a share of the price, for the downpayment of the model.
+        """
+        return self._mortgage_premium
+
+    def property_terms(self, price, year_built):
+        """
+        Quantities of each property which do not change from one year to the next.
+
+        :return: Arrays of the total investment, loan principal, expense ratio and yearly property taxes.
+        """
+        price = np.asarray(price, dtype=float)
+        year_built = np.asarray(year_built, dtype=float)
+        return (
+            _total_investment(price, self._downpayment, self._closing_fees),
+            _loan_principal(price, self._downpayment, self._mortgage_premium),
+            _property_expense_ratio(year_built, self._expense_ratio),
+            _property_taxes(price, self._property_tax),
+        )
+
+    def forecast(self, price, monthly_rent, year_built):
+        """
+        Forecast every property at once. Each yearly quantity is a (properties x forecast years) matrix, so the whole
+        portfolio is evaluated with a handful of NumPy operations instead of one Python call per property.
+
+        :return: Dict mapping each output column to an array with one value per property.
+        """
+        price = np.asarray(price, dtype=float)
+        monthly_rent = np.asarray(monthly_rent, dtype=float)
+        (
+            total_investment,
+            loan_principal,
+            property_expense_ratio,
+            property_taxes,
+        ) = self.property_terms(price, year_built)
+
+        yearly_gross_revenue = _gross_revenue(
+            monthly_rent,
+            self._vacancy,
+            self._rate_rent_increase,
+            self._forecast_horizon,
+        )
+
+        # Expenses
+        expenses = _expenses(yearly_gross_revenue, property_expense_ratio)
+        unit_schedule = self._schedule_cache.get(
+            self._interest_rate, self._amortization, self._forecast_horizon
+        )
+        interest_payments = _interest_payments(loan_principal, unit_schedule)
+
+        # Tax
+        taxable_income = _taxable_income(
+            yearly_gross_revenue, expenses, interest_payments, property_taxes
+        )
+        net_income = _net_income(taxable_income, self._income_tax_rate)
+
+        principal_repayments = _principal_repayments(loan_principal, unit_schedule)
+        net_cash_flow = _net_cash_flow(
+            net_income, principal_repayments, self._yearly_savings
+        )
+
+        outputs = {
+            "investment": total_investment,
+            "mortgage_premium": _mortgage_premium(price, self._mortgage_premium),
+            **_revenue_outputs(price, yearly_gross_revenue, expenses, property_taxes),
+            **_income_outputs(net_income),
+            **_cash_outputs(net_cash_flow, principal_repayments, total_investment),
+        }
+        return {column: outputs[column] for column in _OUTPUT_COLUMNS}
+
+    def predict_arrays(self, properties):
+        """
+        Like `predict`, but return the outputs as a dict of arrays aligned with `properties` instead of writing them
+        into the frame.
+        """
+        return self.forecast(
+            properties["price"].values,
+            properties["predicted_rent_revenue"].values,
+            properties["year_built"].values,
+        )
+
     def predict(self, properties):
-        properties[
-            [
-                "investment",
-                "mortgage_premium",
-                "revenue",
-                "net_income",
-                "net_cash",
-                "cash_return",
-                "ROE",
-                "cap_rate",
-            ]
-        ] = properties.apply(self._predict, axis=1, result_type="expand")
+        outputs = self.predict_arrays(properties)
+        for column in _OUTPUT_COLUMNS:
+            properties[column] = outputs[column]
+        return properties
+
+    def predict_rowwise(self, properties):
+        """
+        Reference implementation of `predict`, forecasting one property at a time. Kept to check the batched engine.
+        """
+        properties[_OUTPUT_COLUMNS] = properties.apply(
+            self._predict, axis=1, result_type="expand"
+        )
         return properties
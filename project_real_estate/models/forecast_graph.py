@@ -0,0 +1,254 @@
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from project_real_estate.models.financial_model import (
+    _INCOME_TAX_RATE,
+    _OUTPUT_COLUMNS,
+    _cash_outputs,
+    _expenses,
+    _gross_revenue,
+    _income_outputs,
+    _interest_payments,
+    _loan_principal,
+    _mortgage_premium,
+    _mortgage_premium_rate,
+    _net_cash_flow,
+    _net_income,
+    _principal_repayments,
+    _property_expense_ratio,
+    _property_taxes,
+    _revenue_outputs,
+    _taxable_income,
+    _total_investment,
+    schedule_cache,
+)
+
+# Parameters of `SimpleFinancialModel`, the inputs of the graph besides the listings.
+PARAMETERS = [
+    "downpayment",
+    "closing_fees",
+    "interest_rate",
+    "amortization",
+    "forecast_horizon",
+    "vacancy",
+    "property_tax_rate",
+    "rate_rent_increase",
+    "expense_ratio",
+    "yearly_reserves",
+]
+
+
+def _unit_schedule(interest_rate, amortization, forecast_horizon):
+    return schedule_cache.get(interest_rate, amortization, forecast_horizon)
+
+
+# Each node is computed by a step of `SimpleFinancialModel.forecast`, a function of the nodes and inputs it depends on.
+_NODES = OrderedDict(
+    [
+        ("mortgage_premium_rate", _mortgage_premium_rate),
+        ("total_investment", _total_investment),
+        ("loan_principal", _loan_principal),
+        ("property_expense_ratio", _property_expense_ratio),
+        ("gross_revenue", _gross_revenue),
+        ("expenses", _expenses),
+        ("unit_schedule", _unit_schedule),
+        ("interest_payments", _interest_payments),
+        ("principal_repayments", _principal_repayments),
+        ("property_taxes", _property_taxes),
+        ("taxable_income", _taxable_income),
+        ("net_income", _net_income),
+        ("net_cash_flow", _net_cash_flow),
+        ("income_outputs", _income_outputs),
+        ("cash_outputs", _cash_outputs),
+        ("revenue_outputs", _revenue_outputs),
+        ("mortgage_premium", _mortgage_premium),
+    ]
+)
+# Nodes and inputs each node is computed from, passed in this order.
+_DEPENDENCIES = {
+    "mortgage_premium_rate": ["downpayment"],
+    "total_investment": ["price", "downpayment", "closing_fees"],
+    "loan_principal": ["price", "downpayment", "mortgage_premium_rate"],
+    "property_expense_ratio": ["year_built", "expense_ratio"],
+    "gross_revenue": [
+        "monthly_rent",
+        "vacancy",
+        "rate_rent_increase",
+        "forecast_horizon",
+    ],
+    "expenses": ["gross_revenue", "property_expense_ratio"],
+    "unit_schedule": ["interest_rate", "amortization", "forecast_horizon"],
+    "interest_payments": ["loan_principal", "unit_schedule"],
+    "principal_repayments": ["loan_principal", "unit_schedule"],
+    "property_taxes": ["price", "property_tax_rate"],
+    "taxable_income": [
+        "gross_revenue",
+        "expenses",
+        "interest_payments",
+        "property_taxes",
+    ],
+    "net_income": ["taxable_income", "income_tax_rate"],
+    "net_cash_flow": ["net_income", "principal_repayments", "yearly_reserves"],
+    "income_outputs": ["net_income"],
+    "cash_outputs": ["net_cash_flow", "principal_repayments", "total_investment"],
+    "revenue_outputs": ["price", "gross_revenue", "expenses", "property_taxes"],
+    "mortgage_premium": ["price", "mortgage_premium_rate"],
+}
+# Inputs of the graph besides the nodes.
+_INPUTS = ["price", "monthly_rent", "year_built", "income_tax_rate"] + PARAMETERS
+assert list(_DEPENDENCIES) == list(_NODES)
+for _index, (_name, _dependencies) in enumerate(_DEPENDENCIES.items()):
+    # Nodes are listed after the nodes they depend on, which `_downstream` relies on.
+    _unknown = set(_dependencies).difference(_INPUTS, list(_NODES)[:_index])
+    assert not _unknown, f"{_name} depends on unknown or later nodes {sorted(_unknown)}"
+
+
+def _downstream(inputs):
+    """
+    :return: Set of the nodes depending, directly or not, on any of `inputs`.
+    """
+    stale = set(inputs)
+    for name, dependencies in _DEPENDENCIES.items():
+        if stale.intersection(dependencies):
+            stale.add(name)
+    return stale.difference(inputs)
+
+
+class ForecastSession:
+    """
+    Forecast of a fixed set of listings, split into a graph of intermediate arrays: gross revenue, expenses, interest
+    and principal schedules, taxes, cash flow, etc. Every node is kept between forecasts, and only the nodes downstream
+    of the parameters which changed are computed again, e.g. only the cash flow when the yearly reserves change.
+    Forecasts are the same as `SimpleFinancialModel.forecast`.
+    """
+
+    def __init__(self, price, monthly_rent, year_built):
+        self._values = {
+            "price": np.asarray(price, dtype=float),
+            "monthly_rent": np.asarray(monthly_rent, dtype=float),
+            "year_built": np.asarray(year_built, dtype=float),
+            "income_tax_rate": _INCOME_TAX_RATE,
+        }
+        self._lock = Lock()
+        # Nodes computed by the last forecast.
+        self.computed = []
+
+    def _evaluate(self, name):
+        # Called with the lock held.
+        if name not in self._values:
+            arguments = [
+                self._evaluate(dependency) for dependency in _DEPENDENCIES[name]
+            ]
+            self._values[name] = _NODES[name](*arguments)
+            self.computed.append(name)
+        return self._values[name]
+
+    def forecast(self, **parameters):
+        """
+        :param parameters: Every parameter of `SimpleFinancialModel`, besides the schedule cache.
+        :return: Dict mapping each output column to an array with one value per listing.
+        """
+        missing = set(PARAMETERS).difference(parameters)
+        if missing:
+            raise TypeError(f"Missing parameters {sorted(missing)}")
+        with self._lock:
+            changed = [
+                name
+                for name in PARAMETERS
+                if name not in self._values or self._values[name] != parameters[name]
+            ]
+            for name in _downstream(changed):
+                self._values.pop(name, None)
+            for name in changed:
+                self._values[name] = parameters[name]
+            self.computed = []
+
+            outputs = {
+                "investment": self._evaluate("total_investment"),
+                "mortgage_premium": self._evaluate("mortgage_premium"),
+                **self._evaluate("revenue_outputs"),
+                **self._evaluate("income_outputs"),
+                **self._evaluate("cash_outputs"),
+            }
+        return {column: outputs[column] for column in _OUTPUT_COLUMNS}
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes held by the arrays of the session.
+        """
+        with self._lock:
+            values = list(self._values.values())
+        total = 0
+        for value in values:
+            arrays = value.values() if isinstance(value, dict) else [value]
+            total += sum(
+                array.nbytes for array in arrays if isinstance(array, np.ndarray)
+            )
+        return total
+
+
+class ForecastSessionCache:
+    """
+    LRU cache of `ForecastSession`, keyed by the listings they forecast, e.g. the listing index and the filters. A
+    session holds seven (listings x forecast years) arrays, so the cache is bounded by the bytes its sessions hold
+    rather than their number, and a selection too large to fit is forecast without being kept.
+    """
+
+    def __init__(self, max_bytes=2 ** 29):
+        self._max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def forecast(self, key, listings, **parameters):
+        """
+        :param listings: Function returning the (price, monthly_rent, year_built) arrays of the listings, only called
+            to start a new session.
+        :param parameters: Parameters of `ForecastSession.forecast`.
+        """
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if session is None:
+            session = ForecastSession(*listings())
+            with self._lock:
+                session = self._sessions.setdefault(key, session)
+
+        outputs = session.forecast(**parameters)
+        # The size of a session is only known once it holds the arrays of a forecast.
+        with self._lock:
+            sizes = {key: session.nbytes for key, session in self._sessions.items()}
+            total = sum(sizes.values())
+            while total > self._max_bytes:
+                evicted, _ = self._sessions.popitem(last=False)
+                total -= sizes[evicted]
+        return outputs
+
+    def prune(self, listings):
+        """
+        Drop the sessions of any other listings than `listings`, the first element of their keys.
+        """
+        with self._lock:
+            for key in list(self._sessions):
+                if key[0] is not listings:
+                    del self._sessions[key]
+
+    def info(self):
+        with self._lock:
+            nbytes = sum(session.nbytes for session in self._sessions.values())
+            size = len(self._sessions)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": size,
+            "nbytes": nbytes,
+            "max_bytes": self._max_bytes,
+        }
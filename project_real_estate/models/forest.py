@@ -0,0 +1,188 @@
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+try:
+    import numba
+    from numba import prange
+except ImportError:
+    numba = None
+    prange = range
+
+# Nodes of all trees, one after the other. A node fits in 24 bytes, so that visiting it reads one cache line.
+NODE_DTYPE = np.dtype(
+    [
+        ("left", np.int32),
+        ("right", np.int32),
+        ("feature", np.int32),
+        ("threshold", np.float64),
+    ],
+    align=True,
+)
+_ARRAYS = ["nodes", "value", "roots"]
+_TREE_LEAF = -1
+# Numba's default threading layer does not support parallel functions called from several threads at once.
+_parallel_lock = Lock()
+# Number of rows from which the NumPy backend evaluates one tree at a time rather than all of them at once.
+_NUMPY_TREE_AT_A_TIME_ROWS = 1000
+
+
+def _predict_blocks(X, nodes, value, roots, block_size):
+    # Each block of rows goes through one tree at a time, while the nodes of the tree are in cache. Leaves are their
+    # own children. Trees are summed in order, as sklearn does.
+    predictions = np.zeros(X.shape[0])
+    num_blocks = (X.shape[0] + block_size - 1) // block_size
+    for block in prange(num_blocks):
+        start = block * block_size
+        end = min(start + block_size, X.shape[0])
+        for t in range(roots.shape[0]):
+            for i in range(start, end):
+                index = roots[t]
+                node = nodes[index]
+                while node.left != index:
+                    if X[i, node.feature] <= node.threshold:
+                        index = node.left
+                    else:
+                        index = node.right
+                    node = nodes[index]
+                predictions[i] += value[index]
+    return predictions / roots.shape[0]
+
+
+if numba is not None:
+    _predict_blocks_in_parallel = numba.njit(nogil=True, parallel=True)(_predict_blocks)
+    _predict_blocks = numba.njit(nogil=True)(_predict_blocks)
+
+
+class FlatForest:
+    """
+    Fitted regression forest stored as flat arrays of nodes, all trees one after the other, and evaluated over a whole
+    batch at once: compiled with numba if it is installed, else level by level with NumPy. Predictions are the same as
+    sklearn's.
+    """
+
+    def __init__(self, nodes, value, roots, depth):
+        """
+        :param nodes: Array of `NODE_DTYPE`. Leaves are their own children.
+        :param value: Prediction of each node.
+        :param roots: Index of the root node of each tree.
+        :param depth: Depth of the deepest tree.
+        """
+        self.nodes = nodes
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """
+        :param forest: Fitted single output sklearn forest regressor, e.g. `RandomForestRegressor`.
+        """
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only forests with a single output can be flattened")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        nodes = np.empty(offsets[-1], dtype=NODE_DTYPE)
+        for tree, offset in zip(trees, offsets):
+            tree_nodes = nodes[offset : offset + tree.node_count]
+            indices = np.arange(tree.node_count)
+            is_leaf = tree.children_left == _TREE_LEAF
+            tree_nodes["left"] = np.where(is_leaf, indices, tree.children_left) + offset
+            tree_nodes["right"] = (
+                np.where(is_leaf, indices, tree.children_right) + offset
+            )
+            tree_nodes["feature"] = np.where(is_leaf, 0, tree.feature)
+            tree_nodes["threshold"] = tree.threshold
+        return cls(
+            nodes=nodes,
+            value=np.concatenate([tree.value[:, 0, 0] for tree in trees]).astype(
+                np.float64
+            ),
+            roots=offsets[:-1].astype(np.int32),
+            depth=max(tree.max_depth for tree in trees),
+        )
+
+    def save(self, directory):
+        """
+        Write each array to its own `.npy` file, so that they can be memory-mapped.
+
+        :return: Parameters to `load` the forest with besides its arrays.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        return {"depth": int(self.depth)}
+
+    @classmethod
+    def load(cls, directory, depth, mmap_mode="r"):
+        directory = Path(directory)
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        }
+        return cls(depth=depth, **arrays)
+
+    def _descend(self, X, rows, nodes):
+        # Move rows down one level at a time. Leaves loop on themselves, so every row ends on a leaf after `depth` levels.
+        feature, threshold = self.nodes["feature"], self.nodes["threshold"]
+        left, right = self.nodes["left"], self.nodes["right"]
+        for _ in range(self.depth):
+            go_left = X[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+        return nodes
+
+    def _predict_numpy(self, X, chunk_size):
+        predictions = np.zeros(len(X))
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start : start + chunk_size]
+            if len(chunk) < _NUMPY_TREE_AT_A_TIME_ROWS:
+                # Few rows: move down every tree at once, in few NumPy calls.
+                leaves = self._descend(
+                    chunk,
+                    np.arange(len(chunk))[:, None],
+                    np.broadcast_to(self.roots, (len(chunk), len(self.roots))),
+                )
+                tree_values = (self.value[leaves[:, t]] for t in range(len(self.roots)))
+            else:
+                # Many rows: one tree at a time, while its nodes are in cache.
+                rows = np.arange(len(chunk))
+                tree_values = (
+                    self.value[self._descend(chunk, rows, np.full(len(chunk), root))]
+                    for root in self.roots
+                )
+            # Trees are summed in order, as sklearn does.
+            for values in tree_values:
+                predictions[start : start + chunk_size] += values
+        return predictions / len(self.roots)
+
+    def predict(self, X, backend=None, chunk_size=20000, block_size=32768):
+        """
+        :param X: Features, in the order the forest was fitted on.
+        :param backend: "numba", "numpy", or None for numba if it is installed.
+        :param chunk_size: Number of rows evaluated at once by the NumPy backend, which holds an array of
+            `chunk_size` x number of trees nodes.
+        :param block_size: Number of rows evaluated one tree at a time by each thread of the numba backend.
+        """
+        # sklearn compares features as 32 bit floats.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if backend is None:
+            backend = "numpy" if numba is None else "numba"
+        if backend == "numba":
+            if numba is None:
+                raise ImportError(
+                    "The numba backend requires numba, installed with the `fast` extra"
+                )
+            if len(X) <= block_size:
+                return _predict_blocks(
+                    X, self.nodes, self.value, self.roots, block_size
+                )
+            with _parallel_lock:
+                return _predict_blocks_in_parallel(
+                    X, self.nodes, self.value, self.roots, block_size
+                )
+        if backend == "numpy":
+            return self._predict_numpy(X, chunk_size)
+        raise ValueError(f"Unknown backend {backend}")
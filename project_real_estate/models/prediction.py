@@ -0,0 +1,176 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+
+def feature_hashes(X):
+    """
+    Hash of each row of features. Features are cast to floats first, so that a column inferred as integers in one
+    batch and as floats in another hashes the same.
+    """
+    return pd.util.hash_pandas_object(X.astype(np.float64), index=False).values
+
+
+def predict_in_chunks(estimator, X, chunk_size=10000, max_workers=None):
+    """
+    Predict chunks of rows in parallel threads. Trees are evaluated without holding the GIL.
+
+    :return: Array of predictions.
+    """
+    n_jobs = getattr(estimator, "n_jobs", None)
+    if n_jobs not in (None, 1):
+        # The estimator already spreads each prediction over its own threads, e.g. a forest pickled with n_jobs=-1.
+        # Running chunks in parallel on top of it would start a thread per core for each chunk.
+        max_workers = 1
+    if len(X) <= chunk_size or max_workers == 1:
+        return estimator.predict(X)
+    chunks = [X.iloc[i : i + chunk_size] for i in range(0, len(X), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return np.concatenate(list(executor.map(estimator.predict, chunks)))
+
+
+class PredictionCache:
+    """
+    Average rent predicted for each listing, keyed by its MLS number and the hash of its features, so that only new or
+    changed listings are predicted again. Predictions are only valid for one model, identified by `model_key`, and are
+    persisted to a Parquet file under `directory` if given. The cache is only kept in memory if the file cannot be read
+    or written, e.g. without pyarrow.
+    """
+
+    def __init__(self, model_key, directory=None):
+        self.model_key = model_key
+        self.path = None
+        if directory is not None:
+            self.path = Path(directory) / f"predictions-{model_key}.parquet"
+        self._predictions = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        # Called with the lock held.
+        if self._predictions is None:
+            if self.path is not None and self.path.exists():
+                try:
+                    self._predictions = pd.read_parquet(self.path).set_index("mls_id")
+                except ImportError as e:
+                    self._disable_persistence(e)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable prediction cache {self.path}: {e}")
+            if self._predictions is None:
+                self._predictions = pd.DataFrame(
+                    {
+                        "feature_hash": np.array([], dtype=np.uint64),
+                        "average_rent": np.array([], dtype=np.float64),
+                    },
+                    index=pd.Index([], name="mls_id", dtype=object),
+                )
+        return self._predictions
+
+    def _disable_persistence(self, error):
+        print(f"Prediction cache {self.path} is only kept in memory: {error}")
+        self.path = None
+
+    def lookup(self, mls_ids, hashes):
+        """
+        :return: Array of the cached predictions, NaN where there is none for the features.
+        """
+        with self._lock:
+            predictions = self._load()
+        positions = predictions.index.get_indexer(mls_ids)
+        known = positions >= 0
+        positions = positions[known]
+        average_rent = np.full(len(mls_ids), np.nan)
+        found = predictions.feature_hash.values[positions] == hashes[known]
+        average_rent[np.flatnonzero(known)[found]] = predictions.average_rent.values[
+            positions[found]
+        ]
+        num_hits = int(found.sum())
+        with self._lock:
+            self.hits += num_hits
+            self.misses += len(mls_ids) - num_hits
+        return average_rent
+
+    def update(self, mls_ids, hashes, average_rents):
+        new = pd.DataFrame(
+            {"feature_hash": hashes, "average_rent": average_rents},
+            index=pd.Index(mls_ids, name="mls_id"),
+        )
+        with self._lock:
+            predictions = pd.concat([self._load(), new])
+            self._predictions = predictions[~predictions.index.duplicated(keep="last")]
+
+    def prune(self, mls_ids):
+        """
+        Drop the predictions of any other listings than `mls_ids`, e.g. of listings not for sale anymore.
+
+        :return: Whether any prediction was dropped.
+        """
+        with self._lock:
+            predictions = self._load()
+            listed = predictions.index.isin(mls_ids)
+            if listed.all():
+                return False
+            self._predictions = predictions[listed]
+            return True
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            predictions = self._load()
+        if self.path is None:
+            return
+        tmp_path = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file of its own and rename, so that workers saving at once never see a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            os.close(fd)
+            predictions.reset_index().to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except (ImportError, OSError) as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._disable_persistence(e)
+            return
+        # Predictions of previous models are of no use anymore.
+        for path in self.path.parent.glob("predictions-*.parquet"):
+            if path != self.path:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def predict_average_rent(
+    estimator, X, mls_ids, cache=None, chunk_size=10000, max_workers=None
+):
+    """
+    Predict the average rent of listings, only running the estimator on the ones not in `cache`.
+
+    :param mls_ids: MLS numbers of the rows of `X`.
+    :return: Array of predictions.
+    """
+    if cache is None:
+        return predict_in_chunks(estimator, X, chunk_size, max_workers)
+
+    mls_ids = np.asarray(mls_ids, dtype=object)
+    hashes = feature_hashes(X)
+    average_rent = cache.lookup(mls_ids, hashes)
+    # The cache only holds the listings predicted last, rather than every listing ever seen.
+    pruned = cache.prune(mls_ids)
+    missing = np.isnan(average_rent)
+    if missing.any():
+        average_rent[missing] = predict_in_chunks(
+            estimator, X[missing], chunk_size, max_workers
+        )
+        cache.update(mls_ids[missing], hashes[missing], average_rent[missing])
+    if missing.any() or pruned:
+        cache.save()
+    return average_rent
@@ -6,6 +6,129 @@ from sklearn.preprocessing import LabelEncoder
 from project_real_estate.constants import ALLOWED_PROPERTY_TYPES
 
 
+def _as_applied(values):
+    """
+    Cast integer values computed as floats back to integers when none is missing, as `Series.apply` would have inferred.
+    """
+    if values.notna().all():
+        return values.astype(np.int64)
+    return values.astype(np.float64)
+
+
+def _on_unique_values(values, func, cache=None):
+    """
+    Apply a vectorized function to the distinct values of a column only, and broadcast the results back through the
+    categorical codes of the column. Scraped columns have few distinct values, so each is processed once.
+
+    :param func: Function of a Series of distinct values, returning a Series or DataFrame aligned with it.
+    :param cache: `_ParseCache` of the results of earlier calls, so that only values never seen before are processed.
+    """
+    codes, uniques = values.factorize()
+    # Missing values have code -1, which picks the result of the appended missing value.
+    uniques = pd.Series(list(uniques) + [None], dtype=object)
+    if cache is None:
+        results = func(uniques)
+    else:
+        results = cache.apply(uniques, func, num_rows=len(values))
+    results = results.iloc[codes]
+    results.index = values.index
+    if isinstance(results, pd.Series):
+        results.name = values.name
+    return results
+
+
+class _ParseCache:
+    """
+    Results of parsing the distinct values of a column, kept across calls. The vocabulary of scraped columns such as
+    `year_built` barely changes from one batch of listings to the next.
+    """
+
+    def __init__(self, max_size=100000):
+        """
+        :param max_size: Number of distinct values past which new values are parsed without being cached.
+        """
+        self.max_size = max_size
+        self._results = {}
+        self._columns = None
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, uniques, func, num_rows):
+        """
+        :param uniques: Distinct values to parse.
+        :param num_rows: Number of rows the distinct values stand for, for the statistics.
+        :return: Results of `func` for `uniques`, as if it had been applied to them directly.
+        """
+        missing = [value for value in uniques if value not in self._results]
+        results = self._results
+        if missing:
+            parsed = func(pd.Series(missing, dtype=object))
+            if isinstance(parsed, pd.DataFrame):
+                self._columns = parsed.columns
+                parsed = parsed.itertuples(index=False, name=None)
+            if len(self._results) + len(missing) <= self.max_size:
+                self._results.update(zip(missing, parsed))
+            else:
+                results = {**self._results, **dict(zip(missing, parsed))}
+        self.rows += num_rows
+        self.hits += len(uniques) - len(missing)
+        self.misses += len(missing)
+
+        values = [results[value] for value in uniques]
+        if self._columns is None:
+            return pd.Series(values, index=uniques.index, dtype=np.float64)
+        return pd.DataFrame.from_records(
+            values, index=uniques.index, columns=self._columns
+        ).astype(np.float64)
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "size": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            # Share of the distinct values looked up which were already parsed.
+            "hit_ratio": self.hits / (self.hits + self.misses)
+            if self.hits + self.misses
+            else None,
+        }
+
+
+def _map_unit_descriptions(num_residential_units):
+    # See `PropertyPreprocessor._map_all_unit_descriptions_to_columns`.
+    unit_types = (
+        num_residential_units.str.strip("{}").str.strip('"').str.split(",").explode()
+    )
+    parts = unit_types.str.extract(r"^([^x]*)x([^x]*)$")
+    num_units = parts[0].str.strip()
+    num_rooms = parts[1].str.strip().str[0]
+    # Descriptions without a number of units, or with a loft or studio, can not be mapped. Numbers are read as `int`
+    # reads them, digits of any script and underscores between digits included.
+    valid = num_units.str.match(r"^[+-]?\d+(?:_\d+)*$").fillna(
+        False
+    ) & num_rooms.str.isdecimal().fillna(False)
+    invalid_rows = (~valid).groupby(level=0).any()
+
+    num_units = num_units[valid].astype(np.int64)
+    num_rooms = num_rooms[valid].astype(np.int64)
+    sums = pd.DataFrame(
+        {
+            "num_bedrooms": num_units * np.minimum(num_rooms - 2, 3),
+            "num_bathrooms": num_units,
+            "area": num_units * num_rooms * 100,
+            "num_units": num_units,
+        }
+    )
+    sums = sums.groupby(level=0).sum().reindex(num_residential_units.index)
+    sums[invalid_rows.reindex(sums.index, fill_value=True).values] = np.nan
+    columns = sums[["num_bedrooms", "num_bathrooms", "area"]].div(
+        sums.num_units, axis=0
+    )
+    columns["num_units"] = sums.num_units
+    return columns
+
+
 class PropertyPreprocessor:
     def __init__(self, price_lower_bound=100000):
         self._price_lower_bound = price_lower_bound
@@ -19,6 +142,60 @@ class PropertyPreprocessor:
         self._labels = ["rent"]
         self._label_encoder = LabelEncoder()
         self._label_encoder_mapping = {}
+        self._parse_caches = {}
+
+    def __getstate__(self):
+        # Parse caches are rebuilt on use rather than pickled with the model.
+        state = self.__dict__.copy()
+        state.pop("_parse_caches", None)
+        return state
+
+    def get_state(self):
+        """
+        :return: JSON-serializable parameters and fitted vocabulary of the preprocessor.
+        """
+        return {
+            "price_lower_bound": self._price_lower_bound,
+            "features": self._features,
+            "labels": self._labels,
+            "neighborhoods": [str(n) for n in self._label_encoder_mapping],
+            "neighborhood_codes": [
+                int(c) for c in self._label_encoder_mapping.values()
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        :param state: Output of `get_state`.
+        """
+        preprocessor = cls(price_lower_bound=state["price_lower_bound"])
+        preprocessor._features = state["features"]
+        preprocessor._labels = state["labels"]
+        preprocessor._label_encoder.classes_ = np.array(
+            state["neighborhoods"], dtype=object
+        )
+        preprocessor._label_encoder_mapping = dict(
+            zip(
+                state["neighborhoods"],
+                np.array(state["neighborhood_codes"], dtype=np.int64),
+            )
+        )
+        return preprocessor
+
+    def _parse_cache(self, column):
+        # Preprocessors pickled before parse caches existed have none.
+        caches = self.__dict__.setdefault("_parse_caches", {})
+        if column not in caches:
+            caches[column] = _ParseCache()
+        return caches[column]
+
+    def parse_cache_stats(self):
+        """
+        :return: Statistics of the caches of parsed `year_built` and `num_residential_units` values, by column.
+        """
+        caches = getattr(self, "_parse_caches", {})
+        return {column: cache.stats() for column, cache in caches.items()}
 
     def _encode_neighborhood(self, neighborhood):
         return self._label_encoder_mapping.get(neighborhood, np.nan)
@@ -32,6 +209,24 @@ class PropertyPreprocessor:
             )
         )
 
+    def _encode_neighborhoods(self, neighborhoods):
+        """
+        Vectorized `_encode_neighborhood`, looking up the categorical codes of the neighborhoods.
+        """
+        codes = pd.Categorical(
+            neighborhoods, categories=list(self._label_encoder_mapping)
+        ).codes
+        # Unknown neighborhoods have code -1, i.e. the trailing NaN.
+        encodings = np.append(
+            np.array(list(self._label_encoder_mapping.values()), dtype=np.float64),
+            np.nan,
+        )
+        return _as_applied(
+            pd.Series(
+                encodings[codes], index=neighborhoods.index, name=neighborhoods.name
+            )
+        )
+
     def _extract_neigborhood_from_city(self, city_name):
         city_parts = city_name.split("(")
         if len(city_parts) == 1:
@@ -39,6 +234,18 @@ class PropertyPreprocessor:
         else:
             return city_parts[1].strip(")").strip()
 
+    def _extract_neighborhoods_from_cities(self, cities):
+        """
+        Vectorized `_extract_neigborhood_from_city`.
+        """
+
+        def extract(cities):
+            before, separator, after = (cities.str.partition("(")[i] for i in range(3))
+            in_parentheses = after.str.partition("(")[0].str.strip(")").str.strip()
+            return before.str.strip().where(separator == "", in_parentheses)
+
+        return _on_unique_values(cities, extract)
+
     def _filter_data(self, data):
         """
         Remove duplicates, NaN values and outliers.
@@ -59,12 +266,10 @@ class PropertyPreprocessor:
         data = data[data.property_type.isin(ALLOWED_PROPERTY_TYPES)]
 
         # Fit and encode neighborhood to numerical value
-        data["neighborhood"] = data.city.apply(
-            lambda x: self._extract_neigborhood_from_city(x)
-        )
+        data["neighborhood"] = self._extract_neighborhoods_from_cities(data.city)
         self._fit_neighborhood_encoder(data.neighborhood)
-        data["neighborhood"] = data.neighborhood.apply(self._encode_neighborhood)
-        data["year_built"] = data.year_built.apply(self._convert_year_built)
+        data["neighborhood"] = self._encode_neighborhoods(data.neighborhood)
+        data["year_built"] = self._convert_years_built(data.year_built)
 
         data = self._filter_data(data)
         return data.loc[:, self._features], data.loc[:, self._labels[0]]
@@ -101,16 +306,23 @@ class PropertyPreprocessor:
             unit_counts,
         )
 
-    def _conform_sales_data_to_rent_schema(self, data):
-        unit_descriptions = data.num_residential_units.apply(
-            lambda x: x.strip("{}").strip('"').split(",")
-        )
-        unit_descriptions = unit_descriptions.apply(
-            self._map_unit_descriptions_to_columns
-        )
-        data[["num_bedrooms", "num_bathrooms", "area", "num_units"]] = pd.DataFrame(
-            unit_descriptions.tolist(), index=unit_descriptions.index
+    def _map_all_unit_descriptions_to_columns(self, num_residential_units):
+        """
+        Vectorized `_map_unit_descriptions_to_columns`, from the raw `num_residential_units` column.
+
+        :return: DataFrame of the average number of bedrooms, bathrooms and area per unit, and of the number of units.
+        """
+        columns = _on_unique_values(
+            num_residential_units,
+            _map_unit_descriptions,
+            cache=self._parse_cache("num_residential_units"),
         )
+        columns["num_units"] = _as_applied(columns.num_units)
+        return columns
+
+    def _conform_sales_data_to_rent_schema(self, data):
+        columns = self._map_all_unit_descriptions_to_columns(data.num_residential_units)
+        data[["num_bedrooms", "num_bathrooms", "area", "num_units"]] = columns
         return data
 
     def _convert_year_built(self, year):
@@ -126,10 +338,33 @@ class PropertyPreprocessor:
                 return 2020
         return np.nan
 
+    def _convert_years_built(self, years):
+        """
+        Vectorized `_convert_year_built`.
+        """
+
+        def convert(years):
+            digits = years.str.replace(r"\D", "", regex=True)
+            numeric_years = pd.to_numeric(digits.where(digits != ""), errors="coerce")
+            # Digits of other scripts, which `int` reads as well, are rare enough to be converted one by one.
+            other_digits = numeric_years.isna() & digits.notna() & (digits != "")
+            numeric_years[other_digits] = digits[other_digits].map(int)
+            converted = numeric_years.where(
+                (1600 < numeric_years) & (numeric_years < 2020)
+            )
+            is_new = (digits == "") & years.str.contains("New", regex=False).fillna(
+                False
+            )
+            return converted.mask(is_new, 2020)
+
+        return _as_applied(
+            _on_unique_values(years, convert, cache=self._parse_cache("year_built"))
+        )
+
     def preprocess_sales_data(self, data):
-        data["neighborhood"] = data.city.apply(self._extract_neigborhood_from_city)
-        data["neighborhood"] = data.neighborhood.apply(self._encode_neighborhood)
-        data["year_built"] = data.year_built.apply(self._convert_year_built)
+        data["neighborhood"] = self._extract_neighborhoods_from_cities(data.city)
+        data["neighborhood"] = self._encode_neighborhoods(data.neighborhood)
+        data["year_built"] = self._convert_years_built(data.year_built)
         data = self._conform_sales_data_to_rent_schema(data)
         data = self._filter_data(data)
         # For properties for sale, we also want to filter properties that are below 100K.
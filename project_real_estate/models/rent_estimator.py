@@ -1,6 +1,10 @@
 import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
 from sklearn.model_selection import train_test_split
 
+from project_real_estate.models.prediction import predict_average_rent
+
 
 class TrivialRentEstimator:
     def __call__(self, input_):
@@ -13,14 +17,26 @@ class SKLearnRentEstimator:
         self._estimator = estimator
         self._random_seed = 100
 
+    def split(self, X, y, test_split=0.15):
+        """
+        :return: X_train, X_test, y_train, y_test, the same for the same features and labels.
+        """
+        return train_test_split(
+            X, y, test_size=test_split, random_state=self._random_seed
+        )
+
     def fit(self, properties, test_split=0.15):
         """
         :param properties: Rental properties.
         """
         X, y = self._preprocessor.preprocess_rentals_data(properties)
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_split, random_state=self._random_seed
-        )
+        X_train, X_test, y_train, y_test = self.split(X, y, test_split)
+        self.fit_features(X_train, y_train)
+
+    def fit_features(self, X_train, y_train):
+        """
+        Fit the estimator on features already preprocessed with `preprocess_rentals_data`.
+        """
         self._estimator.fit(X_train, y_train)
 
     def score(self, properties, test_split=0.15, error_tolerance=0.1):
@@ -28,12 +44,16 @@ class SKLearnRentEstimator:
         Get R2 score and % of samples from test set which fall within a certain error of the prediction.
         """
         X, y = self._preprocessor.preprocess_rentals_data(properties)
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_split, random_state=self._random_seed
-        )
-        r2 = self._estimator.score(X_test, y_test)
+        X_train, X_test, y_train, y_test = self.split(X, y, test_split)
+        return self.score_features(X_test, y_test, error_tolerance)
 
+    def score_features(self, X_test, y_test, error_tolerance=0.1):
+        """
+        `score` on features already preprocessed with `preprocess_rentals_data`.
+        """
         test_preds = self._estimator.predict(X_test)
+        # Same as `self._estimator.score`, without predicting the test set twice.
+        r2 = r2_score(y_test, test_preds)
         accurate_predictions = np.all(
             [
                 test_preds * (1 - error_tolerance) < y_test,
@@ -43,12 +63,14 @@ class SKLearnRentEstimator:
         ).sum()
         return r2, accurate_predictions / len(y_test)
 
-    def predict(self, properties):
+    def predict(self, properties, cache=None, chunk_size=10000, max_workers=None):
         """
         Predict the potential revenue for a property. We take the minimum of the estimated gross revenue on Centris and
         our prediction.
 
         :param properties: Properties for sale.
+        :param cache: `PredictionCache` of this model, so that only new or changed listings are predicted.
+        :param chunk_size: Number of listings predicted at once, by each of `max_workers` threads.
         """
         (
             X,
@@ -56,12 +78,24 @@ class SKLearnRentEstimator:
             centris_claimed_revenue,
         ) = self._preprocessor.preprocess_sales_data(properties)
         centris_claimed_monthly_revenue = centris_claimed_revenue / 12
-        average_rent = self._estimator.predict(X)
+        average_rent = predict_average_rent(
+            self._estimator,
+            X,
+            properties.mls_id.loc[X.index],
+            cache=cache,
+            chunk_size=chunk_size,
+            max_workers=max_workers,
+        )
         predicted_revenue = average_rent * num_units
 
-        # Take minimum of prediction and Centris prediction
-        predicted_revenue = predicted_revenue.combine(
-            centris_claimed_monthly_revenue, func=min
+        # Take minimum of prediction and Centris prediction. A missing Centris claim keeps our prediction.
+        predicted_revenue = pd.Series(
+            np.where(
+                centris_claimed_monthly_revenue < predicted_revenue,
+                centris_claimed_monthly_revenue,
+                predicted_revenue,
+            ),
+            index=predicted_revenue.index,
+            name="predicted_rent_revenue",
         )
-        predicted_revenue.name = "predicted_rent_revenue"
         return predicted_revenue
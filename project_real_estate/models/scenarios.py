@@ -0,0 +1,320 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from project_real_estate.models.forest import _parallel_lock, numba, prange
+
+SCENARIO_COLUMNS = ["ROE_p5", "ROE_p50", "ROE_p95", "negative_cash_probability"]
+_PERCENTILES = [5, 50, 95]
+
+# Yearly quantities of each path, common to every property: gross revenue per dollar of monthly rent, and interest and
+# principal paid on a loan of 1. Each is a (paths x forecast years) array.
+ScenarioPaths = namedtuple("ScenarioPaths", ["revenue", "interest", "principal"])
+
+
+def amortize(rates, amortization):
+    """
+    Yearly interest and principal paid on a loan of 1 whose rate changes from year to year. The payment is recomputed
+    each year over the remaining amortization, so that a constant rate gives the usual annuity schedule.
+
+    :param rates: (paths x forecast years) array of the rate paid each year.
+    :return: `(interest, principal)` arrays of the same shape as `rates`.
+    """
+    interest = np.empty_like(rates)
+    principal = np.empty_like(rates)
+    balance = np.ones(len(rates))
+    for year in range(rates.shape[1]):
+        rate = rates[:, year]
+        # Loans are paid off after `amortization` years.
+        remaining_years = max(amortization - year, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            payment = np.where(
+                rate > 0,
+                balance * rate / (1 - (1 + rate) ** -remaining_years),
+                balance / remaining_years,
+            )
+        interest[:, year] = balance * rate
+        principal[:, year] = payment - interest[:, year]
+        balance = balance - principal[:, year]
+    return interest, principal
+
+
+def _mean_positive_income(
+    net_revenue_ratio, loan_principal, property_taxes, revenue, interest
+):
+    # Average over years of the positive part of the taxable income of each property x path, without materializing
+    # the taxable income of every year. The innermost loop goes over properties, so that it is vectorized.
+    num_properties, num_years = net_revenue_ratio.shape[0], revenue.shape[1]
+    result = np.empty((num_properties, revenue.shape[0]))
+    for s in prange(revenue.shape[0]):
+        total = np.zeros(num_properties)
+        for year in range(num_years):
+            path_revenue, path_interest = revenue[s, year], interest[s, year]
+            for p in range(num_properties):
+                total[p] += max(
+                    net_revenue_ratio[p] * path_revenue
+                    - loan_principal[p] * path_interest
+                    - property_taxes[p],
+                    0.0,
+                )
+        result[:, s] = total / num_years
+    return result
+
+
+if numba is not None:
+    _mean_positive_income_in_parallel = numba.njit(nogil=True, parallel=True)(
+        _mean_positive_income
+    )
+    _mean_positive_income = numba.njit(nogil=True)(_mean_positive_income)
+
+
+def _mean_positive_income_numpy(
+    net_revenue_ratio, loan_principal, property_taxes, revenue, interest
+):
+    # (properties x paths x years)
+    taxable_income = np.multiply.outer(net_revenue_ratio, revenue)
+    taxable_income -= np.multiply.outer(loan_principal, interest)
+    taxable_income -= property_taxes[:, None, None]
+    return np.maximum(taxable_income, 0, out=taxable_income).mean(axis=2)
+
+
+def check_backend(backend):
+    """
+    :param backend: "numba", "numpy", or None for numba if it is installed.
+    :return: Name of the backend to use.
+    """
+    if backend is None:
+        backend = "numpy" if numba is None else "numba"
+    if backend not in ("numba", "numpy"):
+        raise ValueError(f"Unknown backend {backend}")
+    if backend == "numba" and numba is None:
+        raise ImportError(
+            "The numba backend requires numba, installed with the `fast` extra"
+        )
+    return backend
+
+
+def mean_positive_income(
+    net_revenue_ratio,
+    loan_principal,
+    property_taxes,
+    revenue,
+    interest,
+    backend="numpy",
+    parallel=True,
+):
+    """
+    Average over years of the positive part of the taxable income of each property on each path, which income tax is
+    levied on.
+
+    :param net_revenue_ratio: Monthly rent of each property net of expenses.
+    :param loan_principal: Loan principal of each property.
+    :param property_taxes: Yearly property taxes of each property.
+    :param revenue: (paths x years) array of gross revenue per dollar of monthly rent.
+    :param interest: (paths x years) array of interest paid on a loan of 1.
+    :param backend: "numba", holding (properties x paths) values, or "numpy", holding (properties x paths x years).
+    :param parallel: Whether the numba backend uses every core.
+    :return: (properties x paths) array.
+    """
+    arguments = (net_revenue_ratio, loan_principal, property_taxes, revenue, interest)
+    if backend == "numpy":
+        return _mean_positive_income_numpy(*arguments)
+    if parallel:
+        with _parallel_lock:
+            return _mean_positive_income_in_parallel(*arguments)
+    return _mean_positive_income(*arguments)
+
+
+def _summarize(
+    paths, terms, income_tax_rate, yearly_reserves, max_elements, backend, parallel
+):
+    """
+    Percentiles of the ROE of each property over all paths, and the share of paths with a negative average net cash
+    flow. Everything but income tax is linear in the path quantities, so averages over years are outer products of
+    per-property and per-path averages. Only income tax is evaluated for each property x path x year, for as many
+    properties at a time as fit in `max_elements`.
+    """
+    total_investment, loan_principal, net_revenue_ratio, property_taxes = terms
+    num_paths, num_years = paths.revenue.shape
+    mean_revenue = paths.revenue.mean(axis=1)
+    mean_interest = paths.interest.mean(axis=1)
+    mean_principal = paths.principal.mean(axis=1)
+    if backend == "numba":
+        # Only (properties x paths) arrays are held.
+        chunk_size = max(1, max_elements // num_paths)
+    else:
+        chunk_size = max(1, max_elements // (num_paths * num_years))
+
+    summaries = np.empty((len(total_investment), len(SCENARIO_COLUMNS)))
+    for start in range(0, len(total_investment), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        income_tax = mean_positive_income(
+            net_revenue_ratio[chunk],
+            loan_principal[chunk],
+            property_taxes[chunk],
+            paths.revenue,
+            paths.interest,
+            backend,
+            parallel,
+        )
+        income_tax *= income_tax_rate
+
+        net_income = (
+            np.outer(net_revenue_ratio[chunk], mean_revenue)
+            - np.outer(loan_principal[chunk], mean_interest)
+            - property_taxes[chunk, None]
+            - income_tax
+        )
+        net_equity = net_income - yearly_reserves
+        return_on_equity = net_equity / total_investment[chunk, None]
+        net_cash_flow = net_equity - np.outer(loan_principal[chunk], mean_principal)
+
+        summaries[chunk, :3] = np.percentile(return_on_equity, _PERCENTILES, axis=1).T
+        summaries[chunk, 3] = (net_cash_flow < 0).mean(axis=1)
+    return summaries
+
+
+# Paths and constants of the scenarios being evaluated by a worker process, sent once when it starts.
+_worker_arguments = None
+
+
+def _init_worker(*arguments):
+    global _worker_arguments
+    _worker_arguments = arguments
+
+
+def _summarize_in_worker(terms):
+    paths, income_tax_rate, yearly_reserves, max_elements, backend = _worker_arguments
+    # Processes already use every core.
+    return _summarize(
+        paths,
+        terms,
+        income_tax_rate,
+        yearly_reserves,
+        max_elements,
+        backend,
+        parallel=False,
+    )
+
+
+class ScenarioEngine:
+    """
+    Monte Carlo forecasts of a `SimpleFinancialModel`. Each path draws a market interest rate following a random walk,
+    at which the mortgage renews every `renewal_term` years, and vacancy shocks hitting random years. Every property is
+    evaluated over every path and year as one batched computation, compiled with numba if it is installed, in chunks
+    of at most `max_elements` values, and optionally spread over `max_workers` processes. Paths only depend on `seed`,
+    so results are the same whatever the chunking or the number of workers.
+    """
+
+    def __init__(
+        self,
+        model,
+        num_paths=1000,
+        rate_volatility=0.005,
+        renewal_term=5,
+        vacancy_shock_probability=0.1,
+        vacancy_shock=0.1,
+        seed=0,
+        max_elements=2 ** 20,
+        max_workers=None,
+        backend=None,
+    ):
+        """
+        :param model: `SimpleFinancialModel` giving the terms of the loans and the expected vacancy and interest rate.
+        :param rate_volatility: Standard deviation of the yearly change of the market interest rate.
+        :param renewal_term: Number of years after which the mortgage is renewed at the market rate.
+        :param vacancy_shock_probability: Probability of a vacancy shock in any given year.
+        :param vacancy_shock: Vacancy rate added to the expected vacancy during a shock.
+        :param max_elements: Largest number of values held at once by each process: property x path x year values
+            with NumPy, property x path values with numba.
+        :param max_workers: Number of worker processes, or None to evaluate in this process.
+        :param backend: "numba", "numpy", or None for numba if it is installed.
+        """
+        backend = check_backend(backend)
+        self._model = model
+        self._num_paths = num_paths
+        self._rate_volatility = rate_volatility
+        self._renewal_term = renewal_term
+        self._vacancy_shock_probability = vacancy_shock_probability
+        self._vacancy_shock = vacancy_shock
+        self._seed = seed
+        self._max_elements = max_elements
+        self._max_workers = max_workers
+        self._backend = backend
+        self._paths = None
+
+    @property
+    def paths(self):
+        if self._paths is None:
+            self._paths = self.draw_paths()
+        return self._paths
+
+    def draw_paths(self):
+        """
+        :return: `ScenarioPaths`.
+        """
+        parameters = self._model.parameters
+        num_years = parameters["forecast_horizon"]
+        rng = np.random.RandomState(self._seed)
+
+        rate_changes = rng.normal(
+            0, self._rate_volatility, (self._num_paths, num_years)
+        )
+        # The first year is at the rate of the model.
+        rate_changes[:, 0] = 0
+        market_rates = np.maximum(
+            parameters["interest_rate"] + rate_changes.cumsum(axis=1), 0
+        )
+        renewal_years = np.arange(num_years) // self._renewal_term * self._renewal_term
+        interest, principal = amortize(
+            market_rates[:, renewal_years], parameters["amortization"]
+        )
+
+        shocks = rng.random_sample((self._num_paths, num_years))
+        vacancy = np.where(
+            shocks < self._vacancy_shock_probability,
+            min(parameters["vacancy"] + self._vacancy_shock, 1),
+            parameters["vacancy"],
+        )
+        rent_growth = (1 + parameters["rate_rent_increase"]) ** np.arange(num_years)
+        revenue = 12 * (1 - vacancy) * rent_growth
+        return ScenarioPaths(revenue=revenue, interest=interest, principal=principal)
+
+    def simulate(self, price, monthly_rent, year_built):
+        """
+        :return: Dict mapping each of `SCENARIO_COLUMNS` to an array with one value per property.
+        """
+        model = self._model
+        monthly_rent = np.asarray(monthly_rent, dtype=float)
+        (
+            total_investment,
+            loan_principal,
+            property_expense_ratio,
+            property_taxes,
+        ) = model.property_terms(price, year_built)
+        # Gross revenue net of expenses, per unit of the revenue of a path.
+        net_revenue_ratio = monthly_rent * (1 - property_expense_ratio)
+        terms = (total_investment, loan_principal, net_revenue_ratio, property_taxes)
+        arguments = (
+            self.paths,
+            model.income_tax_rate,
+            model.parameters["yearly_reserves"],
+            self._max_elements,
+            self._backend,
+        )
+
+        if self._max_workers is None or self._max_workers <= 1 or len(price) < 2:
+            summaries = _summarize(self.paths, terms, *arguments[1:], parallel=True)
+        else:
+            num_tasks = min(len(price), 4 * self._max_workers)
+            task_terms = zip(*(np.array_split(term, num_tasks) for term in terms))
+            with ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                initializer=_init_worker,
+                initargs=arguments,
+            ) as executor:
+                summaries = np.concatenate(
+                    list(executor.map(_summarize_in_worker, task_terms))
+                )
+        return dict(zip(SCENARIO_COLUMNS, summaries.T))
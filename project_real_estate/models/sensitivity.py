@@ -0,0 +1,329 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from project_real_estate.models.financial_model import (
+    _OUTPUT_COLUMNS,
+    SimpleFinancialModel,
+    schedule_cache,
+)
+from project_real_estate.models.scenarios import check_backend, mean_positive_income
+
+# Parameters varied by a grid, in the order of the axes of its cubes, after the axis of properties.
+GRID_AXES = ["downpayment", "interest_rate", "amortization", "vacancy"]
+_MANIFEST_FILE = "grid.json"
+_MLS_ID_FILE = "mls_id.npy"
+
+
+class SensitivityGrid:
+    """
+    Forecasts of `SimpleFinancialModel` over every combination of downpayment, interest rate, amortization and vacancy,
+    the other parameters being fixed. Each output column is a dense (properties x downpayments x interest rates x
+    amortizations x vacancies) cube.
+
+    Grid points share their computations: the revenue of a vacancy, the amortization schedule of an interest rate and
+    amortization, and the loan of a downpayment are each computed once. Everything but income tax is linear in those,
+    so averages over years are outer products, and only income tax is evaluated for every grid point and year.
+    """
+
+    def __init__(
+        self,
+        downpayments,
+        interest_rates,
+        amortizations,
+        vacancies,
+        closing_fees: float,
+        property_tax_rate: float,
+        rate_rent_increase: float,
+        expense_ratio: float,
+        yearly_reserves: int,
+        forecast_horizon=None,
+        schedule_cache=schedule_cache,
+    ):
+        """
+        :param downpayments: Downpayments, each one of the keys of the mortgage premium scale.
+        :param forecast_horizon: Number of years forecasted, or None to forecast over the whole amortization, as the
+            dashboard does by default.
+        """
+        self.axes = {
+            "downpayment": [float(value) for value in downpayments],
+            "interest_rate": [float(value) for value in interest_rates],
+            "amortization": [int(value) for value in amortizations],
+            "vacancy": [float(value) for value in vacancies],
+        }
+        self.parameters = {
+            "closing_fees": float(closing_fees),
+            "property_tax_rate": float(property_tax_rate),
+            "rate_rent_increase": float(rate_rent_increase),
+            "expense_ratio": float(expense_ratio),
+            "yearly_reserves": yearly_reserves,
+            "forecast_horizon": forecast_horizon,
+        }
+        self._schedule_cache = schedule_cache
+        # Models of each downpayment, the other axes at their first value. Also checks every downpayment has a
+        # mortgage premium.
+        self._models = [
+            self.model(
+                downpayment=downpayment,
+                interest_rate=self.axes["interest_rate"][0],
+                amortization=self.axes["amortization"][0],
+                vacancy=self.axes["vacancy"][0],
+            )
+            for downpayment in self.axes["downpayment"]
+        ]
+
+    @property
+    def shape(self):
+        return tuple(len(self.axes[axis]) for axis in GRID_AXES)
+
+    def model(self, downpayment, interest_rate, amortization, vacancy):
+        """
+        :return: `SimpleFinancialModel` of a grid point.
+        """
+        forecast_horizon = self.parameters["forecast_horizon"]
+        return SimpleFinancialModel(
+            downpayment=downpayment,
+            closing_fees=self.parameters["closing_fees"],
+            interest_rate=interest_rate,
+            amortization=amortization,
+            forecast_horizon=forecast_horizon or amortization,
+            vacancy=vacancy,
+            property_tax_rate=self.parameters["property_tax_rate"],
+            rate_rent_increase=self.parameters["rate_rent_increase"],
+            expense_ratio=self.parameters["expense_ratio"],
+            yearly_reserves=self.parameters["yearly_reserves"],
+            schedule_cache=self._schedule_cache,
+        )
+
+    def _forecast_horizon(self, amortization):
+        return self.parameters["forecast_horizon"] or amortization
+
+    def index(self, **parameters):
+        """
+        :param parameters: Value of every parameter of the grid, axes and fixed parameters alike, as given to
+            `SimpleFinancialModel`.
+        :return: Position of the parameters along each axis, or None if they are not on the grid.
+        """
+        for name, value in self.parameters.items():
+            if name == "forecast_horizon":
+                if value is None:
+                    value = parameters["amortization"]
+                if parameters[name] != value:
+                    return None
+            elif not np.isclose(parameters[name], value, rtol=1e-9, atol=0):
+                return None
+        positions = []
+        for axis in GRID_AXES:
+            matches = np.flatnonzero(
+                np.isclose(self.axes[axis], parameters[axis], rtol=1e-9, atol=0)
+            )
+            if not len(matches):
+                return None
+            positions.append(int(matches[0]))
+        return tuple(positions)
+
+    def evaluate(
+        self, price, monthly_rent, year_built, backend=None, max_elements=2 ** 22
+    ):
+        """
+        :param backend: "numba", "numpy", or None for numba if it is installed.
+        :param max_elements: Largest number of values held at once to compute income tax: property x grid point x
+            year values with NumPy, property x grid point values with numba.
+        :return: Dict mapping each output column to a cube with one row per property. Columns which do not depend on
+            every axis are read-only broadcast views.
+        """
+        backend = check_backend(backend)
+        price = np.asarray(price, dtype=float)
+        monthly_rent = np.asarray(monthly_rent, dtype=float)
+        num_properties = len(price)
+        num_downpayments, num_rates, num_amortizations, num_vacancies = self.shape
+
+        terms = [model.property_terms(price, year_built) for model in self._models]
+        # (properties x downpayments)
+        total_investment = np.stack([term[0] for term in terms], axis=1)
+        loan_principal = np.stack([term[1] for term in terms], axis=1)
+        # Neither depends on the downpayment.
+        property_expense_ratio, property_taxes = terms[0][2], terms[0][3]
+        net_revenue_ratio = monthly_rent * (1 - property_expense_ratio)
+        income_tax_rate = self._models[0].income_tax_rate
+        yearly_reserves = self.parameters["yearly_reserves"]
+        vacancy = np.array(self.axes["vacancy"])
+
+        full_shape = (num_properties,) + self.shape
+        cubes = {
+            column: np.empty(full_shape)
+            for column in ["net_income", "net_cash", "cash_return", "ROE"]
+        }
+        # The horizon may depend on the amortization, so is the average revenue over the horizon.
+        mean_revenue = np.empty((num_amortizations, num_vacancies))
+        horizons = [self._forecast_horizon(a) for a in self.axes["amortization"]]
+        for horizon in sorted(set(horizons)):
+            amortizations = [a for a, h in enumerate(horizons) if h == horizon]
+            rent_growth = (1 + self.parameters["rate_rent_increase"]) ** np.arange(
+                horizon
+            )
+            # (vacancies x years)
+            revenue = np.outer(12 * (1 - vacancy), rent_growth)
+            mean_revenue[amortizations] = revenue.mean(axis=1)
+            # Grid points of this horizon, (interest rates x amortizations x vacancies), flattened.
+            schedules = [
+                self._schedule_cache.get(rate, self.axes["amortization"][a], horizon)
+                for rate in self.axes["interest_rate"]
+                for a in amortizations
+            ]
+            unit_interest = np.repeat(
+                np.array([schedule[0] for schedule in schedules]), num_vacancies, axis=0
+            )
+            unit_principal = np.repeat(
+                np.array([schedule[1] for schedule in schedules]), num_vacancies, axis=0
+            )
+            point_revenue = np.tile(revenue, (len(schedules), 1))
+            mean_point_revenue = point_revenue.mean(axis=1)
+            mean_interest = unit_interest.mean(axis=1)
+            mean_principal = unit_principal.mean(axis=1)
+            num_points = len(point_revenue)
+            point_shape = (num_rates, len(amortizations), num_vacancies)
+
+            per_property = num_downpayments * num_points
+            if backend == "numpy":
+                per_property *= horizon
+            chunk_size = max(1, max_elements // per_property)
+            for start in range(0, num_properties, chunk_size):
+                chunk = slice(start, start + chunk_size)
+                chunk_length = len(price[chunk])
+                # Properties x downpayments, flattened.
+                loans = loan_principal[chunk].ravel()
+                net_revenues = np.repeat(net_revenue_ratio[chunk], num_downpayments)
+                taxes = np.repeat(property_taxes[chunk], num_downpayments)
+                income_tax = mean_positive_income(
+                    net_revenues, loans, taxes, point_revenue, unit_interest, backend
+                )
+                income_tax *= income_tax_rate
+                net_income = (
+                    np.outer(net_revenues, mean_point_revenue)
+                    - np.outer(loans, mean_interest)
+                    - taxes[:, None]
+                    - income_tax
+                )
+                net_cash = (
+                    net_income - np.outer(loans, mean_principal) - yearly_reserves
+                )
+                investment = total_investment[chunk].ravel()[:, None]
+                shape = (chunk_length, num_downpayments) + point_shape
+                outputs = {
+                    "net_income": net_income,
+                    "net_cash": net_cash,
+                    "cash_return": net_cash / investment,
+                    "ROE": (net_income - yearly_reserves) / investment,
+                }
+                for column, values in outputs.items():
+                    cubes[column][chunk, :, :, amortizations] = values.reshape(shape)
+
+        # Columns which only depend on some of the axes.
+        yearly_revenue = monthly_rent[:, None, None] * mean_revenue
+        partial = {
+            "investment": total_investment[:, :, None, None, None],
+            "mortgage_premium": np.outer(
+                price, [model.mortgage_premium_rate for model in self._models]
+            )[:, :, None, None, None],
+            "revenue": yearly_revenue[:, None, None],
+            "cap_rate": (
+                (1 - property_expense_ratio)[:, None, None] * yearly_revenue
+                - property_taxes[:, None, None]
+            )[:, None, None]
+            / price[:, None, None, None, None],
+        }
+        for column, values in partial.items():
+            cubes[column] = np.broadcast_to(values, full_shape)
+        return {column: cubes[column] for column in _OUTPUT_COLUMNS}
+
+    def get_state(self):
+        return {"axes": self.axes, "parameters": self.parameters}
+
+    @classmethod
+    def from_state(cls, state):
+        axes = state["axes"]
+        return cls(
+            downpayments=axes["downpayment"],
+            interest_rates=axes["interest_rate"],
+            amortizations=axes["amortization"],
+            vacancies=axes["vacancy"],
+            **state["parameters"],
+        )
+
+
+def save_cube(grid, cubes, mls_ids, version, directory):
+    """
+    Write the cubes of `grid` for listings, replacing `directory` if it exists. Each column is its own `.npy` file, so
+    that it can be memory-mapped, only holding the axes it depends on.
+
+    :param mls_ids: MLS number of each row of the cubes.
+    :param version: Version of the listings the cubes were computed on.
+    """
+    directory = Path(directory)
+    tmp_directory = directory.with_name(f"{directory.name}.tmp")
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    tmp_directory.mkdir(parents=True)
+
+    for column, values in cubes.items():
+        # Broadcast axes have no stride.
+        compact = values[
+            tuple(
+                slice(0, 1) if stride == 0 else slice(None) for stride in values.strides
+            )
+        ]
+        np.save(tmp_directory / f"{column}.npy", np.ascontiguousarray(compact))
+    np.save(tmp_directory / _MLS_ID_FILE, np.asarray(mls_ids, dtype=str))
+    with open(tmp_directory / _MANIFEST_FILE, "w") as f:
+        json.dump(
+            {"version": version, "columns": list(cubes), **grid.get_state()},
+            f,
+            indent=2,
+        )
+
+    # Swap the complete directory in, so that a reader never sees one half written.
+    old_directory = directory.with_name(f"{directory.name}.old")
+    shutil.rmtree(old_directory, ignore_errors=True)
+    if directory.exists():
+        os.replace(directory, old_directory)
+    os.replace(tmp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+
+
+class PrecomputedCube:
+    """
+    Cubes written by `save_cube`, memory-mapped, to look the forecasts of listings up instead of computing them.
+    """
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        with open(directory / _MANIFEST_FILE) as f:
+            manifest = json.load(f)
+        self.version = manifest["version"]
+        self.grid = SensitivityGrid.from_state(manifest)
+        self._rows = pd.Index(np.load(directory / _MLS_ID_FILE))
+        shape = (len(self._rows),) + self.grid.shape
+        self._cubes = {
+            column: np.broadcast_to(
+                np.load(directory / f"{column}.npy", mmap_mode="r"), shape
+            )
+            for column in manifest["columns"]
+        }
+
+    def lookup(self, mls_ids, **parameters):
+        """
+        :param parameters: Every parameter of the model, as given to `SimpleFinancialModel`.
+        :return: Dict mapping each output column to an array with one value per listing, or None if the parameters
+            are not on the grid or some listings are not in the cubes.
+        """
+        index = self.grid.index(**parameters)
+        if index is None:
+            return None
+        rows = self._rows.get_indexer(mls_ids)
+        if (rows < 0).any():
+            return None
+        return {column: cube[(rows,) + index] for column, cube in self._cubes.items()}
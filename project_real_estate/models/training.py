@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from project_real_estate.constants import ALLOWED_PROPERTY_TYPES
+from project_real_estate.models.preprocessor import PropertyPreprocessor
+
+# Columns of the `rentals` table read by `PropertyPreprocessor.preprocess_rentals_data`.
+TRAINING_COLUMNS = [
+    "mls_id",
+    "property_type",
+    "city",
+    "year_built",
+    "num_bathrooms",
+    "num_bedrooms",
+    "area",
+    "rent",
+]
+
+
+class PhaseTimer:
+    """
+    Wall-clock time of each phase of a pipeline, printed as it ends.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0) + duration
+            print(f"{name} took {duration:.2f}s")
+
+
+def read_rental_partitions(chunks):
+    """
+    Read rental properties one chunk at a time, e.g. one date partition of the local cache or one chunk of a database
+    cursor, only keeping the rows and columns the model is trained on.
+
+    :param chunks: Iterator of DataFrames of the `rentals` table.
+    """
+    frames = []
+    for chunk in chunks:
+        chunk = chunk.loc[:, TRAINING_COLUMNS]
+        frames.append(chunk[chunk.property_type.isin(ALLOWED_PROPERTY_TYPES)])
+    if not frames:
+        return pd.DataFrame(columns=TRAINING_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+class DesignMatrixCache:
+    """
+    Preprocessed features and labels, with the fitted preprocessor, stored by the fingerprint of the rental properties
+    they were computed from. Training again on the same properties, e.g. with other hyperparameters, skips
+    preprocessing.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def fingerprint(properties, preprocessor):
+        digest = hashlib.sha1()
+        digest.update(
+            pd.util.hash_pandas_object(properties, index=False).values.tobytes()
+        )
+        state = preprocessor.get_state()
+        digest.update(
+            json.dumps(
+                {key: state[key] for key in ("price_lower_bound", "features", "labels")}
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def get(self, fingerprint):
+        """
+        :return: X, y and the fitted preprocessor, or None if they are not cached.
+        """
+        path = self.directory / fingerprint
+        try:
+            with open(path / "preprocessor.json") as f:
+                preprocessor = PropertyPreprocessor.from_state(json.load(f))
+            design_matrix = pd.read_parquet(path / "design_matrix.parquet")
+        except FileNotFoundError:
+            return None
+        label = preprocessor._labels[0]
+        return design_matrix.drop(columns=label), design_matrix[label], preprocessor
+
+    def put(self, fingerprint, X, y, preprocessor):
+        path = self.directory / fingerprint
+        tmp_path = self.directory / f"{fingerprint}.tmp"
+        tmp_path.mkdir(parents=True, exist_ok=True)
+        X.assign(**{y.name: y}).to_parquet(tmp_path / "design_matrix.parquet")
+        with open(tmp_path / "preprocessor.json", "w") as f:
+            json.dump(preprocessor.get_state(), f)
+        if path.exists():
+            shutil.rmtree(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+
+def preprocess_rentals(properties, preprocessor, cache=None):
+    """
+    `preprocess_rentals_data`, through a `DesignMatrixCache` if given.
+
+    :return: X, y and the fitted preprocessor, which is `preprocessor` unless the design matrix was cached.
+    """
+    if cache is None:
+        return (*preprocessor.preprocess_rentals_data(properties), preprocessor)
+    fingerprint = cache.fingerprint(properties, preprocessor)
+    cached = cache.get(fingerprint)
+    if cached is not None:
+        print(f"Design matrix read from cache {fingerprint}")
+        return cached
+    X, y = preprocessor.preprocess_rentals_data(properties)
+    cache.put(fingerprint, X, y, preprocessor)
+    return X, y, preprocessor
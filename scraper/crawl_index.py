@@ -0,0 +1,146 @@
+import datetime
+import hashlib
+import json
+import os
+from collections import Counter
+
+# Fields which change on every scrape even when the listing itself did not.
+_VOLATILE_FIELDS = {"date", "unique_id", "url"}
+
+
+def record_fingerprint(record):
+    """
+    Hash of the content of a parsed listing, to tell whether it changed since it was last scraped.
+    """
+    content = {k: v for k, v in record.items() if k not in _VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _days_between(start, end):
+    return (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days
+
+
+class CrawlIndex:
+    """
+    Local index of the listings seen by previous scrapes: mls_id -> fingerprint and price of the last parsed page, its
+    HTTP validators and the record itself. Unchanged listings are carried forward from it instead of being parsed (or
+    fetched) again.
+    """
+
+    def __init__(self, path, refresh_days=7):
+        """
+        :param refresh_days: Listings are always fetched again after this many days, even if their price is unchanged.
+        """
+        self.path = path
+        self.refresh_days = refresh_days
+        self.stats = Counter()
+        try:
+            with open(path) as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def plan(self, listings, date, prices=None):
+        """
+        Split listings between those to fetch and those whose last record can be reused as is: listings whose price in
+        the search results is unchanged, and whose page was fetched less than `refresh_days` ago.
+
+        :param listings: List of (url, mls_id) tuples.
+        :param prices: Price of each listing in the search results, if known.
+        :return: Listings to fetch, and the records carried forward for the others.
+        """
+        to_fetch = []
+        carried = []
+        for i, (url, mls_id) in enumerate(listings):
+            entry = self._entries.get(mls_id)
+            price = prices[i] if prices is not None else None
+            if (
+                entry is not None
+                and price is not None
+                and price == entry["price"]
+                and _days_between(entry["fetched"], date) < self.refresh_days
+            ):
+                carried.append(self.carry_forward(mls_id, date))
+            else:
+                to_fetch.append((url, mls_id))
+        self.stats["skipped"] += len(carried)
+        return to_fetch, carried
+
+    def request_headers(self, listing):
+        """
+        Conditional request headers, so the server only sends the page back if it changed.
+        """
+        entry = self._entries.get(listing[1])
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def carry_forward(self, mls_id, date):
+        """
+        :return: The last record of a listing, as scraped on `date`.
+        """
+        record = dict(self._entries[mls_id]["record"])
+        record["date"] = date
+        record["unique_id"] = date + "-" + str(mls_id)
+        return record
+
+    def not_modified(self, mls_id, page, date):
+        """
+        Record that the server answered a conditional request with 304.
+
+        :return: The carried forward record.
+        """
+        entry = self._entries[mls_id]
+        entry["fetched"] = date
+        entry["etag"] = page.etag or entry["etag"]
+        entry["last_modified"] = page.last_modified or entry["last_modified"]
+        self.stats["not_modified"] += 1
+        return self.carry_forward(mls_id, date)
+
+    def update(self, record, page):
+        """
+        Store the record parsed from a freshly fetched page.
+        """
+        mls_id = record["mls_id"]
+        fingerprint = record_fingerprint(record)
+        entry = self._entries.get(mls_id)
+        if entry is None:
+            self.stats["new"] += 1
+        elif entry["fingerprint"] == fingerprint:
+            self.stats["unchanged"] += 1
+        else:
+            self.stats["changed"] += 1
+        self._entries[mls_id] = {
+            "fingerprint": fingerprint,
+            "price": record.get("price", record.get("rent")),
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "fetched": record["date"],
+            "record": record,
+        }
+
+    def save(self, seen_mls_ids):
+        """
+        Write the index, forgetting listings which are no longer in the search results.
+        """
+        seen_mls_ids = set(seen_mls_ids)
+        removed = [mls_id for mls_id in self._entries if mls_id not in seen_mls_ids]
+        for mls_id in removed:
+            del self._entries[mls_id]
+        self.stats["removed"] += len(removed)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
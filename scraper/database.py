@@ -0,0 +1,80 @@
+import io
+import os
+
+from sqlalchemy import create_engine
+
+
+def _array_literal(values):
+    # Lists used to be inserted as Postgres arrays into text columns, i.e. stored as their array literal.
+    elements = []
+    for value in values:
+        value = str(value)
+        if (
+            not value
+            or value.upper() == "NULL"
+            or any(c in value for c in '{}",\\')
+            or any(c.isspace() for c in value)
+        ):
+            value = '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        elements.append(value)
+    return "{" + ",".join(elements) + "}"
+
+
+def _csv_field(value):
+    # Every value is quoted, so that an unquoted empty field unambiguously stands for NULL.
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = _array_literal(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_rows(table, connection, keys, data_iter):
+    """
+    `method` of `DataFrame.to_sql` loading rows with Postgres' COPY instead of INSERT statements.
+    """
+    buffer = io.StringIO()
+    for row in data_iter:
+        buffer.write(",".join(_csv_field(value) for value in row) + "\n")
+    buffer.seek(0)
+    name = f"{table.schema}.{table.name}" if table.schema else table.name
+    columns = ", ".join(f'"{key}"' for key in keys)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH CSV", buffer)
+
+
+def _to_sql(data, table_name, connection, if_exists, batch_size):
+    if connection.dialect.name == "postgresql":
+        method = _copy_rows
+    else:
+        # COPY is only available on Postgres. Elsewhere, rows are at least inserted many per statement, within
+        # SQLite's limit of 999 parameters per statement.
+        method = "multi"
+        batch_size = max(1, min(batch_size, 999 // max(1, len(data.columns))))
+    data.to_sql(
+        name=table_name,
+        con=connection,
+        if_exists=if_exists,
+        index=False,
+        chunksize=batch_size,
+        method=method,
+    )
+
+
+def save_results(data, task, batch_size=5000):
+    """
+    Append the records of a run to the table of `task` and, for sales, replace `latest_sales` with them, all in one
+    transaction. `latest_sales` is filled under another name and swapped in, so it is never seen empty or half filled.
+    """
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.begin() as connection:
+        _to_sql(data, task, connection, "append", batch_size)
+        if task == "sales":
+            _to_sql(data, "latest_sales_new", connection, "replace", batch_size)
+            connection.execute("DROP TABLE IF EXISTS latest_sales_old")
+            if engine.dialect.has_table(connection, "latest_sales"):
+                connection.execute(
+                    "ALTER TABLE latest_sales RENAME TO latest_sales_old"
+                )
+            connection.execute("ALTER TABLE latest_sales_new RENAME TO latest_sales")
+            connection.execute("DROP TABLE IF EXISTS latest_sales_old")
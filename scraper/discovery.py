@@ -0,0 +1,217 @@
+import os
+import time
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from lxml import etree
+from tqdm import tqdm
+
+SITE_URLS = {
+    "rentals": "https://www.centris.ca/en/properties~for-rent?uc=2&view=Thumbnail",
+    "sales": "https://www.centris.ca/en/multi-family-properties~for-sale?view=Thumbnail",
+}
+
+# A listing found in the search results. `price` is None if it is not shown in the results.
+Listing = namedtuple("Listing", ["url", "mls_id", "price"])
+# Smallest share of the listings expected from the number of pages that pagination over HTTP must find.
+_MIN_PAGINATION_YIELD = 0.5
+
+
+def search_page_url(site_url, page, page_parameter="page"):
+    """
+    URL of a page of the search results, the first page being `site_url` itself.
+    """
+    if page == 1:
+        return site_url
+    parts = urlsplit(site_url)
+    query = parse_qsl(parts.query) + [(page_parameter, str(page))]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def parse_search_page(html, base_url):
+    """
+    Read the listings of a page of search results, in a single pass over the page.
+
+    :return: List of `Listing`, and the number of pages of results, or None if the pager is missing.
+    """
+    root = etree.fromstring(html, etree.HTMLParser())
+    if root is None:
+        return [], None
+
+    mls_ids = []
+    prices = {}
+    links = {}
+    num_pages = None
+    for element in root.iter(tag=etree.Element):
+        tag = element.tag
+        attributes = element.attrib
+        if tag == "meta":
+            itemprop = attributes.get("itemprop")
+            if itemprop == "sku":
+                mls_ids.append(attributes.get("content"))
+            elif itemprop == "price" and mls_ids and mls_ids[-1] not in prices:
+                # The price of a thumbnail follows its MLS number.
+                try:
+                    prices[mls_ids[-1]] = float(attributes.get("content"))
+                except (TypeError, ValueError):
+                    pass
+        elif tag == "a":
+            mls_id = attributes.get("data-mlsnumber")
+            if mls_id is not None and mls_id not in links and "href" in attributes:
+                links[mls_id] = urljoin(base_url, attributes["href"])
+        elif tag == "li" and attributes.get("class") == "pager-current":
+            text = "".join(element.itertext())
+            num_pages = int(text.split("/")[1].replace(",", ""))
+
+    listings = [
+        Listing(links[mls_id], mls_id, prices.get(mls_id))
+        for mls_id in mls_ids
+        if mls_id in links
+    ]
+    return listings, num_pages
+
+
+def _deduplicate(listings):
+    # Listings can move to another page while the results are being read.
+    seen = set()
+    unique = []
+    for listing in listings:
+        if listing.mls_id not in seen:
+            seen.add(listing.mls_id)
+            unique.append(listing)
+    return unique
+
+
+class HttpDiscovery:
+    """
+    Reads the pages of search results over plain HTTP, in parallel once the number of pages is known from the first.
+    """
+
+    name = "http"
+
+    def __init__(self, fetcher, site_url, page_parameter="page"):
+        self.fetcher = fetcher
+        self.site_url = site_url
+        self.page_parameter = page_parameter
+
+    def discover(self):
+        """
+        :return: List of `Listing`, in the order of the search results.
+        """
+        first_page = self.fetcher.fetch(self.site_url)
+        listings, num_pages = parse_search_page(first_page.text, self.site_url)
+        if num_pages is None:
+            raise ValueError(f"No pager found on {self.site_url}")
+
+        pages = [
+            (search_page_url(self.site_url, page, self.page_parameter), page)
+            for page in range(2, num_pages + 1)
+        ]
+        listings_by_page = {1: listings}
+        for (url, page_number), page, error in tqdm(
+            self.fetcher.fetch_all(pages), total=len(pages)
+        ):
+            if error is not None:
+                raise error
+            listings_by_page[page_number] = parse_search_page(page.text, url)[0]
+        unique = _deduplicate(
+            listing
+            for page_number in sorted(listings_by_page)
+            for listing in listings_by_page[page_number]
+        )
+        self._check_pagination(listings, num_pages, unique)
+        return unique
+
+    def _check_pagination(self, first_listings, num_pages, unique):
+        # The site can ignore the page parameter and serve the first page over and over, which looks like a success.
+        if num_pages < 2:
+            return
+        first_ids = {listing.mls_id for listing in first_listings}
+        if all(listing.mls_id in first_ids for listing in unique):
+            raise ValueError(
+                f"Pages after the first of {self.site_url} found no new listings, "
+                f"`{self.page_parameter}` is likely ignored"
+            )
+        # Every page but the last should be as full as the first, up to listings moving between pages.
+        expected = (num_pages - 1) * len(first_listings)
+        if len(unique) < _MIN_PAGINATION_YIELD * expected:
+            raise ValueError(
+                f"Found {len(unique)} unique listings on {num_pages} pages of {len(first_listings)} listings at "
+                f"{self.site_url}, `{self.page_parameter}` is likely not paginating"
+            )
+
+
+def load_chrome_browser(local: bool):
+    # Imported here since Selenium is only needed as a fallback.
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    if local:
+        driver_locatino = "./chromedriver"
+    else:
+        driver_locatino = os.environ["CHROMEDRIVER_PATH"]
+
+        chrome_options.binary_location = os.environ["GOOGLE_CHROM_BIN"]
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--headless")
+
+    return webdriver.Chrome(driver_locatino, options=chrome_options)
+
+
+class SeleniumDiscovery:
+    """
+    Clicks through the search results in Chrome, for when they can not be read over plain HTTP. Each page is read from
+    its source in one go rather than element by element through the driver.
+    """
+
+    name = "selenium"
+
+    def __init__(self, site_url, local=False):
+        self.site_url = site_url
+        self.local = local
+
+    def discover(self):
+        browser = load_chrome_browser(self.local)
+        try:
+            browser.get(self.site_url)
+            time.sleep(8)
+            listings, num_pages = parse_search_page(
+                browser.page_source, browser.current_url
+            )
+            for _ in tqdm(range(1, num_pages or 1)):
+                # go to next page and restart
+                try:
+                    browser.find_element_by_xpath('//li[@class="next"]').click()
+                except Exception:
+                    break
+                time.sleep(3)
+                page_listings, _ = parse_search_page(
+                    browser.page_source, browser.current_url
+                )
+                listings += page_listings
+        finally:
+            # Close and Quit Browser to delete memory
+            browser.quit()
+        return _deduplicate(listings)
+
+
+def discover_listings(backends):
+    """
+    Find the listings with the first backend that works.
+
+    :return: List of `Listing`.
+    """
+    for i, backend in enumerate(backends):
+        try:
+            listings = backend.discover()
+        except Exception as e:
+            if i == len(backends) - 1:
+                raise
+            print(f"Discovery with `{backend.name}` failed ({e!r}), falling back")
+            continue
+        if listings or i == len(backends) - 1:
+            return listings
+        print(f"Discovery with `{backend.name}` found no listings, falling back")
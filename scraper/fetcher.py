@@ -0,0 +1,165 @@
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth another attempt: throttling and transient server errors.
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# A fetched page, with the validators to send when fetching it again. `text` is None if the server answered that the
+# page was not modified.
+Page = namedtuple("Page", ["text", "etag", "last_modified"])
+
+
+def page_filename(url):
+    """
+    Name under which a page is recorded, so that `scraper.replay_server` can serve it back for the same URL path.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    return quote(path.lstrip("/"), safe="") + ".html"
+
+
+class RateLimiter:
+    """
+    Spaces out requests to each host so that at most `requests_per_second` are started per host, however many threads
+    are fetching.
+    """
+
+    def __init__(self, requests_per_second):
+        self._interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval
+        # Sleep outside of the lock so that requests to other hosts are not held up.
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """
+    Fetches pages concurrently from a bounded pool of threads. Each thread keeps its own session, so connections are
+    reused between requests. Throttled or failed requests are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_workers=8,
+        requests_per_second=4.0,
+        max_retries=3,
+        backoff=1.0,
+        timeout=30,
+        record_dir=None,
+        metrics=None,
+    ):
+        """
+        :param metrics: `scraper.metrics.RunMetrics` to report request latencies and retries to.
+        """
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.record_dir = record_dir
+        self.metrics = metrics
+        self._rate_limiter = RateLimiter(requests_per_second)
+        self._local = threading.local()
+        if record_dir is not None:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = self.backoff * 2 ** attempt
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            delay = max(delay, int(response.headers["Retry-After"]))
+        # Jitter so that threads throttled together do not retry together.
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def _count_retry(self, error=None):
+        if self.metrics is not None:
+            self.metrics.count("fetch.retries")
+            if error is not None:
+                self.metrics.error("fetch_attempt", error)
+
+    def fetch(self, url, headers=None):
+        """
+        :param headers: Extra request headers, e.g. `If-None-Match` to only get the page back if it changed.
+        :return: The page, as a `Page`.
+        :raises requests.RequestException: If the page could not be fetched after all retries.
+        """
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self._rate_limiter.wait(host)
+            start = time.perf_counter()
+            try:
+                response = self._session().get(
+                    url, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                self._count_retry(e)
+                self._sleep_before_retry(attempt)
+                continue
+            if self.metrics is not None:
+                self.metrics.observe("fetch", time.perf_counter() - start)
+                self.metrics.count(f"fetch.status.{response.status_code}")
+                self.metrics.count("fetch.bytes", len(response.content))
+            if response.status_code in _RETRY_STATUSES and attempt < self.max_retries:
+                self._count_retry()
+                self._sleep_before_retry(attempt, response)
+                continue
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 304:
+                return Page(None, etag, last_modified)
+            if self.record_dir is not None:
+                path = os.path.join(self.record_dir, page_filename(url))
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(response.text)
+            return Page(response.text, etag, last_modified)
+
+    def fetch_all(self, items, headers=None):
+        """
+        Fetch many pages, in the order they complete.
+
+        :param items: Iterable of tuples whose first element is the URL to fetch, e.g. (url, mls_id).
+        :param headers: Function of an item returning its extra request headers.
+        :return: Iterator of (item, page, error) tuples. `page` is None if the page could not be fetched, and `error` is
+            the exception raised.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.fetch, item[0], headers(item) if headers else None
+                ): item
+                for item in items
+            }
+            for future in as_completed(futures):
+                item = futures.pop(future)
+                # Any error, e.g. an invalid URL or a decoding error, only fails the fetch of its own item.
+                try:
+                    page, error = future.result(), None
+                except Exception as e:
+                    page, error = None, e
+                yield item, page, error
@@ -0,0 +1,97 @@
+import glob
+import json
+import os
+
+from scraper.discovery import Listing
+
+
+class RunJournal:
+    """
+    Local checkpoint of a scraper run: the listings found, and every record parsed so far, appended to a JSON lines
+    file. A run interrupted before writing to the database resumes from it instead of starting over, even on another
+    day.
+    """
+
+    def __init__(self, directory, task, run_id, checkpoint_every=200):
+        """
+        :param run_id: Identifier of the run, e.g. the date it started. The journal is only resumed by a run with the
+            same identifier.
+        :param checkpoint_every: Number of records kept in memory before they are written to the journal.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = run_id
+        self.records_path = os.path.join(directory, f"{task}-{run_id}.jsonl")
+        self.listings_path = os.path.join(directory, f"{task}-{run_id}-listings.json")
+        self.checkpoint_every = checkpoint_every
+        self._pending = []
+
+    @classmethod
+    def latest(cls, directory, task, checkpoint_every=200):
+        """
+        :return: Journal of the interrupted run of `task` which started last, or None if there is none.
+        """
+        prefix = os.path.join(glob.escape(directory), f"{glob.escape(task)}-")
+        # Listings are saved when a run starts, and the journal is deleted once it completes.
+        paths = glob.glob(f"{prefix}*-listings.json")
+        if not paths:
+            return None
+        path = max(paths, key=os.path.getmtime)
+        run_id = os.path.basename(path)[len(task) + 1 : -len("-listings.json")]
+        return cls(directory, task, run_id, checkpoint_every)
+
+    def load_listings(self):
+        """
+        :return: Listings found by the interrupted run, or None if there is none.
+        """
+        try:
+            with open(self.listings_path) as f:
+                return [Listing(*listing) for listing in json.load(f)]
+        except FileNotFoundError:
+            return None
+
+    def save_listings(self, listings):
+        tmp_path = f"{self.listings_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([list(listing) for listing in listings], f)
+        os.replace(tmp_path, self.listings_path)
+
+    def load_records(self):
+        """
+        :return: Records checkpointed by the interrupted run.
+        """
+        try:
+            with open(self.records_path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return []
+        # Drop a line the run was interrupted while writing, so new records are not appended to it.
+        complete = content[: content.rfind(b"\n") + 1]
+        if len(complete) < len(content):
+            os.truncate(self.records_path, len(complete))
+        return [json.loads(line) for line in complete.decode("utf-8").splitlines()]
+
+    def append(self, record):
+        self._pending.append(record)
+        if len(self._pending) >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if not self._pending:
+            return
+        with open(self.records_path, "a") as f:
+            for record in self._pending:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def complete(self):
+        """
+        Delete the journal once its records are safely in the database.
+        """
+        self._pending = []
+        for path in (self.records_path, self.listings_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the buckets of the latency histograms.
+_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60]
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class RunMetrics:
+    """
+    Instrumentation of a scraper run: latencies of each stage (discovery, fetch, parse, database write), counters, and
+    errors by stage, exception type and parsed field. Safe to update from several threads.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self.counters = Counter()
+        self.errors = Counter()
+        self.field_errors = Counter()
+        self.missing_fields = Counter()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._latencies[stage].append(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def error(self, stage, error, field=None):
+        """
+        :param error: The exception, or the name of its type.
+        :param field: Field of the record being parsed when the error happened, if known.
+        """
+        error_type = error if isinstance(error, str) else type(error).__name__
+        with self._lock:
+            self.errors[f"{stage}.{error_type}"] += 1
+            if field is not None:
+                self.field_errors[f"{field}.{error_type}"] += 1
+
+    def record(self, record):
+        """
+        Count a parsed record, and which of its fields are missing. A field suddenly missing from most records is
+        the sign of a markup change.
+        """
+        with self._lock:
+            self.counters["records"] += 1
+            for field, value in record.items():
+                if value is None:
+                    self.missing_fields[field] += 1
+
+    def _stage_report(self, latencies, elapsed):
+        values = sorted(latencies)
+        histogram = Counter()
+        for value in values:
+            bucket = next((b for b in _BUCKETS if value <= b), "inf")
+            histogram[str(bucket)] += 1
+        return {
+            "count": len(values),
+            "total_seconds": sum(values),
+            "per_second": len(values) / elapsed if elapsed else None,
+            "mean": sum(values) / len(values),
+            "p50": _percentile(values, 0.5),
+            "p90": _percentile(values, 0.9),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+            "histogram": {
+                str(b): histogram[str(b)]
+                for b in _BUCKETS + ["inf"]
+                if histogram[str(b)]
+            },
+        }
+
+    def report(self, **context):
+        """
+        :param context: Extra information about the run, e.g. the task.
+        :return: JSON-serializable summary of the run.
+        """
+        elapsed = time.time() - self.started
+        with self._lock:
+            num_records = self.counters["records"]
+            return {
+                **context,
+                "started": self.started,
+                "elapsed_seconds": elapsed,
+                "stages": {
+                    stage: self._stage_report(latencies, elapsed)
+                    for stage, latencies in self._latencies.items()
+                    if latencies
+                },
+                "counters": dict(self.counters),
+                "errors": dict(self.errors),
+                "field_errors": dict(self.field_errors),
+                "missing_field_rates": {
+                    field: count / num_records
+                    for field, count in self.missing_fields.items()
+                },
+            }
+
+    def write_report(self, path, **context):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = self.report(**context)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
@@ -0,0 +1,415 @@
+import datetime
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from lxml import etree
+
+_BEDROOM = re.compile("bedroom")
+_BATHROOM = re.compile("bathroom")
+
+
+def _is_element(node):
+    # Comments and processing instructions are also nodes of the tree, with a function as tag.
+    return isinstance(node, etree._Element) and isinstance(node.tag, str)
+
+
+def _text(node):
+    """
+    Text of a node and its descendants, like BeautifulSoup's `.text`.
+    """
+    if isinstance(node, str):
+        return node
+    return "".join(node.itertext())
+
+
+def _string(element):
+    """
+    The only string inside of an element, like BeautifulSoup's `.string`: None unless the element holds a single string,
+    or a single child which itself holds a single string.
+    """
+    while True:
+        if len(element) == 0:
+            return element.text or None
+        if len(element) > 1 or element.text or element[0].tail:
+            return None
+        element = element[0]
+        if not _is_element(element):
+            return element.text
+
+
+def _subtree(node):
+    # Nodes of a subtree in document order, then the text following it.
+    yield node
+    if _is_element(node):
+        if node.text:
+            yield node.text
+        for child in node:
+            yield from _subtree(child)
+    if node.tail:
+        yield node.tail
+
+
+def _following(element):
+    """
+    Nodes after an element in document order, strings included, like successive BeautifulSoup `.next_element`.
+    """
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from _subtree(child)
+    node = element
+    while node is not None:
+        if node.tail:
+            yield node.tail
+        for sibling in node.itersiblings():
+            yield from _subtree(sibling)
+        node = node.getparent()
+
+
+class _PageElements:
+    """
+    Elements of a property page that fields are read from, collected in a single pass over the tree rather than with
+    one search of the whole document per field.
+    """
+
+    def __init__(self, html, find_room_counts=False):
+        root = etree.fromstring(html, etree.HTMLParser())
+        self.category = None
+        self.address = None
+        self.description = None
+        self.buy_price = None
+        self.by_id = {}
+        self.unit_details = []
+        self.carac_titles = {}
+        self.bedrooms = None
+        self.bathrooms = None
+        if root is None:
+            return
+
+        for element in root.iter(tag=etree.Element):
+            tag = element.tag
+            attributes = element.attrib
+            element_id = attributes.get("id")
+            if element_id is not None and element_id not in self.by_id:
+                self.by_id[element_id] = element
+            if tag == "div":
+                classes = attributes.get("class")
+                if classes is not None and "carac-title" in classes.split():
+                    title = _string(element)
+                    if title is not None and title not in self.carac_titles:
+                        self.carac_titles[title] = element
+                if attributes.get("itemprop") == "description":
+                    if self.description is None:
+                        self.description = element
+                if find_room_counts and (
+                    self.bedrooms is None or self.bathrooms is None
+                ):
+                    string = _string(element)
+                    if string is not None:
+                        if self.bedrooms is None and _BEDROOM.search(string):
+                            self.bedrooms = element
+                        if self.bathrooms is None and _BATHROOM.search(string):
+                            self.bathrooms = element
+            elif tag == "span":
+                if attributes.get("data-id") == "NbUniteFormatted":
+                    self.unit_details.append(element)
+                if element_id == "BuyPrice" and self.buy_price is None:
+                    self.buy_price = element
+            elif tag == "h1":
+                if attributes.get("itemprop") == "category" and self.category is None:
+                    self.category = element
+            elif tag == "h2":
+                if attributes.get("itemprop") == "address" and self.address is None:
+                    self.address = element
+
+    def carac_value(self, title, num_nodes):
+        """
+        Same as `scraper.scraper.find_carac_title_element_text`.
+        """
+        element = self.carac_titles.get(title)
+        if element is None:
+            return None
+        return _text(next(islice(_following(element), num_nodes - 1, None), None))
+
+
+def _parse_area(area):
+    if area is not None:
+        area = area.replace(" sqft", "")
+        area = area.replace(",", "")
+        area = float(area)
+    return area
+
+
+def _parse_neighborhood(address_parts, city):
+    neighborhood = [part for part in address_parts if "Neighbourhood" in part]
+    if neighborhood:
+        return neighborhood[0].replace("Neighbourhood", "").strip()
+    if "(" in city:
+        return city[city.find("(") + 1 : city.find(")")]
+    return None
+
+
+def _parse_description(description):
+    if description is not None:
+        description = _text(description).replace("\r\n", "").strip()
+    return description
+
+
+def _parse_property_type(category):
+    property_type = _text(category)
+    property_type = property_type.replace("\n", "")
+    return property_type.replace("\xa0", " ")
+
+
+class ParseError(Exception):
+    """
+    A page could not be parsed. `field` is the field which was being read.
+    """
+
+    def __init__(self, field, error_type, message):
+        # Passed on to Exception so the error can be pickled back from worker processes.
+        super().__init__(field, error_type, message)
+        self.field = field
+        self.error_type = error_type
+        self.message = message
+
+    def __str__(self):
+        return f"Could not parse `{self.field}`: {self.error_type}: {self.message}"
+
+
+def parse_rental_page(html, property_url, mls_id):
+    """
+    Same as `scraper.scraper.parse_rental_property_info`, with a single pass over the page.
+
+    :raises ParseError: If the page could not be parsed.
+    """
+    field = "page"
+    try:
+        page = _PageElements(html, find_room_counts=True)
+
+        field = "property_type"
+        property_type = _parse_property_type(page.category)
+        if "sale" in property_type:
+            raise ValueError(
+                "Property is for sale. We are concerned with properties to rent."
+            )
+        property_type = property_type.replace("for rent", "").strip()
+
+        field = "num_bedrooms"
+        num_bedrooms = _text(page.bedrooms).split("(")[0]
+        num_bedrooms = int("".join([c for c in num_bedrooms if c.isdigit()]))
+        field = "num_bathrooms"
+        num_bathrooms = _text(page.bathrooms)
+        num_bathrooms = int("".join([c for c in num_bathrooms if c.isdigit()]))
+
+        date = datetime.datetime.now().strftime("%Y-%m-%d")
+
+        field = "full_address"
+        full_address = _text(page.address)
+        address_parts = full_address.split(",")
+        field = "city"
+        city = address_parts[2]
+        if "apt" in city:
+            city = address_parts[3]
+
+        field = "area"
+        area = page.carac_value("Gross area", 4)
+        if area is None:
+            area = page.carac_value("Net area", 4)
+        area = _parse_area(area)
+
+        field = "rent"
+        rent = float(page.buy_price.attrib["content"])
+
+        field = "neighborhood"
+        neighborhood = _parse_neighborhood(address_parts, city)
+        field = "year_built"
+        year_built = page.carac_value("Year built", 4)
+        field = "extra_features"
+        extra_features = page.carac_value("Additional features", 4)
+        field = "description"
+        description = _parse_description(page.description)
+    except Exception as e:
+        raise ParseError(field, type(e).__name__, str(e)) from e
+
+    return {
+        "rent": rent,
+        "full_address": full_address,
+        "city": city,
+        "neighborhood": neighborhood,
+        "year_built": year_built,
+        "extra_features": extra_features,
+        "num_bathrooms": num_bathrooms,
+        "num_bedrooms": num_bedrooms,
+        "area": area,
+        "unique_id": date + "-" + str(mls_id),
+        "date": date,
+        "property_type": property_type,
+        "description": description,
+        "url": property_url,
+        "mls_id": mls_id,
+    }
+
+
+def parse_sale_page(html, property_url, mls_id):
+    """
+    Same as `scraper.scraper.parse_sale_property_info`, with a single pass over the page.
+
+    :raises ParseError: If the page could not be parsed.
+    """
+    field = "page"
+    try:
+        page = _PageElements(html)
+
+        field = "unit_descriptions"
+        unit_details = [_text(detail) for detail in page.unit_details]
+        unit_descriptions = [text for text in unit_details if "(" in text][0]
+        field = "num_bedrooms"
+        main_unit_description = [text for text in unit_details if "room" in text]
+        if main_unit_description:
+            _, num_bedrooms, num_bathrooms = main_unit_description[0].split(",")
+            num_bedrooms = int("".join([c for c in num_bedrooms if c.isdigit()]))
+            field = "num_bathrooms"
+            num_bathrooms = int("".join([c for c in num_bathrooms if c.isdigit()]))
+        else:
+            num_bathrooms = None
+            num_bedrooms = None
+
+        field = "claimed_revenue"
+        claimed_revenue = page.carac_value("Potential gross revenue", 4)
+        if claimed_revenue is not None:
+            claimed_revenue = claimed_revenue.replace("$", "")
+            claimed_revenue = claimed_revenue.replace(",", "")
+            claimed_revenue = float(claimed_revenue)
+
+        field = "latitude"
+        latitude = float(_string(page.by_id["PropertyLat"]))
+        field = "longitude"
+        longitude = float(_string(page.by_id["PropertyLng"]))
+        field = "price"
+        price = float(page.buy_price.attrib["content"])
+
+        date = datetime.datetime.now().strftime("%Y-%m-%d")
+
+        field = "full_address"
+        full_address = _text(page.address)
+        address_parts = full_address.split(",")
+        field = "city"
+        city = address_parts[2]
+
+        field = "building_area"
+        building_area = _parse_area(
+            page.carac_value("Building area (at ground level)", 4)
+        )
+        field = "lot_area"
+        lot_area = _parse_area(page.carac_value("Lot area", 4))
+        field = "property_type"
+        property_type = _parse_property_type(page.category)
+
+        field = "num_residential_units"
+        num_residential_units = [text for text in unit_details if " x " in text]
+        field = "neighborhood"
+        neighborhood = _parse_neighborhood(address_parts, city)
+        field = "year_built"
+        year_built = page.carac_value("Year built", 4)
+        field = "extra_features"
+        extra_features = page.carac_value("Additional features", 4)
+        field = "parking"
+        parking = page.carac_value("Parking", 4)
+        field = "pool"
+        pool = page.carac_value("Pool", 3)
+        field = "description"
+        description = _parse_description(page.description)
+    except Exception as e:
+        raise ParseError(field, type(e).__name__, str(e)) from e
+
+    return {
+        "price": price,
+        "latitude": latitude,
+        "longitude": longitude,
+        "unit_descriptions": unit_descriptions,
+        "num_residential_units": num_residential_units,
+        "claimed_revenue": claimed_revenue,
+        "full_address": full_address,
+        "city": city,
+        "neighborhood": neighborhood,
+        "year_built": year_built,
+        "extra_features": extra_features,
+        "num_bathrooms": num_bathrooms,
+        "num_bedrooms": num_bedrooms,
+        "building_area": building_area,
+        "lot_area": lot_area,
+        "parking": parking,
+        "pool": pool,
+        "date": date,
+        "unique_id": date + "-" + str(mls_id),
+        "property_type": property_type,
+        "description": description,
+        "url": property_url,
+        "mls_id": mls_id,
+    }
+
+
+PAGE_PARSERS = {"rentals": parse_rental_page, "sales": parse_sale_page}
+
+
+def parse_page(task, html, property_url, mls_id):
+    return PAGE_PARSERS[task](html, property_url, mls_id)
+
+
+def _timed_parse_page(task, html, property_url, mls_id):
+    start = time.perf_counter()
+    record = parse_page(task, html, property_url, mls_id)
+    return record, time.perf_counter() - start
+
+
+class ParserPool:
+    """
+    Parses pages in worker processes, so that parsing is not limited to one core while pages are being fetched.
+    """
+
+    def __init__(self, task, max_workers=None):
+        self.task = task
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, html, property_url, mls_id):
+        """
+        :return: Future of the parsed page and the seconds spent parsing it. Its result raises `ParseError` if the page
+            could not be parsed.
+        """
+        return self._executor.submit(
+            _timed_parse_page, self.task, html, property_url, mls_id
+        )
+
+    def map(self, pages, chunksize=16):
+        """
+        :param pages: Iterable of (html, property_url, mls_id) tuples.
+        :return: Iterator of parsed pages, in order, with None for pages that could not be parsed.
+        """
+        html, urls, mls_ids = zip(*pages) if pages else ((), (), ())
+        return self._executor.map(
+            _parse_or_none,
+            [self.task] * len(html),
+            html,
+            urls,
+            mls_ids,
+            chunksize=chunksize,
+        )
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _parse_or_none(task, html, property_url, mls_id):
+    try:
+        return parse_page(task, html, property_url, mls_id)
+    except Exception:
+        return None
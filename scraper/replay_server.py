@@ -0,0 +1,83 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scraper.fetcher import page_filename
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    # Keep connections alive, as the real site does.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    page_directory = None
+    delay = 0
+
+    def do_GET(self):
+        if self.delay:
+            # Stand in for the latency of the real site.
+            time.sleep(self.delay)
+        path = os.path.join(self.page_directory, page_filename(self.path))
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(directory, port=0, delay=0):
+    """
+    Serve pages recorded with `Fetcher(record_dir=...)` from a background thread, so the scraper can be run against
+    them instead of the real site.
+
+    :param port: Port to listen on. By default, any free port.
+    :param delay: Seconds to wait before answering each request.
+    :return: The server, to be stopped with `shutdown()`, and its base URL.
+    """
+    handler = type(
+        "ReplayHandler",
+        (_ReplayHandler,),
+        {"page_directory": directory, "delay": delay},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--directory", required=True)
+    parser.add_argument("-p", "--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0)
+    args = parser.parse_args()
+
+    server, url = start_replay_server(args.directory, args.port, args.delay)
+    print(f"Replaying pages from {args.directory} at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,25 @@ import argparse
 import datetime
 import os
 import re
-import time
+from collections import deque
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from sqlalchemy import create_engine
 from tqdm import tqdm
 
+from scraper.crawl_index import CrawlIndex
+from scraper.database import save_results
+from scraper.discovery import (
+    SITE_URLS,
+    HttpDiscovery,
+    SeleniumDiscovery,
+    discover_listings,
+)
+from scraper.fetcher import Fetcher
+from scraper.journal import RunJournal
+from scraper.metrics import RunMetrics
+from scraper.parsing import ParseError, ParserPool
+
 
 def _parse_args():
     parser = argparse.ArgumentParser()
@@ -28,53 +37,81 @@ def _parse_args():
         action="store_true",
         help="Whether the script is being run locally or on a server. Affects Chrome options.",
     )
+    parser.add_argument(
+        "-d",
+        "--discovery",
+        choices=["http", "selenium"],
+        default="http",
+        help="How to read the search results. Over plain HTTP falls back to Selenium if it fails.",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of property pages fetched at the same time.",
+    )
+    parser.add_argument(
+        "-r",
+        "--rate",
+        type=float,
+        default=4.0,
+        help="Maximum number of requests per second to a single host.",
+    )
+    parser.add_argument(
+        "-p",
+        "--parse-workers",
+        type=int,
+        help="Number of processes parsing pages. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--crawl-index",
+        help="Path of the index of previously scraped listings. If given, unchanged listings are carried forward from it.",
+    )
+    parser.add_argument(
+        "--refresh-days",
+        type=int,
+        default=7,
+        help="With --crawl-index, fetch listings again after this many days even if they look unchanged.",
+    )
+    parser.add_argument(
+        "--record-dir",
+        help="Save every fetched property page to this directory, e.g. to replay with `scraper.replay_server`.",
+    )
+    parser.add_argument(
+        "--journal-dir",
+        default="data_cache/scraper_journal",
+        help="Directory where parsed records are checkpointed. An interrupted run resumes from its checkpoint.",
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Identifier of the run to checkpoint, and to resume if it was interrupted. Defaults to resuming the last "
+        "interrupted run of the task, or else to the date.",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=200,
+        help="Number of parsed records between checkpoints.",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard the checkpoint of an interrupted run instead of resuming from it.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Number of rows loaded into the database at a time.",
+    )
+    parser.add_argument(
+        "--report",
+        help="Path of the JSON report of the run. Defaults to a timestamped file in data_cache/scraper_reports.",
+    )
     return parser.parse_args()
 
 
-SITE_URLS = {
-    "rentals": "https://www.centris.ca/en/properties~for-rent?uc=2&view=Thumbnail",
-    "sales": "https://www.centris.ca/en/multi-family-properties~for-sale?view=Thumbnail",
-}
-
-
-def get_all_property_urls(browser, task):
-    property_urls = []
-    mls_ids = []
-    browser.get(SITE_URLS[task])
-    time.sleep(8)
-
-    num_pages = browser.find_element_by_xpath('//li[@class="pager-current"]').text
-    num_pages = int(num_pages.split("/")[1].replace(",", ""))
-
-    # LOOKUP URLS for each property
-    for i in tqdm(range(num_pages)):
-        skus = browser.find_elements_by_xpath('//meta[@itemprop="sku"]')
-
-        for sku in skus:
-            mls_id = sku.get_attribute("content")
-            mls_ids.append(mls_id)
-
-            # Prop URL
-            link = browser.find_element_by_xpath(
-                "//a[@data-mlsnumber='" + mls_id + "']"
-            )
-            url_prop_2 = link.get_attribute("href")
-            property_urls.append(url_prop_2)
-
-        # go to next page and restart
-        try:
-            browser.find_element_by_xpath('//li[@class="next"]').click()
-        except:
-            break
-        else:
-            time.sleep(3)
-
-    # Close and Quit Browser to delete memory
-    browser.close()
-    browser.quit()
-    return property_urls, mls_ids
-
-
 def find_carac_title_element_text(soup, search_text, num_elements):
     element = soup.find("div", class_="carac-title", text=search_text)
     if element is not None:
@@ -86,10 +123,7 @@ def find_carac_title_element_text(soup, search_text, num_elements):
     return text
 
 
-def get_rental_property_info(property_url, mls_id):
-    # make a GET request to fetch the raw HTML content
-    html_content_property = requests.get(property_url).text
-
+def parse_rental_property_info(html_content_property, property_url, mls_id):
     # parse the html content with BS
     soup = BeautifulSoup(html_content_property, "lxml")
 
@@ -174,10 +208,7 @@ def get_rental_property_info(property_url, mls_id):
     }
 
 
-def get_sale_property_info(property_url, mls_id):
-    # make a GET request to fetch the raw HTML content
-    html_content_property = requests.get(property_url).text
-
+def parse_sale_property_info(html_content_property, property_url, mls_id):
     # parse the html content with BS
     soup = BeautifulSoup(html_content_property, "lxml")
 
@@ -292,59 +323,135 @@ def get_sale_property_info(property_url, mls_id):
     }
 
 
-def _load_chrome_browser(local: bool):
-    chrome_options = Options()
-    if local:
-        driver_locatino = "./chromedriver"
-    else:
-        driver_locatino = os.environ["CHROMEDRIVER_PATH"]
-
-        chrome_options.binary_location = os.environ["GOOGLE_CHROM_BIN"]
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--headless")
-
-    return webdriver.Chrome(driver_locatino, options=chrome_options)
-
-
-def _save_results_to_aws(data, task, if_exists):
-    uri = os.environ["DATABASE_URL"]
-    engine = create_engine(uri)
-    data.to_sql(name=task, con=engine, if_exists=if_exists, index=False)
-
-
-def main():
-    args = _parse_args()
+def _scrape(args, date, metrics):
     task = args.task
-    print(f"Starting task `{task}`")
-
-    browser = _load_chrome_browser(args.local)
-    property_urls, mls_ids = get_all_property_urls(browser, task)
-    print(f"Found {len(property_urls)} properties")
-    data = []
-    if task == "rentals":
-        func = get_rental_property_info
-    else:
-        func = get_sale_property_info
-    for url, mls_id in tqdm(list(zip(property_urls, mls_ids))):
-        try:
-            info = func(url, mls_id)
-        except Exception as e:
-            pass
-        else:
-            data.append(info)
+    fetcher = Fetcher(
+        max_workers=args.concurrency,
+        requests_per_second=args.rate,
+        record_dir=args.record_dir,
+        metrics=metrics,
+    )
+    journal = None
+    if args.run_id is None:
+        journal = RunJournal.latest(args.journal_dir, task, args.checkpoint_every)
+    if journal is None:
+        journal = RunJournal(
+            args.journal_dir, task, args.run_id or date, args.checkpoint_every
+        )
+    if args.fresh:
+        journal.complete()
+    found = journal.load_listings()
+    if found is None:
+        backends = [SeleniumDiscovery(SITE_URLS[task], args.local)]
+        if args.discovery == "http":
+            # Selenium stays as a fallback.
+            backends.insert(0, HttpDiscovery(fetcher, SITE_URLS[task]))
+        with metrics.timer("discovery"):
+            found = discover_listings(backends)
+        journal.save_listings(found)
+    mls_ids = [listing.mls_id for listing in found]
+    print(f"Found {len(found)} properties")
+    metrics.count("listings", len(found))
+
+    # Resume from the records parsed before an interruption.
+    data = journal.load_records()
+    if data:
+        print(
+            f"Resuming from {len(data)} records checkpointed in {journal.records_path}"
+        )
+        metrics.count("records.resumed", len(data))
+    done = {record["mls_id"] for record in data}
+    remaining = [listing for listing in found if listing.mls_id not in done]
+    listings = [(listing.url, listing.mls_id) for listing in remaining]
+    crawl_index = None
+    if args.crawl_index is not None:
+        crawl_index = CrawlIndex(args.crawl_index, refresh_days=args.refresh_days)
+        listings, carried = crawl_index.plan(
+            listings, date, prices=[listing.price for listing in remaining]
+        )
+        for record in carried:
+            data.append(record)
+            journal.append(record)
+        metrics.count("records.carried_forward", len(carried))
 
-    print(f"Successfully extracted {len(data)} / {len(property_urls)} properties")
+    pages = fetcher.fetch_all(
+        listings, headers=crawl_index.request_headers if crawl_index else None
+    )
+    parsed = deque()
+
+    def collect_parsed(wait):
+        # Records are checkpointed as soon as they are parsed, in the order pages were fetched.
+        while parsed and (wait or parsed[0][1].done()):
+            page, future = parsed.popleft()
+            try:
+                info, seconds = future.result()
+            except ParseError as e:
+                metrics.error("parse", e.error_type, field=e.field)
+            except Exception as e:
+                metrics.error("parse", e)
+            else:
+                metrics.observe("parse", seconds)
+                metrics.record(info)
+                data.append(info)
+                journal.append(info)
+                if crawl_index is not None:
+                    crawl_index.update(info, page)
+
+    # Pages are parsed in other processes while the next ones are being fetched.
+    with ParserPool(task, max_workers=args.parse_workers) as parser_pool:
+        for (url, mls_id), page, error in tqdm(pages, total=len(listings)):
+            if error is not None:
+                metrics.error("fetch", error)
+                continue
+            if page.text is None:
+                record = crawl_index.not_modified(mls_id, page, date)
+                metrics.count("records.not_modified")
+                data.append(record)
+                journal.append(record)
+            else:
+                parsed.append((page, parser_pool.submit(page.text, url, mls_id)))
+            collect_parsed(wait=False)
+        collect_parsed(wait=True)
+    journal.checkpoint()
+
+    if crawl_index is not None:
+        crawl_index.save(mls_ids)
+        print(f"Incremental crawl: {dict(crawl_index.stats)}")
+        for name, value in crawl_index.stats.items():
+            metrics.count(f"crawl_index.{name}", value)
+    print(f"Successfully extracted {len(data)} / {len(found)} properties")
     # Enter values in DF
     df = pd.DataFrame(data)
 
-    _save_results_to_aws(df, task, "append")
-    if task == "sales":
-        _save_results_to_aws(df, "latest_sales", "replace")
+    with metrics.timer("database_write"):
+        save_results(df, task, batch_size=args.batch_size)
+    metrics.count("rows_written", len(df))
+    journal.complete()
 
     print("Pushed results to AWS")
 
 
+def main():
+    args = _parse_args()
+    print(f"Starting task `{args.task}`")
+    date = datetime.datetime.now().strftime("%Y-%m-%d")
+    metrics = RunMetrics()
+    try:
+        _scrape(args, date, metrics)
+    except BaseException as e:
+        metrics.error("run", e)
+        raise
+    finally:
+        report_path = args.report or os.path.join(
+            "data_cache",
+            "scraper_reports",
+            f"{args.task}-{datetime.datetime.now():%Y-%m-%dT%H%M%S}.json",
+        )
+        report = metrics.write_report(report_path, task=args.task, date=date)
+        print(
+            f"Run report written to {report_path}. Errors: {report['errors'] or 'none'}"
+        )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from scraper.discovery import SITE_URLS, HttpDiscovery
+from scraper.fetcher import Fetcher
+from scraper.replay_server import start_replay_server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded pages of search results to measure the throughput of listing discovery."
+    )
+    parser.add_argument("-t", "--task", choices=["rentals", "sales"], required=True)
+    parser.add_argument(
+        "-d",
+        "--directory",
+        required=True,
+        help="Directory of pages recorded with `python -m scraper.scraper --record-dir`.",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.2,
+        help="Seconds the replay server waits before answering, to stand in for the real site.",
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, nargs="+", default=[1, 4, 8, 16]
+    )
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(args.directory, delay=args.delay)
+    base = urlsplit(base_url)
+    site_url = urlunsplit(
+        urlsplit(SITE_URLS[args.task])._replace(scheme=base.scheme, netloc=base.netloc)
+    )
+    try:
+        for concurrency in args.concurrency:
+            fetcher = Fetcher(max_workers=concurrency, requests_per_second=None)
+            start = time.perf_counter()
+            listings = HttpDiscovery(fetcher, site_url).discover()
+            duration = time.perf_counter() - start
+            print(
+                f"{concurrency} concurrent pages: {len(listings)} listings in {duration:.2f}s, "
+                f"{len(listings) / duration:.0f} listings/s"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from project_real_estate.models.financial_model import SimpleFinancialModel
+from project_real_estate.models.forecast_graph import ForecastSession
+from scripts.benchmark_scenarios import _synthetic_properties
+
+# Initial values of the dashboard, then one slider move at a time.
+_PARAMETERS = dict(
+    downpayment=0.15,
+    closing_fees=0.02,
+    interest_rate=0.03,
+    amortization=25,
+    forecast_horizon=25,
+    vacancy=0.03,
+    property_tax_rate=0.01,
+    rate_rent_increase=0.0,
+    expense_ratio=0.2,
+    yearly_reserves=0,
+)
+_MOVES = [
+    ("yearly_reserves", 5000),
+    ("property_tax_rate", 0.012),
+    ("expense_ratio", 0.25),
+    ("vacancy", 0.05),
+    ("interest_rate", 0.035),
+    ("downpayment", 0.2),
+    ("forecast_horizon", 20),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare forecasts from scratch with incremental forecasts, as one parameter changes at a time."
+    )
+    parser.add_argument("-n", "--num-properties", type=int, default=20000)
+    args = parser.parse_args()
+
+    price, monthly_rent, year_built = _synthetic_properties(args.num_properties)
+    session = ForecastSession(price, monthly_rent, year_built)
+    parameters = dict(_PARAMETERS)
+    session.forecast(**parameters)
+    for name, value in [(None, None)] + _MOVES:
+        if name is not None:
+            parameters[name] = value
+        start = time.perf_counter()
+        SimpleFinancialModel(**parameters).forecast(price, monthly_rent, year_built)
+        full_time = time.perf_counter() - start
+        start = time.perf_counter()
+        session.forecast(**parameters)
+        incremental_time = time.perf_counter() - start
+        print(
+            f"{name or 'no change'}: {1000 * full_time:.1f}ms from scratch, {1000 * incremental_time:.1f}ms "
+            f"incremental, computing {', '.join(session.computed) or 'nothing'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
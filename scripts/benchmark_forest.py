@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+
+from project_real_estate.models import forest
+from project_real_estate.models.forest import FlatForest
+from scripts.benchmark_model_loading import _synthetic_features, _train
+
+
+def _time(func, num_rows):
+    # Repeat small batches, whose duration is mostly overhead.
+    repeat = max(1, min(100, 10000 // num_rows))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare predictions of a random forest with sklearn and with its flattened arrays."
+    )
+    parser.add_argument("--num-trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument(
+        "-b",
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100, 1000, 10000, 100000, 1000000],
+    )
+    args = parser.parse_args()
+
+    model = _train(50000, args.num_trees, args.max_depth)
+    estimator = model._estimator
+    start = time.perf_counter()
+    flat_forest = FlatForest.from_estimator(estimator)
+    print(
+        f"Flattened {len(flat_forest.roots)} trees, {len(flat_forest.value)} nodes, "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+    backends = ["numpy"]
+    if forest.numba is not None:
+        backends.append("numba")
+        print(f"Backends: numpy, numba {forest.numba.__version__}")
+        start = time.perf_counter()
+        flat_forest.predict(_synthetic_features(2), backend="numba")
+        flat_forest.predict(_synthetic_features(1), backend="numba")
+        print(f"numba compilation: {time.perf_counter() - start:.2f}s")
+    else:
+        print("Backends: numpy only, numba is not installed (`poetry install -E fast`)")
+
+    for num_rows in args.batch_sizes:
+        X = _synthetic_features(num_rows, seed=3)
+        sklearn_time, expected = _time(lambda: estimator.predict(X), num_rows)
+        timings = [f"sklearn {1000 * sklearn_time:.2f}ms"]
+        for backend in backends:
+            duration, result = _time(
+                lambda: flat_forest.predict(X, backend=backend), num_rows
+            )
+            np.testing.assert_allclose(result, expected, rtol=1e-9)
+            timings.append(
+                f"{backend} {1000 * duration:.2f}ms ({sklearn_time / duration:.1f}x)"
+            )
+        print(f"{num_rows} rows: " + ", ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
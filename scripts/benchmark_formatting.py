@@ -0,0 +1,70 @@
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from project_real_estate.constants import COLUMNS_TO_DISPLAY
+from project_real_estate.dash_app.formatting import format_frame, format_records
+
+_OUTPUT_COLUMNS = ["investment", "revenue", "cap_rate", "net_cash", "ROE"]
+
+
+def _synthetic_results(num_results, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame(
+        {
+            "city": "Montréal (Rosemont/La Petite-Patrie)",
+            "full_address": [
+                f"{i} Rue Saint-Denis, Montréal (Rosemont), Neighbourhood X"
+                for i in range(num_results)
+            ],
+            "property_type": "Triplex for sale",
+            "url": "https://www.centris.ca",
+            "price": rng.uniform(100000, 5000000, num_results),
+            "investment": rng.uniform(10000, 1000000, num_results),
+            "revenue": rng.uniform(10000, 500000, num_results),
+            "cap_rate": rng.uniform(-0.1, 0.2, num_results),
+            "net_cash": rng.uniform(-50000, 50000, num_results),
+            "ROE": rng.uniform(-0.1, 0.3, num_results),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", "--num-results", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("-r", "--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for num_results in args.num_results:
+        data = _synthetic_results(num_results)
+
+        def run_format_frame():
+            # The previous callback formatted a slice of the shared frame, which pandas had to copy.
+            formatted = format_frame(data.copy())
+            return formatted.loc[:, COLUMNS_TO_DISPLAY].to_dict("records")
+
+        def run_format_records():
+            return format_records(
+                city=data.city.values,
+                full_address=data.full_address.values,
+                property_type=data.property_type.values,
+                price=data.price.values,
+                outputs={column: data[column].values for column in _OUTPUT_COLUMNS},
+            )
+
+        assert run_format_frame() == run_format_records()
+        frame_time = timeit.timeit(run_format_frame, number=args.repeat) / args.repeat
+        records_time = (
+            timeit.timeit(run_format_records, number=args.repeat) / args.repeat
+        )
+        print(
+            f"{num_results} rows: format_frame {1000 * frame_time:.3f}ms, "
+            f"format_records {1000 * records_time:.3f}ms "
+            f"({frame_time / records_time:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
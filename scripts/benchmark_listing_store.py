@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from project_real_estate.dash_app.listing_store import ListingIndex
+
+
+def _synthetic_listings(num_listings, seed=0):
+    rng = np.random.RandomState(seed)
+    cities = np.array([f"City {i}" for i in range(200)])
+    return pd.DataFrame(
+        {
+            "mls_id": np.arange(num_listings).astype(str),
+            "price": rng.uniform(100000, 5000000, num_listings).round(),
+            "year_built": rng.randint(1900, 2020, num_listings).astype(float),
+            "city": cities[rng.randint(0, len(cities), num_listings)],
+            "full_address": "1 Main Street, City",
+            "property_type": "Triplex",
+            "predicted_rent_revenue": rng.uniform(1000, 10000, num_listings),
+        }
+    )
+
+
+def _time(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-listings", type=int, default=1000000)
+    parser.add_argument("-r", "--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data = _synthetic_listings(args.num_listings)
+    build_time, index = _time(lambda: ListingIndex(data), 1)
+    print(f"Index built in {build_time:.2f}s for {len(data)} listings")
+
+    queries = {
+        "narrow price range": ([], (1000000, 1010000), (1900, 2020)),
+        "one city": (["City 7"], (0, 10000000), (1800, 2030)),
+        "one city, recent years": (["City 7"], (0, 10000000), (2015, 2020)),
+        "everything": ([], (0, 10000000), (1800, 2030)),
+    }
+    for name, (cities, price_range, year_range) in queries.items():
+        index_time, positions = _time(
+            lambda: index.filter(cities, price_range, year_range), args.repeat
+        )
+
+        def mask_filter():
+            mask = (
+                (data.price > price_range[0])
+                & (data.price < price_range[1])
+                & (data.year_built > year_range[0])
+                & (data.year_built < year_range[1])
+            )
+            if cities:
+                mask &= data.city.isin(cities)
+            return mask
+
+        mask_time, _ = _time(mask_filter, args.repeat)
+        print(
+            f"{name}: {len(positions)} listings, index {1000 * index_time:.3f}ms, "
+            f"boolean masks {1000 * mask_time:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
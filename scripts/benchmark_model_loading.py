@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from project_real_estate.models.artifact import load_model, save_model
+from project_real_estate.models.preprocessor import PropertyPreprocessor
+from project_real_estate.models.rent_estimator import SKLearnRentEstimator
+
+_MODES = {
+    "pickle": "Unpickle the whole model",
+    "artifact": "Load the artifact, reading the estimator in memory",
+    "artifact-mmap": "Load the artifact, memory-mapping the estimator",
+}
+
+
+def _synthetic_features(num_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    num_bedrooms = rng.randint(0, 4, num_rows)
+    return pd.DataFrame(
+        {
+            "num_bathrooms": rng.randint(1, 3, num_rows),
+            "num_bedrooms": num_bedrooms,
+            "area": (num_bedrooms + 2) * 100 + rng.randint(-50, 50, num_rows),
+            "year_built": rng.randint(1900, 2020, num_rows),
+            "neighborhood": rng.randint(0, 100, num_rows),
+        }
+    )
+
+
+def _train(num_rows, num_trees, max_depth):
+    X = _synthetic_features(num_rows)
+    y = (
+        500
+        + 300 * X.num_bedrooms
+        + X.area
+        + np.random.RandomState(1).normal(0, 200, num_rows)
+    )
+    preprocessor = PropertyPreprocessor()
+    preprocessor._fit_neighborhood_encoder(
+        pd.Series([f"Neighborhood {i}" for i in range(100)])
+    )
+    estimator = RandomForestRegressor(
+        n_estimators=num_trees, max_depth=max_depth, n_jobs=-1
+    )
+    estimator.fit(X, y)
+    # As saved by `train_model`.
+    estimator.set_params(n_jobs=1)
+    return SKLearnRentEstimator(preprocessor=preprocessor, estimator=estimator)
+
+
+def _rss_mb():
+    # Current resident set size on Linux, else the peak one.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(mode, path):
+    """
+    Run in a fresh process: time loading the model and its first prediction, and the memory they take.
+    """
+    X = _synthetic_features(1000, seed=2)
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if mode == "pickle":
+        model = pickle.load(open(path, "rb"))
+    else:
+        model = load_model(path, mmap_mode="r" if mode == "artifact-mmap" else None)
+    load_time = time.perf_counter() - start
+    model._estimator.predict(X)
+    first_predict_time = time.perf_counter() - start - load_time
+    print(
+        json.dumps(
+            {
+                "load_seconds": load_time,
+                "first_predict_seconds": first_predict_time,
+                "rss_mb": _rss_mb() - rss_before,
+            }
+        )
+    )
+
+
+def _size_mb(path):
+    if os.path.isdir(path):
+        return (
+            sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            / 2 ** 20
+        )
+    return os.path.getsize(path) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the cold start of the rent model, pickled or as a model artifact, each in a new process."
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        help="Pickled model to use instead of training one on synthetic data.",
+    )
+    parser.add_argument("-n", "--num-rows", type=int, default=50000)
+    parser.add_argument("--num-trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument(
+        "--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        _measure(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, "model.pkl")
+        artifact_path = os.path.join(directory, "model")
+        if args.model:
+            model = pickle.load(open(args.model, "rb"))
+        else:
+            model = _train(args.num_rows, args.num_trees, args.max_depth)
+        pickle.dump(model, open(pickle_path, "wb"))
+        save_model(model, artifact_path)
+        print(
+            f"Pickle: {_size_mb(pickle_path):.1f} MB, artifact: {_size_mb(artifact_path):.1f} MB"
+        )
+
+        for mode, description in _MODES.items():
+            path = pickle_path if mode == "pickle" else artifact_path
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "scripts.benchmark_model_loading",
+                        "--child",
+                        mode,
+                        path,
+                    ],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                ).stdout
+                runs.append(json.loads(output.decode().splitlines()[-1]))
+            best = {key: min(run[key] for run in runs) for key in runs[0]}
+            print(
+                f"{description}: load {best['load_seconds']:.3f}s, first prediction "
+                f"{best['first_predict_seconds']:.3f}s, +{best['rss_mb']:.0f} MB RSS"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import time
+from urllib.parse import unquote
+
+from scraper.parsing import PAGE_PARSERS, ParserPool
+from scraper.scraper import parse_rental_property_info, parse_sale_property_info
+
+_REFERENCE_PARSERS = {
+    "rentals": parse_rental_property_info,
+    "sales": parse_sale_property_info,
+}
+
+
+def _load_pages(directory):
+    """
+    Load pages recorded with `python -m scraper.scraper --record-dir`.
+
+    :return: List of (html, property_url, mls_id) tuples.
+    """
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".html"):
+            continue
+        url = "/" + unquote(name[: -len(".html")])
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            pages.append((f.read(), url, url.rstrip("/").split("/")[-1]))
+    return pages
+
+
+def _parse_all(parse, pages):
+    results = []
+    for html, url, mls_id in pages:
+        try:
+            results.append(parse(html, url, mls_id))
+        except Exception:
+            results.append(None)
+    return results
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--task", choices=["rentals", "sales"], required=True)
+    parser.add_argument(
+        "-d", "--directory", required=True, help="Directory of recorded pages."
+    )
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    pages = _load_pages(args.directory)
+    print(f"{len(pages)} pages")
+
+    reference_time, expected = _time(
+        lambda: _parse_all(_REFERENCE_PARSERS[args.task], pages)
+    )
+    single_pass_time, results = _time(
+        lambda: _parse_all(PAGE_PARSERS[args.task], pages)
+    )
+    with ParserPool(args.task, max_workers=args.workers) as parser_pool:
+        # Start the workers before timing.
+        list(parser_pool.map(pages[: args.workers]))
+        pool_time, pooled = _time(lambda: list(parser_pool.map(pages)))
+
+    mismatches = sum(e != r or e != p for e, r, p in zip(expected, results, pooled))
+    print(f"{mismatches} pages parsed differently from BeautifulSoup")
+    for name, duration in (
+        ("BeautifulSoup", reference_time),
+        ("single pass", single_pass_time),
+        (f"single pass, {args.workers} processes", pool_time),
+    ):
+        print(
+            f"{name}: {duration:.2f}s, {len(pages) / duration:.0f} pages/s, "
+            f"{reference_time / duration:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
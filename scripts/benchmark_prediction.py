@@ -0,0 +1,125 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from project_real_estate.models.prediction import PredictionCache
+from scripts.benchmark_model_loading import _train
+
+
+def _synthetic_sales(num_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    units = np.array(
+        [
+            '{"' + f"{rng.randint(1, 4)} x {rng.randint(3, 7)} ½" + '"}'
+            for _ in range(200)
+        ]
+    )
+    return pd.DataFrame(
+        {
+            "mls_id": [str(10000000 + i) for i in range(num_rows)],
+            "city": [
+                f"Montréal (Neighborhood {n})" for n in rng.randint(0, 100, num_rows)
+            ],
+            "year_built": rng.randint(1900, 2020, num_rows).astype(str).astype(object),
+            "num_residential_units": units[rng.randint(0, len(units), num_rows)],
+            "price": rng.uniform(2e5, 2e6, num_rows),
+            "claimed_revenue": np.where(
+                rng.rand(num_rows) < 0.1, np.nan, rng.uniform(1e4, 2e5, num_rows)
+            ),
+        }
+    )
+
+
+def _reference_predict(model, properties):
+    # `SKLearnRentEstimator.predict` as it was: one call to the forest and an element-wise `min`.
+    X, num_units, claimed_revenue = model._preprocessor.preprocess_sales_data(
+        properties
+    )
+    predicted_revenue = model._estimator.predict(X) * num_units
+    predicted_revenue = predicted_revenue.combine(claimed_revenue / 12, func=min)
+    predicted_revenue.name = "predicted_rent_revenue"
+    return predicted_revenue
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare rent predictions over all listings: as before, in parallel chunks, and with a warm cache."
+    )
+    parser.add_argument("-n", "--num-listings", type=int, default=200000)
+    parser.add_argument("--num-trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument(
+        "--changed",
+        type=float,
+        default=0.05,
+        help="Share of listings changed or new between two runs.",
+    )
+    args = parser.parse_args()
+
+    model = _train(50000, args.num_trees, args.max_depth)
+    sales = _synthetic_sales(args.num_listings)
+    # The next run: some listings sold and were replaced by new ones.
+    next_sales = sales.copy()
+    num_changed = int(args.changed * args.num_listings)
+    replaced = _synthetic_sales(num_changed, seed=1)
+    replaced["mls_id"] = [str(20000000 + i) for i in range(num_changed)]
+    next_sales.iloc[:num_changed] = replaced.values
+
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [
+            ("before", sales, lambda data: _reference_predict(model, data)),
+            (
+                "parallel chunks, no cache",
+                sales,
+                lambda data: model.predict(data, chunk_size=args.chunk_size),
+            ),
+            (
+                "cold cache",
+                sales,
+                lambda data: model.predict(
+                    data,
+                    cache=PredictionCache("benchmark", directory),
+                    chunk_size=args.chunk_size,
+                ),
+            ),
+            (
+                "warm cache after restart",
+                sales,
+                lambda data: model.predict(
+                    data,
+                    cache=PredictionCache("benchmark", directory),
+                    chunk_size=args.chunk_size,
+                ),
+            ),
+            (
+                f"warm cache, {100 * args.changed:.0f}% new listings",
+                next_sales,
+                lambda data: model.predict(
+                    data,
+                    cache=PredictionCache("benchmark", directory),
+                    chunk_size=args.chunk_size,
+                ),
+            ),
+        ]
+        expected = {}
+        for name, data, predict in runs:
+            # Preprocessing modifies the listings it is given.
+            duration, result = _time(lambda: predict(data.copy()))
+            if id(data) not in expected:
+                expected[id(data)] = _reference_predict(model, data.copy())
+            pd.testing.assert_series_equal(result, expected[id(data)])
+            print(f"{name}: {duration:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from project_real_estate.models.preprocessor import PropertyPreprocessor
+
+
+def _synthetic_columns(num_rows, seed=0):
+    """
+    Raw columns as scraped from Centris, including the irregular values the preprocessor has to handle.
+    """
+    rng = np.random.RandomState(seed)
+    cities = np.array(
+        [f"Montréal ({n})" for n in ("Rosemont", "Verdun", "Le Plateau-Mont-Royal")]
+        + [f" Laval{i} " for i in range(50)]
+        + ["Québec (Sainte-Foy (Cap-Rouge)) ", "Lévis ()", "Gatineau (Hull))"]
+    )
+    years = np.array(
+        [str(y) for y in range(1850, 2025)]
+        + [
+            "New",
+            "Unknown",
+            "1978, Century",
+            "To be built",
+            "2005 (Age: 15)",
+            "",
+            None,
+        ],
+        dtype=object,
+    )
+    units = []
+    for _ in range(500):
+        num_types = rng.randint(1, 4)
+        descriptions = [
+            f"{rng.randint(1, 6)} x {rng.randint(1, 11)} ½" for _ in range(num_types)
+        ]
+        units.append('{"' + ", ".join(descriptions) + '"}')
+    units += ['{"2 x Loft, 1 x 4 ½"}', '{"1 x Studio"}', "{}", '{"3 x 5"}']
+    units = np.array(units, dtype=object)
+    return pd.DataFrame(
+        {
+            "city": cities[rng.randint(0, len(cities), num_rows)],
+            "year_built": years[rng.randint(0, len(years), num_rows)],
+            "num_residential_units": units[rng.randint(0, len(units), num_rows)],
+        },
+        index=rng.permutation(num_rows) * 3,
+    )
+
+
+def _unit_columns(unit_descriptions):
+    return pd.DataFrame(
+        unit_descriptions.tolist(),
+        index=unit_descriptions.index,
+        columns=["num_bedrooms", "num_bathrooms", "area", "num_units"],
+    )
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--num-rows", type=int, default=500000)
+    args = parser.parse_args()
+
+    data = _synthetic_columns(args.num_rows)
+    preprocessor = PropertyPreprocessor()
+    neighborhoods = data.city.apply(preprocessor._extract_neigborhood_from_city)
+    preprocessor._fit_neighborhood_encoder(neighborhoods.iloc[: args.num_rows // 2])
+
+    def rowwise_units():
+        unit_descriptions = data.num_residential_units.apply(
+            lambda x: x.strip("{}").strip('"').split(",")
+        )
+        return _unit_columns(
+            unit_descriptions.apply(preprocessor._map_unit_descriptions_to_columns)
+        )
+
+    steps = {
+        "neighborhood from city": (
+            lambda: data.city.apply(preprocessor._extract_neigborhood_from_city),
+            lambda: preprocessor._extract_neighborhoods_from_cities(data.city),
+        ),
+        "neighborhood encoding": (
+            lambda: neighborhoods.apply(preprocessor._encode_neighborhood),
+            lambda: preprocessor._encode_neighborhoods(neighborhoods),
+        ),
+        "year built": (
+            lambda: data.year_built.apply(preprocessor._convert_year_built),
+            lambda: preprocessor._convert_years_built(data.year_built),
+        ),
+        "unit descriptions": (
+            rowwise_units,
+            lambda: preprocessor._map_all_unit_descriptions_to_columns(
+                data.num_residential_units
+            ),
+        ),
+    }
+    for name, (rowwise, vectorized) in steps.items():
+        rowwise_time, expected = _time(rowwise)
+        vectorized_time, result = _time(vectorized)
+        # Outputs must be identical, dtypes included.
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(result, expected, check_names=False)
+        else:
+            pd.testing.assert_series_equal(result, expected, check_names=False)
+        print(
+            f"{name}: row-wise {rowwise_time:.2f}s, vectorized {vectorized_time:.2f}s, "
+            f"{rowwise_time / vectorized_time:.1f}x"
+        )
+
+    # Another batch of listings, drawn from the same vocabulary, only hits the parse caches.
+    other_data = _synthetic_columns(args.num_rows, seed=1)
+    warm_steps = {
+        "year built": (
+            lambda: other_data.year_built.apply(preprocessor._convert_year_built),
+            lambda: preprocessor._convert_years_built(other_data.year_built),
+        ),
+        "unit descriptions": (
+            lambda: _unit_columns(
+                other_data.num_residential_units.apply(
+                    lambda x: preprocessor._map_unit_descriptions_to_columns(
+                        x.strip("{}").strip('"').split(",")
+                    )
+                )
+            ),
+            lambda: preprocessor._map_all_unit_descriptions_to_columns(
+                other_data.num_residential_units
+            ),
+        ),
+    }
+    for name, (rowwise, cached) in warm_steps.items():
+        expected = rowwise()
+        cached_time, result = _time(cached)
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(result, expected, check_names=False)
+        else:
+            pd.testing.assert_series_equal(result, expected, check_names=False)
+        print(f"{name}, warm parse cache: {cached_time:.2f}s")
+    for column, stats in preprocessor.parse_cache_stats().items():
+        print(
+            f"{column} parse cache: {stats['size']} values, {stats['hits']} hits, {stats['misses']} misses, "
+            f"hit ratio {stats['hit_ratio']:.4f} of distinct values"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import time
+
+import numpy as np
+
+from project_real_estate.models import forest
+from project_real_estate.models.financial_model import SimpleFinancialModel
+from project_real_estate.models.scenarios import ScenarioEngine
+
+
+def _synthetic_properties(num_properties, seed=0):
+    rng = np.random.RandomState(seed)
+    price = rng.uniform(2e5, 2e6, num_properties)
+    monthly_rent = price * rng.uniform(0.004, 0.01, num_properties)
+    year_built = rng.randint(1900, 2020, num_properties)
+    return price, monthly_rent, year_built
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time Monte Carlo forecasts of many properties over many paths."
+    )
+    parser.add_argument("-n", "--num-properties", type=int, default=10000)
+    parser.add_argument("-p", "--num-paths", type=int, default=10000)
+    parser.add_argument("-j", "--max-workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = SimpleFinancialModel(
+        downpayment=0.2,
+        closing_fees=0.04,
+        interest_rate=0.03,
+        amortization=25,
+        forecast_horizon=20,
+        vacancy=0.05,
+        property_tax_rate=0.01,
+        rate_rent_increase=0.02,
+        expense_ratio=0.3,
+        yearly_reserves=1000,
+    )
+    price, monthly_rent, year_built = _synthetic_properties(args.num_properties)
+    if forest.numba is None:
+        backends = ["numpy"]
+        print("Backends: numpy only, numba is not installed (`poetry install -E fast`)")
+    else:
+        backends = ["numpy", "numba"]
+        print(f"Backends: numpy, numba {forest.numba.__version__}")
+
+    # Without any randomness, every path is the deterministic forecast.
+    expected = model.forecast(price, monthly_rent, year_built)
+    for backend in backends:
+        outputs = ScenarioEngine(
+            model,
+            num_paths=10,
+            rate_volatility=0,
+            vacancy_shock_probability=0,
+            backend=backend,
+        ).simulate(price, monthly_rent, year_built)
+        for column in ["ROE_p5", "ROE_p50", "ROE_p95"]:
+            np.testing.assert_allclose(outputs[column], expected["ROE"], rtol=1e-9)
+        np.testing.assert_array_equal(
+            outputs["negative_cash_probability"], expected["net_cash"] < 0
+        )
+
+    for backend in backends:
+        engine = ScenarioEngine(
+            model,
+            num_paths=args.num_paths,
+            seed=args.seed,
+            max_workers=args.max_workers,
+            backend=backend,
+        )
+        start = time.perf_counter()
+        engine.paths
+        paths_time = time.perf_counter() - start
+        start = time.perf_counter()
+        outputs = engine.simulate(price, monthly_rent, year_built)
+        duration = time.perf_counter() - start
+        print(
+            f"{backend}: {args.num_properties} properties x {args.num_paths} paths in {duration:.2f}s, "
+            f"paths drawn in {paths_time:.2f}s. Median P50 ROE {np.median(outputs['ROE_p50']):.3f}, "
+            f"mean probability of negative cash flow {outputs['negative_cash_probability'].mean():.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+import pickle
+
+from project_real_estate.constants import MODEL_ARTIFACT_PATH, SERIALIZED_MODEL_PATH
+from project_real_estate.models.artifact import save_model
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a pickled rent model to a model artifact."
+    )
+    parser.add_argument("-i", "--input", default=str(SERIALIZED_MODEL_PATH))
+    parser.add_argument("-o", "--output", default=str(MODEL_ARTIFACT_PATH))
+    args = parser.parse_args()
+
+    model = pickle.load(open(args.input, "rb"))
+    save_model(model, args.output)
+    print(f"Model artifact written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+
+from project_real_estate.constants import LOCAL_DATA_CACHE_DIR
+from project_real_estate.local_cache import TableCache
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Manage the local Parquet cache of database tables."
+    )
+    parser.add_argument(
+        "command",
+        choices=["build", "verify", "compact"],
+        help="`build` syncs new rows (or rebuilds with --full), `verify` checks the cached files, "
+        "`compact` merges the files of each date partition.",
+    )
+    parser.add_argument(
+        "-t", "--tables", nargs="+", default=["rentals", "sales", "latest_sales"]
+    )
+    parser.add_argument(
+        "-d",
+        "--cache-dir",
+        default=os.environ.get("LOCAL_DATA_CACHE_DIR", LOCAL_DATA_CACHE_DIR),
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Discard the cache and download again."
+    )
+    parser.add_argument(
+        "--against-database",
+        action="store_true",
+        help="Also compare row counts per date with the database.",
+    )
+    args = parser.parse_args()
+
+    num_problems = 0
+    for table_name in args.tables:
+        cache = TableCache(args.cache_dir, table_name)
+        if args.command == "build":
+            if args.full:
+                cache.rebuild()
+            else:
+                cache.sync()
+        elif args.command == "compact":
+            cache.compact()
+        else:
+            problems = cache.verify(against_database=args.against_database)
+            for problem in problems:
+                print(f"{table_name}: {problem}")
+            num_problems += len(problems)
+            print(f"{table_name}: {len(cache.partitions())} partitions verified")
+    sys.exit(1 if num_problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import time
+
+from project_real_estate.dash_app.listing_store import ListingIndex
+from project_real_estate.dash_app.models import load_listings
+from project_real_estate.models.financial_model import _MORTGAGE_PREMIUM_SCALE
+from project_real_estate.models.sensitivity import SensitivityGrid, save_cube
+
+
+def _percentages(values):
+    return [value / 100 for value in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Forecast every listing over a grid of financing parameters, for the dashboard to look up. "
+        "Rates are in percent, as in the dashboard."
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        required=True,
+        help="Directory to write the grid to, under the SENSITIVITY_DIR of the dashboard.",
+    )
+    parser.add_argument(
+        "--downpayments",
+        type=float,
+        nargs="+",
+        default=[round(100 * downpayment) for downpayment in _MORTGAGE_PREMIUM_SCALE],
+    )
+    parser.add_argument(
+        "--interest-rates", type=float, nargs="+", default=[2, 2.5, 3, 3.5, 4, 4.5, 5],
+    )
+    parser.add_argument(
+        "--amortizations", type=int, nargs="+", default=[5, 10, 15, 20, 25]
+    )
+    parser.add_argument(
+        "--vacancies", type=float, nargs="+", default=[0, 1, 2, 3, 4, 5]
+    )
+    # Other parameters default to the initial values of the dashboard.
+    parser.add_argument("--closing-fees", type=float, default=2)
+    parser.add_argument("--property-tax-rate", type=float, default=1)
+    parser.add_argument("--rent-increase", type=float, default=0)
+    parser.add_argument("--expense-ratio", type=float, default=20)
+    parser.add_argument("--yearly-reserves", type=int, default=0)
+    parser.add_argument(
+        "--forecast-horizon",
+        type=int,
+        default=None,
+        help="Defaults to the amortization, as in the dashboard.",
+    )
+    args = parser.parse_args()
+
+    grid = SensitivityGrid(
+        downpayments=_percentages(args.downpayments),
+        interest_rates=_percentages(args.interest_rates),
+        amortizations=args.amortizations,
+        vacancies=_percentages(args.vacancies),
+        closing_fees=args.closing_fees / 100,
+        property_tax_rate=args.property_tax_rate / 100,
+        rate_rent_increase=args.rent_increase / 100,
+        expense_ratio=args.expense_ratio / 100,
+        yearly_reserves=args.yearly_reserves,
+        forecast_horizon=args.forecast_horizon,
+    )
+    listings = ListingIndex(load_listings())
+
+    start = time.perf_counter()
+    cubes = grid.evaluate(listings.price, listings.predicted_rent, listings.year_built)
+    print(
+        f"Forecast {len(listings)} listings over {'x'.join(map(str, grid.shape))} grid points "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    save_cube(
+        grid,
+        cubes,
+        listings.take("mls_id", slice(None)),
+        listings.version,
+        args.output_dir,
+    )
+    print(f"Grid written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
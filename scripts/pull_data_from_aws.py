@@ -1,5 +1,5 @@
 import argparse
-from project_real_estate.db import pull_data
+from project_real_estate.db import export_data
 
 
 def main():
@@ -8,9 +8,28 @@ def main():
     parser.add_argument(
         "-o", "--output-file", required=True, help="File to output data to."
     )
+    parser.add_argument("-c", "--columns", nargs="+", help="Columns to pull.")
+    parser.add_argument("--cities", nargs="+", help="Only pull these cities.")
+    parser.add_argument(
+        "--property-types", nargs="+", help="Only pull these property types."
+    )
+    parser.add_argument("--start-date", help="First scrape date to pull.")
+    parser.add_argument("--end-date", help="Last scrape date to pull.")
+    parser.add_argument(
+        "--chunksize", type=int, default=50000, help="Rows fetched at a time."
+    )
     args = parser.parse_args()
 
-    pull_data(args.table, args.output_file, max_rows=None)
+    export_data(
+        args.table,
+        args.output_file,
+        chunksize=args.chunksize,
+        columns=args.columns,
+        cities=args.cities,
+        property_types=args.property_types,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
 
 
 if __name__ == "__main__":
@@ -1,31 +1,140 @@
 from project_real_estate.models.rent_estimator import SKLearnRentEstimator
 from project_real_estate.models.preprocessor import PropertyPreprocessor
+from project_real_estate.models.training import (
+    DesignMatrixCache,
+    PhaseTimer,
+    TRAINING_COLUMNS,
+    preprocess_rentals,
+    read_rental_partitions,
+)
+from project_real_estate.local_cache import TableCache
 from sklearn.ensemble import RandomForestRegressor
-from project_real_estate.db import pull_data
+from project_real_estate.db import stream_data
 import argparse
+import json
+import os
 import pickle
-from project_real_estate.constants import SERIALIZED_MODEL_DIR
+from project_real_estate.constants import (
+    ALLOWED_PROPERTY_TYPES,
+    LOCAL_DATA_CACHE_DIR,
+    SERIALIZED_MODEL_DIR,
+)
+from project_real_estate.models.artifact import save_model
+
+
+def _rental_chunks(args):
+    """
+    Rental properties one date partition at a time from the local cache if there is one, else in chunks from the
+    database.
+    """
+    if args.cache_dir:
+        cache = TableCache(args.cache_dir, "rentals")
+        if not args.offline:
+            cache.sync()
+        for _, partition in cache.iter_partitions(
+            columns=TRAINING_COLUMNS,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            property_types=ALLOWED_PROPERTY_TYPES,
+        ):
+            yield partition
+    else:
+        yield from stream_data(
+            "rentals",
+            columns=TRAINING_COLUMNS,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            property_types=ALLOWED_PROPERTY_TYPES,
+        )
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-n", "--name", required=True, help="Name of the model.")
+    parser.add_argument(
+        "--pickle",
+        action="store_true",
+        help="Also pickle the whole model, for deployments which do not read model artifacts yet.",
+    )
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument(
+        "-j",
+        "--n-jobs",
+        type=int,
+        default=-1,
+        help="Cores to train on, -1 for all. The saved model predicts on one core per thread.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("LOCAL_DATA_CACHE_DIR"),
+        help="Local cache of the tables to read rentals from, one date partition at a time, instead of the database.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Do not sync the local cache with the database first.",
+    )
+    parser.add_argument(
+        "--start-date", help="First scrape date of the rentals to train on."
+    )
+    parser.add_argument("--end-date", help="Last scrape date of the rentals to train on.")
+    parser.add_argument(
+        "--design-matrix-dir",
+        default=str(LOCAL_DATA_CACHE_DIR / "design_matrices"),
+        help="Where preprocessed rentals are cached.",
+    )
+    parser.add_argument(
+        "--no-design-matrix-cache",
+        action="store_true",
+        help="Always preprocess the rentals again.",
+    )
+    parser.add_argument("--timings", help="JSON file to write the time of each phase to.")
     args = parser.parse_args()
 
-    data = pull_data("rentals", max_rows=None)
-    print("Data loaded.")
-    estimator = RandomForestRegressor(n_estimators=100, max_depth=30)
-    preprocessor = PropertyPreprocessor()
+    timer = PhaseTimer()
+    with timer.phase("load"):
+        data = read_rental_partitions(_rental_chunks(args))
+    print(f"Data loaded: {len(data)} rentals.")
+
+    with timer.phase("preprocess"):
+        cache = None
+        if not args.no_design_matrix_cache:
+            cache = DesignMatrixCache(args.design_matrix_dir)
+        X, y, preprocessor = preprocess_rentals(data, PropertyPreprocessor(), cache)
+        del data
+
+    estimator = RandomForestRegressor(
+        n_estimators=args.n_estimators, max_depth=args.max_depth, n_jobs=args.n_jobs
+    )
     model = SKLearnRentEstimator(estimator=estimator, preprocessor=preprocessor)
+    X_train, X_test, y_train, y_test = model.split(X, y)
+
+    with timer.phase("fit"):
+        model.fit_features(X_train, y_train)
 
-    model.fit(data)
-    error_tolerance = 0.1
-    r2, percentage_correct_preds = model.score(data, error_tolerance=error_tolerance)
+    with timer.phase("score"):
+        error_tolerance = 0.1
+        r2, percentage_correct_preds = model.score_features(
+            X_test, y_test, error_tolerance=error_tolerance
+        )
     print(f"Model obtained a R2 score of {r2:.2f} on the test set. {percentage_correct_preds:.3f} fall within {100*error_tolerance:.0f}% of our predictions")
 
-    model_path = (SERIALIZED_MODEL_DIR / args.name).with_suffix(".pkl")
-    pickle.dump(model, open(model_path, "wb"))
-    print(f"Model saved to {model_path}.")
+    # The dashboard spreads predictions over its own threads with `predict_in_chunks`, so the saved estimator must not
+    # start one thread per core for each chunk.
+    estimator.set_params(n_jobs=1)
+    with timer.phase("save"):
+        artifact_path = SERIALIZED_MODEL_DIR / args.name
+        save_model(model, artifact_path)
+        print(f"Model saved to {artifact_path}.")
+        if args.pickle:
+            model_path = (SERIALIZED_MODEL_DIR / args.name).with_suffix(".pkl")
+            pickle.dump(model, open(model_path, "wb"))
+            print(f"Model saved to {model_path}.")
+
+    if args.timings:
+        with open(args.timings, "w") as f:
+            json.dump(timer.timings, f, indent=2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+import argparse
+
+from project_real_estate.dash_app.listing_store import write_listing_snapshot
+from project_real_estate.dash_app.models import load_listings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="Directory to write snapshots to."
+    )
+    args = parser.parse_args()
+
+    path = write_listing_snapshot(load_listings(), args.output_dir)
+    print(f"Listing snapshot written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from project_real_estate.models.financial_model import (
+    _MORTGAGE_PREMIUM_SCALE,
+    AmortizationScheduleCache,
+    SimpleFinancialModel,
+)
+
+
+def _properties():
+    # Older, newer and unknown construction years, which get different expense ratios.
+    return pd.DataFrame(
+        {
+            "price": [150000.0, 400000.0, 725000.0, 1200000.0, 310000.0],
+            "predicted_rent_revenue": [1100.0, 2500.0, 4800.0, 9000.0, 1900.0],
+            "year_built": [1950.0, 2011.0, np.nan, 2010.0, 2019.0],
+        }
+    )
+
+
+def _model(downpayment, interest_rate, forecast_horizon):
+    return SimpleFinancialModel(
+        downpayment=downpayment,
+        closing_fees=0.02,
+        interest_rate=interest_rate,
+        amortization=25,
+        forecast_horizon=forecast_horizon,
+        vacancy=0.03,
+        property_tax_rate=0.01,
+        rate_rent_increase=0.02,
+        expense_ratio=0.2,
+        yearly_reserves=1000,
+        schedule_cache=AmortizationScheduleCache(),
+    )
+
+
+@pytest.mark.parametrize("downpayment", sorted(_MORTGAGE_PREMIUM_SCALE))
+@pytest.mark.parametrize("interest_rate", [0.0, 0.035])
+@pytest.mark.parametrize("forecast_horizon", [10, 25])
+def test_predict_matches_predict_rowwise(downpayment, interest_rate, forecast_horizon):
+    model = _model(downpayment, interest_rate, forecast_horizon)
+    expected = model.predict_rowwise(_properties())
+    result = model.predict(_properties())
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+
+def test_unknown_downpayment():
+    with pytest.raises(ValueError):
+        _model(0.25, 0.035, 25)
+
+
+def test_parameters():
+    model = _model(0.1, 0.035, 25)
+    properties = _properties()
+    expected = model.forecast(
+        properties.price, properties.predicted_rent_revenue, properties.year_built
+    )
+    result = SimpleFinancialModel(**model.parameters).forecast(
+        properties.price, properties.predicted_rent_revenue, properties.year_built
+    )
+    for column, values in expected.items():
+        np.testing.assert_array_equal(result[column], values)
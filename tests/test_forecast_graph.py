@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from project_real_estate.models.financial_model import SimpleFinancialModel
+from project_real_estate.models.forecast_graph import (
+    _DEPENDENCIES,
+    _NODES,
+    PARAMETERS,
+    ForecastSession,
+)
+
+_PARAMETERS = dict(
+    downpayment=0.15,
+    closing_fees=0.02,
+    interest_rate=0.03,
+    amortization=25,
+    forecast_horizon=25,
+    vacancy=0.03,
+    property_tax_rate=0.01,
+    rate_rent_increase=0.0,
+    expense_ratio=0.2,
+    yearly_reserves=0,
+)
+# Another value of each parameter.
+_CHANGES = dict(
+    downpayment=0.2,
+    closing_fees=0.03,
+    interest_rate=0.035,
+    amortization=20,
+    forecast_horizon=10,
+    vacancy=0.05,
+    property_tax_rate=0.012,
+    rate_rent_increase=0.02,
+    expense_ratio=0.25,
+    yearly_reserves=5000,
+)
+
+
+def _properties():
+    price = np.array([250000.0, 480000.0, 1200000.0, 90000.0])
+    monthly_rent = np.array([1500.0, 2100.0, 5200.0, 800.0])
+    year_built = np.array([1965.0, 2015.0, np.nan, 2010.0])
+    return price, monthly_rent, year_built
+
+
+def _assert_forecast(session, parameters):
+    expected = SimpleFinancialModel(**parameters).forecast(*_properties())
+    outputs = session.forecast(**parameters)
+    assert list(outputs) == list(expected)
+    for column, values in expected.items():
+        np.testing.assert_array_equal(outputs[column], values, err_msg=column)
+
+
+def test_dependencies_are_the_arguments_of_the_nodes():
+    for name, func in _NODES.items():
+        arguments = func.__code__.co_varnames[: func.__code__.co_argcount]
+        assert list(arguments) == _DEPENDENCIES[name]
+
+
+@pytest.mark.parametrize("name", PARAMETERS)
+def test_changing_each_parameter(name):
+    session = ForecastSession(*_properties())
+    _assert_forecast(session, _PARAMETERS)
+    changed = {**_PARAMETERS, name: _CHANGES[name]}
+    _assert_forecast(session, changed)
+    assert session.computed
+    # And back.
+    _assert_forecast(session, _PARAMETERS)
+
+
+def test_changing_parameters_in_turn():
+    session = ForecastSession(*_properties())
+    parameters = dict(_PARAMETERS)
+    _assert_forecast(session, parameters)
+    for name in PARAMETERS:
+        parameters[name] = _CHANGES[name]
+        _assert_forecast(session, parameters)
+
+
+def test_unchanged_parameters_compute_nothing():
+    session = ForecastSession(*_properties())
+    session.forecast(**_PARAMETERS)
+    session.forecast(**_PARAMETERS)
+    assert session.computed == []
+
+
+def test_missing_parameters():
+    session = ForecastSession(*_properties())
+    with pytest.raises(TypeError):
+        session.forecast(downpayment=0.2)
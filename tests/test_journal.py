@@ -0,0 +1,29 @@
+import os
+
+from scraper.discovery import Listing
+from scraper.journal import RunJournal
+
+_LISTINGS = [Listing("https://example.com/1", "11111111", 1500)]
+
+
+def test_resumed_on_another_day(tmp_path):
+    journal = RunJournal(tmp_path, "rentals", "2020-06-01", checkpoint_every=1)
+    journal.save_listings(_LISTINGS)
+    journal.append({"mls_id": "11111111"})
+
+    resumed = RunJournal.latest(tmp_path, "rentals")
+    assert resumed.run_id == "2020-06-01"
+    assert resumed.load_listings() == _LISTINGS
+    assert resumed.load_records() == [{"mls_id": "11111111"}]
+    assert RunJournal.latest(tmp_path, "sales") is None
+
+    resumed.complete()
+    assert RunJournal.latest(tmp_path, "rentals") is None
+
+
+def test_latest_run(tmp_path):
+    for run_id, mtime in [("2020-06-02", 2000), ("2020-06-01", 1000)]:
+        journal = RunJournal(tmp_path, "rentals", run_id)
+        journal.save_listings(_LISTINGS)
+        os.utime(journal.listings_path, (mtime, mtime))
+    assert RunJournal.latest(tmp_path, "rentals").run_id == "2020-06-02"
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from project_real_estate.models.prediction import (
+    PredictionCache,
+    feature_hashes,
+    predict_average_rent,
+    predict_in_chunks,
+)
+
+
+def _features(num_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame(rng.uniform(0, 10, (num_rows, 3)), columns=["a", "b", "c"])
+
+
+def _estimator(n_jobs):
+    X = _features(200)
+    estimator = RandomForestRegressor(n_estimators=5, random_state=0, n_jobs=n_jobs)
+    return estimator.fit(X, X.sum(axis=1))
+
+
+def test_predict_in_chunks():
+    X = _features(1000, seed=1)
+    for n_jobs in [1, -1]:
+        estimator = _estimator(n_jobs)
+        np.testing.assert_allclose(
+            predict_in_chunks(estimator, X, chunk_size=300, max_workers=4),
+            estimator.predict(X),
+        )
+
+
+def test_cache_only_keeps_listed_ids(tmp_path):
+    estimator = _estimator(1)
+    X = _features(10, seed=1)
+    mls_ids = [str(i) for i in range(10)]
+    cache = PredictionCache("model", tmp_path)
+    expected = predict_average_rent(estimator, X, mls_ids, cache=cache)
+
+    # Listings 0 to 4 are not for sale anymore.
+    restarted = PredictionCache("model", tmp_path)
+    predict_average_rent(estimator, X.iloc[5:], mls_ids[5:], cache=restarted)
+    reloaded = PredictionCache("model", tmp_path)
+    average_rent = reloaded.lookup(np.array(mls_ids, dtype=object), feature_hashes(X))
+    np.testing.assert_array_equal(average_rent[5:], expected[5:])
+    assert np.isnan(average_rent[:5]).all()
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from project_real_estate.models.preprocessor import PropertyPreprocessor
+
+_UNIT_COLUMNS = ["num_bedrooms", "num_bathrooms", "area", "num_units"]
+
+# Irregular values and what the row-wise preprocessing makes of them, which the vectorized one must match.
+_CITY_CASES = [
+    ("Montréal (Rosemont)", "Rosemont"),
+    (" Laval ", "Laval"),
+    ("(Verdun)", "Verdun"),
+    ("Lévis ()", ""),
+    ("Gatineau (Hull))", "Hull"),
+    # Nested parentheses
+    ("Québec (Sainte-Foy (Cap-Rouge)) ", "Sainte-Foy"),
+]
+_YEAR_BUILT_CASES = [
+    ("1978", 1978),
+    ("1978, Century", 1978),
+    ("2005 (Age: 15)", np.nan),
+    ("1600", np.nan),
+    ("2020", np.nan),
+    ("New", 2020),
+    ("New, 1990", 1990),
+    ("New 2021", np.nan),
+    ("Unknown", np.nan),
+    ("", np.nan),
+    (None, np.nan),
+    # Non-ASCII digits
+    ("١٩٧٨", 1978),
+    ("19٧٨", 1978),
+]
+_UNIT_CASES = [
+    ('{"1 x 4 ½"}', (2, 1, 400, 1)),
+    ('{"2 x 3 ½, 1 x 5 ½"}', (5 / 3, 1, 1100 / 3, 3)),
+    ('{"3 x 5"}', (3, 1, 500, 3)),
+    ('{"2 x Loft, 1 x 4 ½"}', (np.nan,) * 4),
+    ('{"1 x Studio"}', (np.nan,) * 4),
+    ("{}", (np.nan,) * 4),
+    # No "x"
+    ('{"4 ½"}', (np.nan,) * 4),
+    # Signed counts
+    ('{"+2 x 4 ½"}', (2, 1, 400, 2)),
+    ('{"-1 x 4 ½, 2 x 4 ½"}', (2, 1, 400, 1)),
+    ('{"٣ x ٤ ½"}', (2, 1, 400, 3)),
+    ('{"1_0 x 4"}', (2, 1, 400, 10)),
+]
+# Characters random values are drawn from, to find differences the cases above miss.
+_ALPHABETS = {
+    "city": "ab (),",
+    "year_built": "19 New٣½²x,_",
+    "num_residential_units": "12 x+-,½٣L_",
+}
+
+
+def _rowwise_units(preprocessor, num_residential_units):
+    return preprocessor._map_unit_descriptions_to_columns(
+        num_residential_units.strip("{}").strip('"').split(",")
+    )
+
+
+def _vectorized_units(preprocessor, values):
+    columns = preprocessor._map_all_unit_descriptions_to_columns(
+        pd.Series(values, dtype=object)
+    )
+    return list(columns[_UNIT_COLUMNS].itertuples(index=False, name=None))
+
+
+_ROWWISE = {
+    "city": lambda preprocessor, value: preprocessor._extract_neigborhood_from_city(
+        value
+    ),
+    "year_built": lambda preprocessor, value: preprocessor._convert_year_built(value),
+    "num_residential_units": _rowwise_units,
+}
+_VECTORIZED = {
+    "city": lambda preprocessor, values: preprocessor._extract_neighborhoods_from_cities(
+        pd.Series(values, dtype=object)
+    ).tolist(),
+    "year_built": lambda preprocessor, values: preprocessor._convert_years_built(
+        pd.Series(values, dtype=object)
+    ).tolist(),
+    "num_residential_units": _vectorized_units,
+}
+
+
+def _random_values(column, num_values, seed):
+    rng = np.random.RandomState(seed)
+    alphabet = list(_ALPHABETS[column])
+    values = [
+        "".join(rng.choice(alphabet, rng.randint(0, 11))) for _ in range(num_values)
+    ]
+    if column == "num_residential_units":
+        values = [f'{{"{value}"}}' for value in values]
+    return values
+
+
+@pytest.mark.parametrize(
+    "column, value, expected",
+    [("city", value, expected) for value, expected in _CITY_CASES]
+    + [("year_built", value, expected) for value, expected in _YEAR_BUILT_CASES]
+    + [("num_residential_units", value, expected) for value, expected in _UNIT_CASES],
+)
+def test_edge_cases(column, value, expected):
+    preprocessor = PropertyPreprocessor()
+    np.testing.assert_array_equal(_ROWWISE[column](preprocessor, value), expected)
+    np.testing.assert_array_equal(
+        _VECTORIZED[column](preprocessor, [value])[0], expected
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("column", list(_ALPHABETS))
+def test_random_values(column, seed):
+    preprocessor = PropertyPreprocessor()
+    values = _random_values(column, 2000, seed)
+    # The second pass is read from the parse caches.
+    for results in [
+        _VECTORIZED[column](preprocessor, values),
+        _VECTORIZED[column](preprocessor, values),
+    ]:
+        for value, result in zip(values, results):
+            try:
+                expected = _ROWWISE[column](preprocessor, value)
+            except (ValueError, IndexError):
+                # The row-wise preprocessing fails on e.g. numeric characters other than digits.
+                continue
+            np.testing.assert_array_equal(result, expected, err_msg=repr(value))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_encode_neighborhoods(seed):
+    rng = np.random.RandomState(seed)
+    vocabulary = np.array(
+        ["Rosemont", "Verdun", "Le Plateau-Mont-Royal", "Laval", "", None],
+        dtype=object,
+    )
+    preprocessor = PropertyPreprocessor()
+    preprocessor._fit_neighborhood_encoder(pd.Series(vocabulary[:4]))
+
+    # Unknown and missing neighborhoods included.
+    neighborhoods = pd.Series(
+        vocabulary[rng.randint(0, len(vocabulary), 1000)],
+        index=rng.permutation(1000) * 2,
+        name="neighborhood",
+    )
+    pd.testing.assert_series_equal(
+        preprocessor._encode_neighborhoods(neighborhoods),
+        neighborhoods.apply(preprocessor._encode_neighborhood),
+    )
+    known = neighborhoods[neighborhoods.isin(vocabulary[:4])]
+    pd.testing.assert_series_equal(
+        preprocessor._encode_neighborhoods(known),
+        known.apply(preprocessor._encode_neighborhood),
+    )
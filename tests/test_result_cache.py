@@ -0,0 +1,28 @@
+import os
+
+from project_real_estate.dash_app.result_cache import ResultCache
+
+
+def test_directory_is_bounded(tmp_path):
+    cache = ResultCache(maxsize=2, directory=str(tmp_path), max_files=3)
+    for i in range(10):
+        cache.set(("inputs", i), "v1", i)
+        # Entries are evicted by modification time, which may be coarser than the loop.
+        for path in tmp_path.iterdir():
+            if path.stat().st_mtime > 1000:
+                os.utime(path, (i, i))
+    assert len(os.listdir(tmp_path)) == 3
+
+    # Evicted from memory, but still on disk.
+    other_worker = ResultCache(directory=str(tmp_path), max_files=3)
+    assert other_worker.get(("inputs", 7), "v1") == 7
+    assert other_worker.get(("inputs", 0), "v1") is None
+
+
+def test_write_errors_are_not_raised(tmp_path):
+    directory = tmp_path / "results"
+    cache = ResultCache(directory=str(directory))
+    directory.rmdir()
+
+    cache.set(("inputs",), "v1", "result")
+    assert cache.get(("inputs",), "v1") == "result"
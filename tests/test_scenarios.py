@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from project_real_estate.models import forest
+from project_real_estate.models.financial_model import SimpleFinancialModel
+from project_real_estate.models.scenarios import ScenarioEngine
+
+_BACKENDS = ["numpy"] + (["numba"] if forest.numba is not None else [])
+
+
+def _model():
+    return SimpleFinancialModel(
+        downpayment=0.2,
+        closing_fees=0.04,
+        interest_rate=0.03,
+        amortization=25,
+        forecast_horizon=20,
+        vacancy=0.05,
+        property_tax_rate=0.01,
+        rate_rent_increase=0.02,
+        expense_ratio=0.3,
+        yearly_reserves=1000,
+    )
+
+
+def _properties(num_properties=200, seed=0):
+    rng = np.random.RandomState(seed)
+    price = rng.uniform(2e5, 2e6, num_properties)
+    monthly_rent = price * rng.uniform(0.004, 0.009, num_properties)
+    year_built = rng.randint(1900, 2020, num_properties).astype(float)
+    return price, monthly_rent, year_built
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+def test_paths_without_randomness_are_the_forecast(backend):
+    model = _model()
+    price, monthly_rent, year_built = _properties()
+    expected = model.forecast(price, monthly_rent, year_built)
+    outputs = ScenarioEngine(
+        model,
+        num_paths=10,
+        rate_volatility=0,
+        vacancy_shock_probability=0,
+        max_elements=1000,
+        backend=backend,
+    ).simulate(price, monthly_rent, year_built)
+    for column in ["ROE_p5", "ROE_p50", "ROE_p95"]:
+        np.testing.assert_allclose(outputs[column], expected["ROE"], rtol=1e-9)
+    np.testing.assert_array_equal(
+        outputs["negative_cash_probability"], expected["net_cash"] < 0
+    )
+
+
+def test_chunking_does_not_change_results():
+    model = _model()
+    properties = _properties()
+    expected = ScenarioEngine(model, num_paths=50, backend="numpy").simulate(
+        *properties
+    )
+    for backend in _BACKENDS:
+        outputs = ScenarioEngine(
+            model, num_paths=50, max_elements=500, backend=backend
+        ).simulate(*properties)
+        for column, values in expected.items():
+            np.testing.assert_allclose(outputs[column], values, rtol=1e-9)
@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from project_real_estate.models import forest
+from project_real_estate.models.financial_model import (
+    _MORTGAGE_PREMIUM_SCALE,
+    AmortizationScheduleCache,
+)
+from project_real_estate.models.sensitivity import (
+    GRID_AXES,
+    PrecomputedCube,
+    SensitivityGrid,
+    save_cube,
+)
+
+_BACKENDS = ["numpy"] + (["numba"] if forest.numba is not None else [])
+
+
+def _grid(forecast_horizon=None):
+    return SensitivityGrid(
+        downpayments=sorted(_MORTGAGE_PREMIUM_SCALE),
+        interest_rates=[0.0, 0.03, 0.045],
+        amortizations=[10, 25],
+        vacancies=[0.0, 0.05],
+        closing_fees=0.02,
+        property_tax_rate=0.01,
+        rate_rent_increase=0.02,
+        expense_ratio=0.2,
+        yearly_reserves=1000,
+        forecast_horizon=forecast_horizon,
+        schedule_cache=AmortizationScheduleCache(),
+    )
+
+
+def _properties(num_properties=50, seed=0):
+    rng = np.random.RandomState(seed)
+    price = rng.uniform(1e5, 2e6, num_properties)
+    monthly_rent = price * rng.uniform(0.003, 0.01, num_properties)
+    year_built = rng.choice([1950.0, 2010.0, 2015.0, np.nan], num_properties)
+    return price, monthly_rent, year_built
+
+
+def _grid_points(grid):
+    for index in itertools.product(*(range(size) for size in grid.shape)):
+        yield index, {axis: grid.axes[axis][i] for axis, i in zip(GRID_AXES, index)}
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+@pytest.mark.parametrize("forecast_horizon", [None, 10])
+def test_evaluate_matches_forecast(backend, forecast_horizon):
+    grid = _grid(forecast_horizon)
+    properties = _properties()
+    # Few properties at a time, to go through several chunks.
+    cubes = grid.evaluate(*properties, backend=backend, max_elements=5000)
+    for index, point in _grid_points(grid):
+        expected = grid.model(**point).forecast(*properties)
+        for column, values in expected.items():
+            np.testing.assert_allclose(
+                cubes[column][(slice(None),) + index],
+                values,
+                rtol=1e-9,
+                atol=1e-9,
+                err_msg=f"{column} at {point}",
+            )
+
+
+def test_precomputed_cube(tmp_path):
+    grid = _grid()
+    properties = _properties()
+    cubes = grid.evaluate(*properties, backend="numpy")
+    mls_ids = [str(10000000 + i) for i in range(len(properties[0]))]
+    save_cube(grid, cubes, mls_ids, "v1", tmp_path / "grid")
+
+    cube = PrecomputedCube(tmp_path / "grid")
+    assert cube.version == "v1"
+    _, point = list(_grid_points(grid))[-1]
+    parameters = dict(grid.model(**point).parameters)
+    # Looked up for listings in another order.
+    lookup = cube.lookup(mls_ids[::-1], **parameters)
+    expected = grid.model(**point).forecast(*properties)
+    for column, values in expected.items():
+        np.testing.assert_allclose(lookup[column], values[::-1], rtol=1e-12)
+
+    assert cube.lookup(mls_ids, **{**parameters, "vacancy": 0.03}) is None
+    assert cube.lookup(mls_ids + ["unknown"], **parameters) is None